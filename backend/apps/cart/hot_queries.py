@@ -0,0 +1,9 @@
+# backend/apps/cart/hot_queries.py
+from apps.core.query_plans import register
+from .models import CartItem
+
+
+@register('cart.items_by_cart')
+def cart_items():
+    """Articles d'un panier (CartSerializer)"""
+    return CartItem.objects.filter(cart_id=1).select_related('product')
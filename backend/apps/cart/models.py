@@ -10,6 +10,8 @@ class Cart(models.Model):
         on_delete=models.CASCADE,
         related_name='cart'
     )
+    # Incrémentée à chaque modification des articles (clé du cache de l'aperçu de commande)
+    version = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -24,6 +26,11 @@ class Cart(models.Model):
     def total_quantity(self):
         return sum(item.quantity for item in self.items.all())
 
+    @property
+    def total_weight(self):
+        """Poids total en kg (produits sans poids comptés à 0), pour les devis de livraison"""
+        return sum((item.quantity * (item.product.weight or 0) for item in self.items.all()), 0)
+
 
 class CartItem(models.Model):
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
@@ -15,7 +15,8 @@ class CartSerializer(serializers.ModelSerializer):
     items = CartItemSerializer(many=True, read_only=True)
     total_price = serializers.ReadOnlyField()
     total_quantity = serializers.ReadOnlyField()
+    total_weight = serializers.ReadOnlyField()
     
     class Meta:
         model = Cart
-        fields = ['id', 'items', 'total_price', 'total_quantity', 'updated_at']
\ No newline at end of file
+        fields = ['id', 'items', 'total_price', 'total_quantity', 'total_weight', 'version', 'updated_at']
\ No newline at end of file
@@ -0,0 +1,13 @@
+# backend/apps/cart/signals.py
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Cart, CartItem
+
+
+@receiver([post_save, post_delete], sender=CartItem)
+def bump_cart_version(sender, instance, **kwargs):
+    """Toute modification d'un article périme l'aperçu de commande du panier"""
+    Cart.objects.filter(pk=instance.cart_id).update(version=F('version') + 1, updated_at=timezone.now())
@@ -0,0 +1,34 @@
+# backend/apps/core/checks.py
+from django.conf import settings
+from django.core.cache import caches
+from django.core.checks import Tags, Warning, register
+
+# Caches propres à chaque processus
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def process_local_cache():
+    """Le cache par défaut n'est pas partagé entre processus"""
+    backend = type(caches['default'])
+    return f'{backend.__module__}.{backend.__qualname__}' in LOCAL_CACHE_BACKENDS
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Les numéros de version en cache propagent entre processus les révocations
+    de jetons, l'invalidation des indicateurs utilisateur, de l'index de
+    livraison et l'épinglage sur la base principale
+    """
+    if settings.ASGI_WORKERS > 1 and process_local_cache():
+        return [Warning(
+            f"ASGI_WORKERS={settings.ASGI_WORKERS} avec un cache propre à chaque processus",
+            hint="Configurer CACHE_BACKEND (Redis, Memcached, base de données) partagé par les workers : "
+                 "sinon un jeton révoqué reste accepté par les autres workers jusqu'à "
+                 "TOKEN_REVOCATION_REBUILD_INTERVAL.",
+            id='core.W001',
+        )]
+    return []
@@ -0,0 +1,129 @@
+# backend/apps/core/db_routing.py
+"""
+Lectures du catalogue et des rapports sur les répliques (REPLICA_DATABASES).
+
+Seuls les modèles désignés dans REPLICA_ROUTED ('app' ou 'app.modele') sont
+lus sur une réplique ; toutes les écritures vont sur 'default'. Une requête
+lit tout sur 'default' (read-your-writes) quand :
+- elle est elle-même une écriture (méthode non sûre) ou a déjà écrit ;
+- elle porte le cookie db_pin, posé pour REPLICA_STICKY_SECONDS après une
+  écriture (clients à session, admin) ;
+- son utilisateur JWT a écrit dans la fenêtre (clé en cache par utilisateur,
+  renseignée par identify() depuis l'authentification).
+Hors requête (commandes, workers), les lectures désignées vont sur les répliques.
+"""
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'db_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def pin_key(user_id):
+    return f'db:pinned:{user_id}'
+
+
+class RequestState:
+    """Contexte de routage d'une requête"""
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+        self.user_id = None
+
+
+_state = ContextVar('db_routing_state', default=None)
+
+
+def identify(user_id):
+    """Appelé à l'authentification : épingle la requête si l'utilisateur vient d'écrire"""
+    state = _state.get()
+    if state is None or not settings.REPLICA_DATABASES:
+        return
+    state.user_id = user_id
+    if not state.pinned and cache.get(pin_key(user_id)):
+        state.pinned = True
+
+
+class ReplicaRouter:
+
+    def routed(self, model):
+        meta = model._meta
+        routes = settings.REPLICA_ROUTED
+        return meta.app_label in routes or meta.label_lower in routes
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.REPLICA_DATABASES
+        if not replicas or not self.routed(model):
+            return None
+        state = _state.get()
+        if state is not None:
+            if state.pinned or state.wrote:
+                return DEFAULT_DB_ALIAS
+        elif connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            # Hors requête, lecture dans une transaction : voir ses propres écritures
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Les répliques portent les mêmes données que 'default'
+        databases = {DEFAULT_DB_ALIAS, *settings.REPLICA_DATABASES}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ReplicaPinningMiddleware:
+    """Ouvre le contexte de routage de la requête et pose l'épinglage après une écriture"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def start(self, request):
+        pinned = request.method not in SAFE_METHODS or PIN_COOKIE in request.COOKIES
+        return _state.set(RequestState(pinned=pinned))
+
+    def finish(self, response, token):
+        state = _state.get()
+        _state.reset(token)
+        if state.wrote and settings.REPLICA_DATABASES:
+            window = settings.REPLICA_STICKY_SECONDS
+            response.set_cookie(PIN_COOKIE, '1', max_age=window, httponly=True, samesite='Lax')
+            if state.user_id is not None:
+                cache.set(pin_key(state.user_id), True, window)
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = self.start(request)
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            _state.reset(token)
+            raise
+        return self.finish(response, token)
+
+    async def __acall__(self, request):
+        token = self.start(request)
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            _state.reset(token)
+            raise
+        return self.finish(response, token)
@@ -0,0 +1,130 @@
+# backend/apps/core/log.py
+"""
+Journalisation non bloquante et structurée.
+
+Le thread de la requête ne fait que filtrer (échantillonnage), copier les
+arguments en masquant les secrets et déposer l'enregistrement dans une file
+en mémoire. Le formatage JSON et l'écriture ont lieu dans le thread du
+QueueListener. Configuration : LOGGING dans config/settings.py.
+
+    logger.info("Réponse PayGate %s", identifier, extra={'duration_ms': 12.5})
+"""
+import copy
+import json
+import logging
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from apps.core import metrics
+
+# Clés dont la valeur est masquée, dans les arguments comme dans les champs extra
+SECRET_KEYS = {'auth_token', 'token', 'password', 'api_key', 'secret', 'authorization', 'refresh', 'access'}
+REDACTED = '***'
+
+# Attributs standard d'un LogRecord : tout le reste vient de extra=
+RESERVED_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+def redact(value):
+    """Copie de value où les valeurs des clés secrètes sont masquées"""
+    if isinstance(value, dict):
+        return {
+            key: REDACTED if str(key).lower() in SECRET_KEYS else redact(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return type(value)(redact(item) for item in value)
+    return value
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Ne conserve qu'une fraction des messages sous WARNING, par logger.
+    rates : {'apps.payments.views': 0.1} ; le préfixe le plus long s'applique.
+    """
+
+    def __init__(self, rates=None):
+        super().__init__()
+        self.rates = dict(rates or {})
+        self._resolved = {}
+
+    def rate_for(self, name):
+        rate = self._resolved.get(name)
+        if rate is None:
+            prefixes = [prefix for prefix in self.rates if name == prefix or name.startswith(prefix + '.')]
+            rate = self.rates[max(prefixes, key=len)] if prefixes else 1.0
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate_for(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class JsonFormatter(logging.Formatter):
+    """Une ligne JSON par enregistrement, champs extra inclus"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in RESERVED_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc_info'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class QueueLogHandler(QueueHandler):
+    """
+    Handler à placer sur les loggers : dépose les enregistrements dans une file
+    bornée, écrite par un QueueListener dans son propre thread. File pleine :
+    l'enregistrement est abandonné plutôt que de bloquer la requête.
+    """
+
+    def __init__(self, stream=None, maxsize=10000):
+        super().__init__(queue.Queue(maxsize=maxsize))
+        self.target = logging.StreamHandler(stream or sys.stderr)
+        self.listener = QueueListener(self.queue, self.target, respect_handler_level=True)
+        self.listener.start()  # arrêté par close(), que logging.shutdown() appelle à la sortie
+
+    def setFormatter(self, fmt):
+        # Le formatage a lieu dans le thread d'écriture
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        """Copie sans formatage : seuls les arguments et extras sont figés et masqués"""
+        record = copy.copy(record)
+        if record.args:
+            record.args = redact(record.args) if isinstance(record.args, dict) else tuple(
+                redact(arg) for arg in record.args
+            )
+        for key, value in list(vars(record).items()):
+            if key not in RESERVED_ATTRS:
+                setattr(record, key, REDACTED if key.lower() in SECRET_KEYS else redact(value))
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.increment('logging.dropped')
+
+    def close(self):
+        if self.listener._thread is not None:
+            self.listener.stop()
+        super().close()
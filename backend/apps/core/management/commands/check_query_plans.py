@@ -0,0 +1,39 @@
+# backend/apps/core/management/commands/check_query_plans.py
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.query_plans import hot_querysets, explain, full_scans
+
+
+class Command(BaseCommand):
+    help = "Exécuter EXPLAIN sur les querysets chauds et échouer si l'un d'eux parcourt une table entière ou trie sans index"
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help="Limiter aux querysets nommés")
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        registry = hot_querysets()
+        names = options['names'] or list(registry)
+
+        unknown = set(names) - set(registry)
+        if unknown:
+            raise CommandError(f"Queryset(s) inconnu(s): {', '.join(sorted(unknown))}")
+
+        regressions = []
+        for name in names:
+            queryset = registry[name]().using(options['database'])
+            scans = full_scans(queryset)
+
+            if scans:
+                regressions.append(name)
+                self.stdout.write(self.style.ERROR(f"✗ {name}"))
+                for line in explain(queryset):
+                    self.stdout.write(f"    {line}")
+            else:
+                self.stdout.write(self.style.SUCCESS(f"✓ {name}"))
+                if options['verbosity'] > 1:
+                    for line in explain(queryset):
+                        self.stdout.write(f"    {line}")
+
+        if regressions:
+            raise CommandError(f"Parcours complet ou tri sans index détecté: {', '.join(regressions)}")
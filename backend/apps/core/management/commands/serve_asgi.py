@@ -0,0 +1,58 @@
+# backend/apps/core/management/commands/serve_asgi.py
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from apps.core.checks import process_local_cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Servir config.asgi avec uvicorn. Les vues async (paiements PayGate, flux SSE) "
+        "attendent le réseau sans occuper de thread ; les vues DRF tournent dans le pool de threads"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default=None)
+        parser.add_argument('--port', type=int, default=None)
+        parser.add_argument('--workers', type=int, default=None)
+        parser.add_argument('--limit-concurrency', type=int, default=None,
+                            help="Connexions simultanées max par processus (0 = aucune limite)")
+        parser.add_argument('--reload', action='store_true')
+
+    def handle(self, *args, **options):
+        limit = settings.ASGI_LIMIT_CONCURRENCY if options['limit_concurrency'] is None \
+            else options['limit_concurrency']
+        workers = 1 if options['reload'] else options['workers'] or settings.ASGI_WORKERS
+
+        if workers > 1 and process_local_cache():
+            # Révocations de jetons et invalidations ne seraient vues que par le worker qui les fait
+            raise CommandError(
+                f"{workers} workers avec un cache propre à chaque processus : "
+                "configurer un CACHE_BACKEND partagé, ou --workers 1"
+            )
+
+        for alias in connections:
+            database = connections.settings[alias]
+            if database['ENGINE'].endswith('postgresql') and database.get('CONN_MAX_AGE') \
+                    and 'pool' not in database.get('OPTIONS', {}):
+                # Sous ASGI, chaque requête synchrone peut tourner dans un thread différent :
+                # les connexions persistantes s'accumulent, le pool les borne
+                self.stderr.write(self.style.WARNING(
+                    f"Base '{alias}' : CONN_MAX_AGE sans pool, préférer DB_POOL=True sous ASGI"
+                ))
+
+        import uvicorn
+
+        uvicorn.run(
+            'config.asgi:application',
+            host=options['host'] or settings.ASGI_HOST,
+            port=options['port'] or settings.ASGI_PORT,
+            workers=None if options['reload'] else workers,
+            reload=options['reload'],
+            limit_concurrency=limit or None,
+            backlog=settings.ASGI_BACKLOG,
+            timeout_keep_alive=settings.ASGI_KEEPALIVE,
+            lifespan='off',
+            access_log=False,
+        )
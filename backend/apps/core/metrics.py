@@ -0,0 +1,86 @@
+# backend/apps/core/metrics.py
+"""
+Métriques en mémoire, par processus : compteurs, jauges et latences.
+
+    from apps.core import metrics
+
+    metrics.increment('paygate.status.error')
+    with metrics.timer('paygate.status'):
+        ...
+"""
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+# Nombre d'échantillons conservés par série pour le calcul des percentiles
+SAMPLE_SIZE = 1024
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+_gauges = {}
+_latencies = defaultdict(lambda: {'count': 0, 'total': 0.0, 'max': 0.0, 'samples': deque(maxlen=SAMPLE_SIZE)})
+
+
+def increment(name, value=1):
+    with _lock:
+        _counters[name] += value
+
+
+def set_gauge(name, value):
+    with _lock:
+        _gauges[name] = value
+
+
+def observe(name, seconds):
+    """Enregistrer une durée (en secondes)"""
+    with _lock:
+        series = _latencies[name]
+        series['count'] += 1
+        series['total'] += seconds
+        series['max'] = max(series['max'], seconds)
+        series['samples'].append(seconds)
+
+
+@contextmanager
+def timer(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start)
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def snapshot():
+    """Copie des métriques courantes, latences en millisecondes"""
+    with _lock:
+        latencies = {}
+        for name, series in _latencies.items():
+            ordered = sorted(series['samples'])
+            latencies[name] = {
+                'count': series['count'],
+                'avg_ms': round(series['total'] / series['count'] * 1000, 2) if series['count'] else 0.0,
+                'p50_ms': round(percentile(ordered, 0.50) * 1000, 2),
+                'p95_ms': round(percentile(ordered, 0.95) * 1000, 2),
+                'p99_ms': round(percentile(ordered, 0.99) * 1000, 2),
+                'max_ms': round(series['max'] * 1000, 2),
+            }
+        return {
+            'counters': dict(_counters),
+            'gauges': dict(_gauges),
+            'latencies': latencies,
+        }
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _latencies.clear()
@@ -0,0 +1,60 @@
+# backend/apps/core/query_plans.py
+"""
+Registre des querysets « chauds » et analyse de leur plan d'exécution.
+
+Chaque application déclare ses requêtes critiques dans un module
+``hot_queries.py`` :
+
+    from apps.core.query_plans import register
+
+    @register('orders.by_user')
+    def orders_by_user():
+        return Order.objects.filter(user_id=1)
+"""
+from django.db import connections
+from django.utils.module_loading import autodiscover_modules
+
+_registry = {}
+
+
+def register(name):
+    """Décorateur pour enregistrer une fabrique de queryset"""
+    def decorator(factory):
+        _registry[name] = factory
+        return factory
+    return decorator
+
+
+def hot_querysets():
+    """Charger les modules hot_queries de chaque application et retourner le registre"""
+    autodiscover_modules('hot_queries')
+    return dict(sorted(_registry.items()))
+
+
+def explain(queryset):
+    """Plan d'exécution brut, une ligne par étape"""
+    return queryset.explain().splitlines()
+
+
+def full_scans(queryset):
+    """
+    Étapes du plan qui parcourent une table entière sans index, ou qui trient
+    les lignes faute d'un index donnant déjà l'ordre demandé
+    """
+    vendor = connections[queryset.db].vendor
+    scans = []
+    for line in explain(queryset):
+        step = line.strip()
+        if vendor == 'sqlite':
+            # SQLite : « SCAN table » sans index, hors sous-requêtes matérialisées
+            detail = step.split('SCAN ', 1)[-1] if 'SCAN ' in step else None
+            if detail and 'USING' not in detail and not detail.startswith(('SUBQUERY', 'CONSTANT')):
+                scans.append(step)
+            # Tri en mémoire (ou sur disque) de toutes les lignes retenues
+            elif 'USE TEMP B-TREE' in step:
+                scans.append(step)
+        elif vendor == 'postgresql':
+            # Nœud « Sort » (pas ses lignes « Sort Key ») : un index donnant l'ordre l'éviterait
+            if 'Seq Scan' in step or step.lstrip('-> ').startswith('Sort  ('):
+                scans.append(step)
+    return scans
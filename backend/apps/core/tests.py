@@ -0,0 +1,191 @@
+import io
+import json
+import logging
+import shutil
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.core import db_routing
+from apps.payments.ledger import ledger_totals
+from apps.payments.models import Payment
+from apps.products.models import Category, Product
+from apps.shipping.services import shipping_index
+from apps.users.models import CustomUser
+from apps.users.revocation import RevocableRefreshToken
+from config import database
+
+from .checks import check_shared_cache
+from .log import JsonFormatter, QueueLogHandler, SamplingFilter
+from .query_plans import full_scans
+
+
+class QueueLoggingTests(SimpleTestCase):
+
+    def setUp(self):
+        self.stream = io.StringIO()
+        self.handler = QueueLogHandler(stream=self.stream)
+        self.handler.setFormatter(JsonFormatter())
+        self.logger = logging.getLogger('apps.core.tests.queue')
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        self.logger.addHandler(self.handler)
+        self.addCleanup(self.logger.removeHandler, self.handler)
+
+    def records(self):
+        self.handler.close()  # vide la file et arrête le thread d'écriture
+        return [json.loads(line) for line in self.stream.getvalue().splitlines()]
+
+    def test_records_are_json_and_secrets_redacted(self):
+        request = {'auth_token': 'secret-key', 'amount': '1000'}
+        self.logger.info("Envoi %s", request, extra={'paygate_request': request, 'duration_ms': 12.5})
+        request['amount'] = 'modifié après coup'
+
+        [record] = self.records()
+        self.assertEqual(record['logger'], 'apps.core.tests.queue')
+        self.assertEqual(record['paygate_request'], {'auth_token': '***', 'amount': '1000'})
+        self.assertEqual(record['duration_ms'], 12.5)
+        self.assertNotIn('secret-key', record['message'])
+        self.assertIn("'amount': '1000'", record['message'])
+
+    def test_sampling_keeps_warnings(self):
+        self.handler.addFilter(SamplingFilter({'apps.core.tests': 0}))
+        for _ in range(20):
+            self.logger.info("échantillonné")
+        self.logger.warning("toujours gardé")
+
+        self.assertEqual([record['message'] for record in self.records()], ["toujours gardé"])
+
+
+class DatabaseProfileTests(TestCase):
+
+    def test_sqlite_connections_are_tuned(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+
+    def test_postgresql_profile_uses_pool_or_persistent_connections(self):
+        env = {'DB_ENGINE': 'postgresql', 'DB_POOL': True}
+        fake_config = lambda name, default=None, cast=None: env.get(name, default)  # noqa: E731
+
+        with patch.object(database, 'config', fake_config):
+            pooled = database.database(None)
+            env['DB_POOL'] = False
+            persistent = database.database(None)
+
+        self.assertEqual((pooled['CONN_MAX_AGE'], pooled['OPTIONS']['pool']['max_size']), (0, 10))
+        self.assertEqual((persistent['CONN_MAX_AGE'], persistent['CONN_HEALTH_CHECKS']), (60, True))
+        self.assertNotIn('pool', persistent['OPTIONS'])
+
+
+@override_settings(REPLICA_DATABASES=['replica'], REPLICA_ROUTED=['products'])
+class ReplicaRoutingTests(TestCase):
+    """
+    Deux fichiers SQLite : la base de test et une « réplique » aux données
+    différentes, déclarée avant la mise en place du TestCase ('__all__' la
+    reprend) et supprimée avec son répertoire temporaire
+    """
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        connections.settings['replica'] = connections.configure_settings({
+            'default': connection.settings_dict,
+            'replica': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': str(Path(cls.directory) / 'replica.sqlite3')},
+        })['replica']
+        with connections['replica'].schema_editor() as editor:
+            editor.create_model(Category)
+            editor.create_model(Product)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        shutil.rmtree(cls.directory)
+
+    def setUp(self):
+        cache.clear()
+        Category.objects.using('replica').create(name='Réplique', slug='replique')
+        category = Category.objects.create(name='Primaire', slug='primaire')
+        self.product = Product.objects.create(
+            name='Chemise', slug='chemise', description='', price='1000', category=category, sku='CH-1',
+            quantity=5, is_published=True
+        )
+        self.user = CustomUser.objects.create_user(email='client@example.com', username='client', password='x')
+        self.token = str(RevocableRefreshToken.for_user(self.user).access_token)
+
+    def categories(self, client):
+        return [category['name'] for category in client.get('/api/products/categories/').data['results']]
+
+    def test_catalog_reads_use_replica_until_the_user_writes(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.assertEqual(self.categories(client), ['Réplique'])
+
+        response = client.post('/api/cart/cart/add_item/', {'product_id': self.product.id}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('db_pin', response.cookies)
+        self.assertEqual(self.categories(client), ['Primaire'])
+
+        # Autre client, même utilisateur JWT, sans cookie : épinglé par le cache
+        other = APIClient()
+        other.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.assertEqual(self.categories(other), ['Primaire'])
+        self.assertEqual(self.categories(APIClient()), ['Réplique'])
+
+
+    def test_index_and_ledger_are_read_from_primary(self):
+        shipping_index.invalidate()
+        with override_settings(REPLICA_ROUTED=['shipping', 'payments.paymentledgerentry']), \
+                CaptureQueriesContext(connections['replica']) as replica_queries:
+            # Devis anonyme, donc jamais épinglé : l'index se reconstruit quand même sur 'default'
+            response = APIClient().get('/api/shipping/quote/', {'country': 'TG'})
+            self.assertEqual(response.status_code, 200)
+
+            # Lecture non épinglée, comme reconcile_ledger hors transaction
+            token = db_routing._state.set(db_routing.RequestState())
+            try:
+                self.assertEqual(list(ledger_totals()), [])
+            finally:
+                db_routing._state.reset(token)
+        self.assertEqual(len(replica_queries), 0)
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+
+    def test_deploy_check_requires_shared_cache_with_several_workers(self):
+        with override_settings(ASGI_WORKERS=4):
+            self.assertIn('core.W001', [message.id for message in check_shared_cache(None)])
+            with self.assertRaisesMessage(CommandError, 'cache propre à chaque processus'):
+                call_command('serve_asgi')
+
+        with override_settings(ASGI_WORKERS=1):
+            self.assertEqual(check_shared_cache(None), [])
+
+
+class QueryPlanTests(TestCase):
+
+    def test_hot_querysets_use_indexes(self):
+        out = io.StringIO()
+        call_command('check_query_plans', stdout=out)
+        self.assertNotIn('✗', out.getvalue())
+
+    def test_sort_without_index_is_reported(self):
+        # Plusieurs statuts : l'index (status, created_at) ne donne pas l'ordre global
+        queryset = Payment.objects.filter(status__in=['initiated', 'processing']).order_by('created_at')
+        self.assertTrue(full_scans(queryset))
+        self.assertEqual(full_scans(queryset.order_by()), [])
@@ -1,6 +1,6 @@
 # backend/apps/orders/admin.py
 from django.contrib import admin
-from .models import Order, OrderItem
+from .models import Order, OrderItem, ArchivedOrder
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
@@ -16,4 +16,17 @@ class OrderAdmin(admin.ModelAdmin):
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
     list_display = ['order', 'product', 'quantity', 'price']
-    search_fields = ['order__order_number', 'product__name']
\ No newline at end of file
+    search_fields = ['order__order_number', 'product__name']
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    list_display = ['order_number', 'user', 'status', 'payment_status', 'total', 'created_at', 'archived_at']
+    list_filter = ['status', 'payment_status', 'archived_at']
+    search_fields = ['order_number', 'user__email']
+    readonly_fields = [field.name for field in ArchivedOrder._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
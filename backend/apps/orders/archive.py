@@ -0,0 +1,129 @@
+# backend/apps/orders/archive.py
+import logging
+from datetime import timedelta
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Order, ArchivedOrder
+
+logger = logging.getLogger(__name__)
+
+# Statuts de commande considérés comme clôturés
+ARCHIVABLE_STATUSES = ('delivered', 'cancelled', 'refunded')
+
+PAYMENT_SNAPSHOT_FIELDS = [
+    'id', 'identifier', 'tx_reference', 'payment_reference', 'payment_method',
+    'status', 'amount', 'currency', 'phone_number', 'network',
+    'payment_method_detail', 'payment_date', 'created_at', 'updated_at',
+]
+
+
+def archivable_orders(older_than_days):
+    """
+    Commandes clôturées dont la dernière mise à jour précède la date limite.
+    Sans ordre : chaque lot archivé est supprimé, le suivant reprend la sélection,
+    et un tri sur plusieurs statuts ne peut pas être servi par l'index
+    """
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    return Order.objects.filter(
+        status__in=ARCHIVABLE_STATUSES,
+        updated_at__lt=cutoff
+    ).order_by()
+
+
+def build_snapshot(order):
+    """Instantané JSON d'une commande, au format de OrderSerializer"""
+    try:
+        payment = order.payment
+    except ObjectDoesNotExist:
+        payment = None
+
+    return {
+        'id': order.id,
+        'order_number': order.order_number,
+        'status': order.status,
+        'payment_status': order.payment_status,
+        'payment_method': order.payment_method,
+        'shipping_address': order.shipping_address,
+        'billing_address': order.billing_address,
+        'shipping_method_name': order.shipping_method.name if order.shipping_method else None,
+        'subtotal': order.subtotal,
+        'shipping_price': order.shipping_price,
+        'tax_amount': order.tax_amount,
+        'total': order.total,
+        'notes': order.notes,
+        'items': [
+            {
+                'id': item.id,
+                'product': {
+                    'id': item.product_id,
+                    'name': item.product.name,
+                    'slug': item.product.slug,
+                },
+                'quantity': item.quantity,
+                'price': item.price,
+                'total_price': item.total_price,
+            }
+            for item in order.items.all()
+        ],
+        'payment': (
+            {field: getattr(payment, field) for field in PAYMENT_SNAPSHOT_FIELDS}
+            if payment else None
+        ),
+        'created_at': order.created_at,
+        'updated_at': order.updated_at,
+    }
+
+
+def archive_batch(order_ids, older_than_days):
+    """
+    Archiver un lot de commandes dans une seule transaction.
+    La suppression cascade sur les articles et le paiement. Les commandes
+    sont relues verrouillées avec le filtre d'archivage : une commande rouverte
+    ou modifiée depuis la sélection des identifiants reste en place.
+    """
+    with transaction.atomic():
+        orders = list(
+            archivable_orders(older_than_days).filter(id__in=order_ids)
+            .select_for_update(of=('self',))
+            .select_related('shipping_method', 'payment')
+            .prefetch_related('items__product')
+        )
+        ArchivedOrder.objects.bulk_create([
+            ArchivedOrder(
+                original_id=order.id,
+                order_number=order.order_number,
+                user_id=order.user_id,
+                status=order.status,
+                payment_status=order.payment_status,
+                total=order.total,
+                data=build_snapshot(order),
+                created_at=order.created_at,
+            )
+            for order in orders
+        ])
+        Order.objects.filter(id__in=[order.id for order in orders]).delete()
+    return len(orders)
+
+
+def archive_orders(older_than_days=365, batch_size=500, max_batches=None):
+    """
+    Déplacer les commandes clôturées vers la table d'archive par lots.
+    Retourne le nombre de commandes archivées.
+    """
+    archived = 0
+    batches = 0
+    queryset = archivable_orders(older_than_days)
+
+    while max_batches is None or batches < max_batches:
+        order_ids = list(queryset.values_list('id', flat=True)[:batch_size])
+        if not order_ids:
+            break
+        count = archive_batch(order_ids, older_than_days)
+        archived += count
+        batches += 1
+        logger.info("Lot %s archivé: %s commande(s)", batches, count)
+
+    return archived
@@ -0,0 +1,81 @@
+# backend/apps/orders/checkout.py
+"""
+Aperçu de commande calculé côté serveur : sous-total, poids, options de
+livraison, taxe et total pour le panier courant et une destination.
+
+Requêtes bornées : la version du panier (1), puis l'agrégat articles x
+produits (1) seulement si le cache de cette version est vide. Les options
+de livraison viennent de l'index en mémoire de apps.shipping.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import DecimalField, F, IntegerField, Sum, Value
+from django.db.models.functions import Coalesce
+
+from apps.cart.models import Cart, CartItem
+from apps.shipping.services import quote, tax_for, tax_rate
+
+ZERO = Decimal('0')
+
+
+def cart_totals(cart_id, version):
+    """
+    {'items_count', 'subtotal', 'weight'} du panier, en une requête agrégée,
+    mis en cache par version : toute modification d'un article change la clé.
+    """
+    key = f'checkout:cart:{cart_id}:{version}'
+    totals = cache.get(key)
+    if totals is None:
+        money = DecimalField(max_digits=12, decimal_places=2)
+        totals = CartItem.objects.filter(cart_id=cart_id).aggregate(
+            items_count=Coalesce(Sum('quantity'), Value(0), output_field=IntegerField()),
+            subtotal=Coalesce(
+                Sum(F('quantity') * F('product__price'), output_field=money), Value(ZERO), output_field=money
+            ),
+            weight=Coalesce(
+                Sum(F('quantity') * Coalesce('product__weight', Value(ZERO)), output_field=money),
+                Value(ZERO), output_field=money
+            ),
+        )
+        cache.set(key, totals, settings.CHECKOUT_PREVIEW_CACHE_TTL)
+    return totals
+
+
+def checkout_preview(user, country, shipping_method_id=None):
+    """
+    Aperçu pour le panier de user livré dans country. Retourne None si le
+    panier est vide. Le mode retenu est shipping_method_id s'il est
+    disponible, sinon le moins cher.
+    """
+    cart = Cart.objects.filter(user=user).values('id', 'version').first()
+    if cart is None:
+        return None
+    totals = cart_totals(cart['id'], cart['version'])
+    if not totals['items_count']:
+        return None
+
+    subtotal = totals['subtotal']
+    tax = tax_for(country, subtotal)
+    options = [
+        {**option, 'total': subtotal + tax + option['price']}
+        for option in quote(country, totals['weight'])
+    ]
+    selected = next((option for option in options if option['method_id'] == shipping_method_id), None)
+    if selected is None and options:
+        selected = options[0]
+
+    return {
+        'cart_version': cart['version'],
+        'country': country.upper(),
+        'items_count': totals['items_count'],
+        'weight': totals['weight'],
+        'subtotal': subtotal,
+        'tax_rate': tax_rate(country),
+        'tax_amount': tax,
+        'shipping_options': options,
+        'shipping_method': selected['method_id'] if selected else None,
+        'shipping_price': selected['price'] if selected else None,
+        'total': selected['total'] if selected else None,
+    }
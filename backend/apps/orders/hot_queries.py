@@ -0,0 +1,22 @@
+# backend/apps/orders/hot_queries.py
+from apps.core.query_plans import register
+from .archive import archivable_orders
+from .models import Order, ArchivedOrder
+
+
+@register('orders.by_user')
+def orders_by_user():
+    """OrderViewSet.get_queryset"""
+    return Order.objects.filter(user_id=1)
+
+
+@register('orders.archivable')
+def orders_archivable():
+    """Sélection des lots de archive_orders"""
+    return archivable_orders(365).values_list('id', flat=True)
+
+
+@register('orders.archived_by_user')
+def archived_orders_by_user():
+    """OrderViewSet.archived"""
+    return ArchivedOrder.objects.filter(user_id=1)
@@ -0,0 +1,31 @@
+# backend/apps/orders/management/commands/archive_orders.py
+from django.core.management.base import BaseCommand
+
+from apps.orders.archive import archivable_orders, archive_orders
+
+
+class Command(BaseCommand):
+    help = "Archiver les commandes livrées, annulées ou remboursées plus anciennes que la date limite"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=365,
+                            help="Âge minimum (en jours depuis la dernière mise à jour)")
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Nombre de commandes par transaction")
+        parser.add_argument('--max-batches', type=int, default=None,
+                            help="Nombre maximum de lots à traiter")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Compter les commandes sans les archiver")
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            count = archivable_orders(options['days']).count()
+            self.stdout.write(f"{count} commande(s) à archiver")
+            return
+
+        archived = archive_orders(
+            older_than_days=options['days'],
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"{archived} commande(s) archivée(s)"))
@@ -1,3 +1,4 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.core.validators import MinValueValidator
 from apps.users.models import CustomUser
@@ -53,6 +54,10 @@ class Order(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='order_user_created_idx'),
+            models.Index(fields=['status', 'updated_at'], name='order_status_updated_idx'),
+        ]
 
     def __str__(self):
         return f"Order {self.order_number}"
@@ -76,4 +81,31 @@ class OrderItem(models.Model):
 
     @property
     def total_price(self):
-        return self.quantity * self.price
\ No newline at end of file
+        return self.quantity * self.price
+
+
+class ArchivedOrder(models.Model):
+    """Commande clôturée déplacée hors des tables actives (voir apps.orders.archive)"""
+    original_id = models.BigIntegerField(unique=True)
+    order_number = models.CharField(max_length=20, unique=True)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='archived_orders')
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    payment_status = models.CharField(max_length=20, choices=Order.PAYMENT_STATUS_CHOICES)
+    total = models.DecimalField(max_digits=10, decimal_places=2)
+
+    # Instantané complet : commande, articles et paiement
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='archived_user_created_idx'),
+        ]
+        verbose_name = 'Commande archivée'
+        verbose_name_plural = 'Commandes archivées'
+
+    def __str__(self):
+        return f"Archived order {self.order_number}"
@@ -2,6 +2,7 @@ from rest_framework import serializers
 from .models import Order, OrderItem
 from apps.products.serializers import ProductListSerializer
 from apps.shipping.models import ShippingMethod
+from apps.shipping.serializers import ShippingQuoteSerializer
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
@@ -62,4 +63,26 @@ class CreateOrderSerializer(serializers.ModelSerializer):
             ))
 
         OrderItem.objects.bulk_create(order_items)
-        return order
\ No newline at end of file
+        return order
+
+class CheckoutPreviewRequestSerializer(serializers.Serializer):
+    country = serializers.CharField(max_length=100)
+    shipping_method = serializers.IntegerField(required=False)
+
+
+class CheckoutOptionSerializer(ShippingQuoteSerializer):
+    total = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+
+class CheckoutPreviewSerializer(serializers.Serializer):
+    cart_version = serializers.IntegerField()
+    country = serializers.CharField()
+    items_count = serializers.IntegerField()
+    weight = serializers.DecimalField(max_digits=12, decimal_places=3)
+    subtotal = serializers.DecimalField(max_digits=12, decimal_places=2)
+    tax_rate = serializers.DecimalField(max_digits=6, decimal_places=4)
+    tax_amount = serializers.DecimalField(max_digits=12, decimal_places=2)
+    shipping_options = CheckoutOptionSerializer(many=True)
+    shipping_method = serializers.IntegerField(allow_null=True)
+    shipping_price = serializers.DecimalField(max_digits=10, decimal_places=2, allow_null=True)
+    total = serializers.DecimalField(max_digits=12, decimal_places=2, allow_null=True)
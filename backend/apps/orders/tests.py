@@ -1,3 +1,147 @@
-from django.test import TestCase
+import io
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.cart.models import Cart, CartItem
+from apps.payments.models import Payment
+from apps.products.models import Category, Product
+from apps.shipping.models import ShippingMethod, ShippingZone
+from apps.shipping.services import shipping_index
+from apps.users.models import CustomUser
+from .archive import archivable_orders, archive_batch
+from .models import ArchivedOrder, Order, OrderItem
+
+
+@override_settings(TAX_RATES={'TG': Decimal('0.18')})
+class CheckoutPreviewTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        shipping_index.invalidate()
+        self.user = CustomUser.objects.create_user(email='client@example.com', username='client', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        category = Category.objects.create(name='Mode', slug='mode')
+        self.shirt = Product.objects.create(
+            name='Chemise', slug='chemise', description='', price='10000', category=category, sku='CH-1',
+            weight='0.5'
+        )
+        self.cap = Product.objects.create(
+            name='Casquette', slug='casquette', description='', price='2500', category=category, sku='CA-1'
+        )
+        zone = ShippingZone.objects.create(name='Togo', countries=['TG'])
+        self.standard = ShippingMethod.objects.create(name='Standard', zone=zone, price='1000', price_per_kg='500')
+        self.express = ShippingMethod.objects.create(
+            name='Express', zone=zone, method_type='express', price='3000', max_weight='5'
+        )
+
+        self.cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=self.cart, product=self.shirt, quantity=2)
+        CartItem.objects.create(cart=self.cart, product=self.cap, quantity=1)
+
+    def test_preview_is_computed_server_side_and_cached_per_version(self):
+        # Version du panier, agrégat articles x produits, construction de l'index de livraison
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                '/api/orders/checkout/preview/', {'country': 'tg', 'shipping_method': self.express.id}
+            )
+        data = response.data
+        self.assertEqual((data['subtotal'], data['weight'], data['tax_amount']), ('22500.00', '1.000', '4050.00'))
+        self.assertEqual([option['name'] for option in data['shipping_options']], ['Standard', 'Express'])
+        self.assertEqual((data['shipping_method'], data['shipping_price']), (self.express.id, '3000.00'))
+        self.assertEqual(data['total'], '29550.00')
+
+        # Même version : seule la version du panier est relue
+        with self.assertNumQueries(1):
+            self.client.get('/api/orders/checkout/preview/', {'country': 'TG'})
+
+        CartItem.objects.filter(product=self.cap).get().delete()
+        response = self.client.get('/api/orders/checkout/preview/', {'country': 'TG'})
+        self.assertEqual(response.data['cart_version'], data['cart_version'] + 1)
+        self.assertEqual((response.data['subtotal'], response.data['total']), ('20000.00', '25100.00'))
+
+        self.cart.items.all().delete()
+        self.assertEqual(self.client.get('/api/orders/checkout/preview/', {'country': 'TG'}).status_code, 400)
+
+
+class ArchiveOrdersTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email='client@example.com', username='client', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        category = Category.objects.create(name='Mode', slug='mode')
+        product = Product.objects.create(
+            name='Chemise', slug='chemise', description='', price='10000', category=category, sku='CH-1'
+        )
+        self.orders = {}
+        for status in ('delivered', 'cancelled', 'processing'):
+            order = Order.objects.create(
+                user=self.user, status=status, shipping_address={}, billing_address={},
+                subtotal=10000, total=10000
+            )
+            OrderItem.objects.create(order=order, product=product, quantity=1, price=10000)
+            self.orders[status] = order
+        Payment.objects.create(order=self.orders['delivered'], amount=10000, status='completed')
+        self.recent = Order.objects.create(
+            user=self.user, status='delivered', shipping_address={}, billing_address={}, subtotal=0, total=0
+        )
+        Order.objects.exclude(id=self.recent.id).update(updated_at=timezone.now() - timedelta(days=400))
+
+    def test_closed_orders_are_archived_in_batches(self):
+        out = io.StringIO()
+        call_command('archive_orders', dry_run=True, stdout=out)
+        self.assertIn('2 commande(s) à archiver', out.getvalue())
+
+        call_command('archive_orders', batch_size=1, stdout=out)
+        self.assertIn('2 commande(s) archivée(s)', out.getvalue())
+        self.assertEqual(
+            set(Order.objects.values_list('id', flat=True)),
+            {self.orders['processing'].id, self.recent.id}
+        )
+
+        delivered = self.orders['delivered']
+        snapshot = ArchivedOrder.objects.get(original_id=delivered.id).data
+        self.assertEqual(snapshot['order_number'], delivered.order_number)
+        self.assertEqual([item['product']['slug'] for item in snapshot['items']], ['chemise'])
+        self.assertEqual(snapshot['payment']['status'], 'completed')
+        self.assertFalse(Payment.objects.exists())
+
+    def test_order_reopened_after_selection_is_not_archived(self):
+        delivered, cancelled = self.orders['delivered'], self.orders['cancelled']
+        order_ids = list(archivable_orders(365).values_list('id', flat=True))
+        # Entre la sélection et le lot : une commande rouverte, une autre modifiée
+        Order.objects.filter(id=delivered.id).update(status='processing')
+        Order.objects.filter(id=cancelled.id).update(updated_at=timezone.now())
+
+        self.assertEqual(archive_batch(order_ids, 365), 0)
+        self.assertFalse(ArchivedOrder.objects.exists())
+        self.assertTrue(Payment.objects.filter(order=delivered).exists())
+
+    def test_archived_orders_stay_readable(self):
+        call_command('archive_orders', stdout=io.StringIO())
+        delivered = self.orders['delivered']
+
+        response = self.client.get(f'/api/orders/orders/{delivered.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['order_number'], response.data['archived']), (delivered.order_number, True))
+
+        response = self.client.get('/api/orders/orders/archived/')
+        self.assertEqual(
+            sorted(order['original_id'] for order in response.data['results']),
+            sorted([delivered.id, self.orders['cancelled'].id])
+        )
+
+        # Identifiant non numérique ou commande d'un autre client : 404, pas d'erreur serveur
+        self.assertEqual(self.client.get('/api/orders/orders/abc/').status_code, 404)
+        other = CustomUser.objects.create_user(email='autre@example.com', username='autre', password='x')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(f'/api/orders/orders/{delivered.id}/').status_code, 404)
@@ -1,11 +1,14 @@
 # backend/apps/orders/urls.py
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import OrderViewSet
+from .views import OrderViewSet, checkout_preview_view
 
 router = DefaultRouter()
 router.register(r'orders', OrderViewSet, basename='order')
 
 urlpatterns = [
     path('', include(router.urls)),
+
+    # Aperçu de commande (GET /api/orders/checkout/preview/?country=TG&shipping_method=3)
+    path('checkout/preview/', checkout_preview_view, name='checkout-preview'),
 ]
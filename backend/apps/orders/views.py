@@ -1,9 +1,13 @@
 from rest_framework import viewsets, status
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from .models import Order
-from .serializers import OrderSerializer, CreateOrderSerializer
+from django.http import Http404
+from .models import Order, ArchivedOrder
+from .checkout import checkout_preview
+from .serializers import (
+    OrderSerializer, CreateOrderSerializer, CheckoutPreviewRequestSerializer, CheckoutPreviewSerializer
+)
 
 
 class OrderViewSet(viewsets.ModelViewSet):
@@ -27,4 +31,51 @@ class OrderViewSet(viewsets.ModelViewSet):
             'order_id': order.id,
             'order_number': order.order_number,
             'message': 'Commande créée avec succès'
-        }, status=status.HTTP_201_CREATED)
\ No newline at end of file
+        }, status=status.HTTP_201_CREATED)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Repli sur l'archive si la commande a quitté les tables actives"""
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            try:
+                original_id = int(kwargs.get('pk'))
+            except (TypeError, ValueError):
+                raise Http404
+            archived = ArchivedOrder.objects.filter(
+                original_id=original_id,
+                user=request.user
+            ).values_list('data', flat=True).first()
+            if archived is None:
+                raise
+            return Response({**archived, 'archived': True})
+
+    @action(detail=False)
+    def archived(self, request):
+        """Lister les commandes archivées de l'utilisateur"""
+        queryset = ArchivedOrder.objects.filter(user=request.user).values(
+            'original_id', 'order_number', 'status', 'payment_status', 'total', 'created_at'
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(list(queryset))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def checkout_preview_view(request):
+    """
+    GET /api/orders/checkout/preview/?country=TG&shipping_method=3
+    Sous-total, options de livraison, taxe et total calculés côté serveur
+    pour le panier courant (totaux du panier en cache par version).
+    """
+    serializer = CheckoutPreviewRequestSerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+    country = serializer.validated_data['country']
+
+    preview = checkout_preview(request.user, country, serializer.validated_data.get('shipping_method'))
+    if preview is None:
+        return Response({'error': 'Panier vide'}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(CheckoutPreviewSerializer(preview).data)
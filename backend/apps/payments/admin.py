@@ -1,7 +1,13 @@
 # backend/apps/payments/admin.py
-from django.contrib import admin
+import json
+from collections import Counter
+
+from django.contrib import admin, messages
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
 from django.utils.html import format_html
-from .models import Payment
+from .models import Payment, PaymentLedgerEntry, PaymentPayload, WebhookEvent
 
 
 @admin.register(Payment)
@@ -36,7 +42,10 @@ class PaymentAdmin(admin.ModelAdmin):
         'phone_number'
     ]
 
+    # Statut et montant ne changent que par les actions, qui les inscrivent au journal
     readonly_fields = [
+        'status',
+        'amount',
         'identifier',
         'tx_reference',
         'payment_reference',
@@ -134,33 +143,31 @@ class PaymentAdmin(admin.ModelAdmin):
     status_display.short_description = 'Statut'
     status_display.admin_order_field = 'status'
 
+    def get_payload(self, obj):
+        """Données brutes chargées une seule fois, sur la page de détail uniquement"""
+        if not hasattr(obj, '_admin_payload'):
+            obj._admin_payload = PaymentPayload.objects.filter(payment=obj).first()
+        return obj._admin_payload
+
+    def json_preview(self, data):
+        if not data:
+            return "-"
+        return format_html(
+            '<pre style="background: #f4f4f4; padding: 10px; border-radius: 5px; overflow-x: auto;">{}</pre>',
+            json.dumps(data, indent=2, ensure_ascii=False)
+        )
+
     def raw_request_preview(self, obj):
         """Aperçu formaté de la requête brute"""
-        if obj.raw_request:
-            import json
-            try:
-                formatted_json = json.dumps(obj.raw_request, indent=2, ensure_ascii=False)
-                return format_html(
-                    '<pre style="background: #f4f4f4; padding: 10px; border-radius: 5px; overflow-x: auto;">{}</pre>',
-                    formatted_json)
-            except:
-                return str(obj.raw_request)
-        return "-"
+        payload = self.get_payload(obj)
+        return self.json_preview(payload and payload.request)
 
     raw_request_preview.short_description = "Requête PayGate (aperçu)"
 
     def raw_response_preview(self, obj):
         """Aperçu formaté de la réponse brute"""
-        if obj.raw_response:
-            import json
-            try:
-                formatted_json = json.dumps(obj.raw_response, indent=2, ensure_ascii=False)
-                return format_html(
-                    '<pre style="background: #f4f4f4; padding: 10px; border-radius: 5px; overflow-x: auto;">{}</pre>',
-                    formatted_json)
-            except:
-                return str(obj.raw_response)
-        return "-"
+        payload = self.get_payload(obj)
+        return self.json_preview(payload and payload.response)
 
     raw_response_preview.short_description = "Réponse PayGate (aperçu)"
 
@@ -181,6 +188,24 @@ class PaymentAdmin(admin.ModelAdmin):
         """Empêcher l'ajout manuel de paiements depuis l'admin"""
         return False
 
+    def changelist_view(self, request, extra_context=None):
+        """Signaler l'état du disjoncteur PayGate de ce processus"""
+        from .resilience import get_breaker
+        breaker = get_breaker()
+        breaker_state = breaker.state
+        if breaker_state == breaker.OPEN:
+            self.message_user(
+                request,
+                f"Disjoncteur PayGate ouvert : appels refusés pendant encore {round(breaker.retry_after())} s.",
+                messages.WARNING
+            )
+        elif breaker_state == breaker.HALF_OPEN:
+            self.message_user(request, "Disjoncteur PayGate semi-ouvert : appel d'essai en cours.", messages.INFO)
+
+        extra_context = extra_context or {}
+        extra_context['paygate_breaker_state'] = breaker_state
+        return super().changelist_view(request, extra_context=extra_context)
+
     def has_delete_permission(self, request, obj=None):
         """Empêcher la suppression de paiements depuis l'admin"""
         return False
@@ -198,37 +223,89 @@ class PaymentAdmin(admin.ModelAdmin):
     actions = ['check_payment_status', 'mark_as_completed', 'mark_as_failed']
 
     def check_payment_status(self, request, queryset):
-        """Action pour vérifier le statut des paiements sélectionnés"""
-        from .services import PayGateGlobalService
-        paygate_service = PayGateGlobalService()
-
-        updated_count = 0
-        for payment in queryset:
-            if payment.identifier or payment.tx_reference:
-                status_data = paygate_service.check_payment_status(
-                    payment.identifier,
-                    payment.tx_reference
-                )
-
-                if 'error' not in status_data:
-                    paygate_status = status_data.get('status')
-                    if paygate_status == 0 and payment.status != 'completed':
-                        payment.status = 'completed'
-                        payment.payment_reference = status_data.get('payment_reference', '')
-                        payment.payment_method_detail = status_data.get('payment_method', '')
-                        payment.save()
-                        updated_count += 1
+        """
+        Vérifier en parallèle le statut PayGate des paiements sélectionnés,
+        puis appliquer les changements (paiements et commandes) en une transaction,
+        sur les lignes relues verrouillées : un paiement modifié pendant les appels
+        (webhook, poller) est laissé tel quel
+        """
+        from apps.core.metrics import percentile
+        from .services import apply_status_results, check_statuses
+
+        payments = list(
+            queryset.prefetch_related(None).exclude(Q(identifier='') & Q(tx_reference=''))
+        )
+        results = check_statuses(payments)
+        changed = apply_status_results(
+            [(payment, status_data) for payment, status_data, _ in results], source='admin'
+        )
 
+        counts = Counter(payment.status for payment in changed)
+        errors = sum(1 for _, status_data, _ in results if 'error' in status_data)
+        if errors:
+            counts['erreur'] = errors
+        unchanged = len(results) - len(changed) - errors
+        if unchanged:
+            counts['inchangé'] = unchanged
+
+        durations = sorted(duration for _, _, duration in results)
+        summary = ', '.join(f"{label}: {count}" for label, count in sorted(counts.items()))
+        latency = (
+            f" — latence PayGate p50 {percentile(durations, 0.5) * 1000:.0f} ms, "
+            f"max {durations[-1] * 1000:.0f} ms" if durations else ''
+        )
         self.message_user(
             request,
-            f"Statut vérifié pour {updated_count} paiement(s)."
+            f"Statut vérifié pour {len(results)} paiement(s) ({summary or 'aucun'}){latency}.",
+            messages.WARNING if errors else messages.SUCCESS
         )
 
     check_payment_status.short_description = "✅ Vérifier le statut PayGate"
 
+    def mark_as(self, queryset, new_status):
+        """
+        Forcer un statut : une mise à jour groupée des paiements, les écritures
+        du journal et la mise à jour des commandes. Les paiements sont relus
+        verrouillés dans la transaction : un webhook arrivé entre la sélection
+        et l'action ne donne pas de seconde écriture au journal.
+        """
+        from apps.orders.models import Order
+        from .events import publish_status
+        from .ledger import record_transitions
+
+        now = timezone.now()
+        ids = list(queryset.values_list('id', flat=True))
+        with transaction.atomic():
+            payments = list(Payment.objects.select_for_update().filter(id__in=ids).exclude(status=new_status))
+            transitions = [(payment, payment.status) for payment in payments]
+            for payment in payments:
+                payment.status = new_status
+                payment.updated_at = now
+                if new_status == 'completed' and not payment.payment_date:
+                    payment.payment_date = now
+
+            Payment.objects.bulk_update(payments, ['status', 'payment_date', 'updated_at'])
+            record_transitions(transitions, 'admin')
+            if new_status == 'completed' and payments:
+                Order.objects.filter(id__in=[payment.order_id for payment in payments]).update(
+                    payment_status='paid',
+                    status='confirmed',
+                    updated_at=now
+                )
+            # Encaissement annulé : la commande n'est plus payée ni confirmée
+            reversed_order_ids = [payment.order_id for payment, previous in transitions if previous == 'completed']
+            if reversed_order_ids:
+                Order.objects.filter(id__in=reversed_order_ids).update(
+                    payment_status='failed',
+                    status=Case(When(status='confirmed', then=Value('pending')), default=F('status')),
+                    updated_at=now
+                )
+            publish_status(payments)
+        return len(payments)
+
     def mark_as_completed(self, request, queryset):
         """Marquer les paiements comme complétés (manuellement)"""
-        updated_count = queryset.update(status='completed')
+        updated_count = self.mark_as(queryset, 'completed')
         self.message_user(
             request,
             f"{updated_count} paiement(s) marqué(s) comme complété(s)."
@@ -238,7 +315,7 @@ class PaymentAdmin(admin.ModelAdmin):
 
     def mark_as_failed(self, request, queryset):
         """Marquer les paiements comme échoués (manuellement)"""
-        updated_count = queryset.update(status='failed')
+        updated_count = self.mark_as(queryset, 'failed')
         self.message_user(
             request,
             f"{updated_count} paiement(s) marqué(s) comme échoué(s)."
@@ -265,4 +342,36 @@ class PaymentAdmin(admin.ModelAdmin):
         return [
             'identifier', 'order__order_number', 'phone_number', 'network',
             'amount', 'currency', 'status', 'payment_date', 'created_at'
-        ]
\ No newline at end of file
+        ]
+
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    list_display = ['dedupe_key', 'attempts', 'error', 'received_at', 'next_attempt_at', 'processed_at']
+    list_filter = [('processed_at', admin.EmptyFieldListFilter), 'received_at']
+    search_fields = ['dedupe_key']
+    readonly_fields = ['dedupe_key', 'payload', 'attempts', 'error', 'received_at', 'next_attempt_at', 'processed_at']
+    ordering = ['-received_at']
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(PaymentLedgerEntry)
+class PaymentLedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ['identifier', 'source', 'previous_status', 'new_status', 'amount', 'created_at']
+    list_filter = ['source', 'new_status', 'created_at']
+    search_fields = ['identifier']
+    readonly_fields = [
+        'payment', 'identifier', 'source', 'previous_status', 'new_status', 'amount', 'created_at'
+    ]
+    ordering = ['-created_at']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
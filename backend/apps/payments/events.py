@@ -0,0 +1,54 @@
+# backend/apps/payments/events.py
+"""
+Diffusion locale des changements de statut de paiement.
+
+Le broker est propre au processus : les abonnés (flux SSE) sont réveillés
+immédiatement quand le changement a lieu dans le même processus. Les
+changements appliqués par d'autres processus (process_webhooks,
+run_payment_poller) sont vus par relecture périodique de la ligne locale.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+
+from django.db import transaction
+
+
+class PaymentStatusBroker:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)  # payment_id -> {(loop, queue)}
+
+    @asynccontextmanager
+    async def subscribe(self, payment_id):
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue())
+        with self._lock:
+            self._subscribers[payment_id].add(subscriber)
+        try:
+            yield subscriber[1]
+        finally:
+            with self._lock:
+                self._subscribers[payment_id].discard(subscriber)
+                if not self._subscribers[payment_id]:
+                    del self._subscribers[payment_id]
+
+    def publish(self, payment_id, status):
+        """Notifier les abonnés ; appelable depuis n'importe quel thread"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(payment_id, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(queue.put_nowait, status)
+
+
+broker = PaymentStatusBroker()
+
+
+def publish_status(payments):
+    """Publier le nouveau statut des paiements après validation de la transaction"""
+    changes = [(payment.id, payment.status) for payment in payments]
+    if changes:
+        transaction.on_commit(
+            lambda: [broker.publish(payment_id, status) for payment_id, status in changes]
+        )
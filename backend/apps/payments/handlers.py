@@ -0,0 +1,117 @@
+# backend/apps/payments/handlers.py
+"""
+Logique commune aux vues synchrones (PaymentViewSet, servies sous WSGI) et
+async (servies sous ASGI) des paiements : préparation du paiement, contrôle
+d'accès et mise en forme des réponses. Les vues ne gardent que
+l'authentification, l'appel PayGate et la construction de la réponse HTTP.
+"""
+from django.db import IntegrityError, transaction
+
+from apps.orders.models import Order
+from .models import Payment, generate_payment_identifier
+from .resilience import CircuitBreaker, get_breaker
+
+# Paiement existant repris par une nouvelle demande plutôt que recréé (OneToOne sur la commande)
+REUSABLE_STATUSES = ('pending', 'failed', 'cancelled')
+
+ALREADY_PAID = 'Un paiement réussi existe déjà pour cette commande'
+IN_PROGRESS = 'Un paiement est déjà en cours pour cette commande'
+
+
+def prepare_payment(user, validated_data):
+    """
+    Paiement à lancer pour la commande : (paiement, None), ou
+    (None, (corps, statut HTTP)) si la commande ne peut pas être payée.
+    """
+    order = Order.objects.filter(id=validated_data['order_id'], user=user).first()
+    if order is None:
+        return None, ({'error': 'Commande non trouvée'}, 404)
+    if order.payment_status == 'paid':
+        return None, ({'error': 'Cette commande a déjà été payée'}, 400)
+
+    fields = {
+        'phone_number': validated_data['phone_number'],
+        'network': validated_data['network'],
+        'amount': order.total,
+        'description': validated_data.get('description', ''),
+        'currency': 'XOF',
+    }
+    try:
+        with transaction.atomic():
+            payment = Payment.objects.select_for_update().filter(order=order).first()
+            if payment is None:
+                payment = Payment.objects.create(order=order, **fields)
+            elif payment.status in REUSABLE_STATUSES:
+                # Nouvel identifiant : PayGate refuse un identifiant déjà reçu (doublon)
+                fields.update(identifier=generate_payment_identifier(), tx_reference='', error_message='')
+                for field, value in fields.items():
+                    setattr(payment, field, value)
+                payment.save(update_fields=[*fields, 'updated_at'])
+            elif payment.status in ('completed', 'refunded'):
+                return None, ({'error': ALREADY_PAID}, 400)
+            else:
+                return None, ({'error': IN_PROGRESS}, 400)
+    except IntegrityError:
+        # Demande simultanée pour la même commande
+        return None, ({'error': IN_PROGRESS}, 400)
+
+    # Évite un accès paresseux à la commande depuis une vue async
+    payment.order = order
+    return payment, None
+
+
+def paygate_unavailable():
+    """
+    Résultat d'indisponibilité si le disjoncteur est ouvert : vérifié avant de
+    préparer un paiement direct, pour ne pas l'enregistrer en échec sans appel
+    """
+    breaker = get_breaker()
+    if breaker.state != CircuitBreaker.OPEN:
+        return None
+    return {
+        'success': False,
+        'error': 'Service de paiement temporairement indisponible',
+        'unavailable': True,
+        'retry_after': breaker.retry_after(),
+    }
+
+
+def redirect_body(payment, payment_url):
+    return {
+        'success': True,
+        'payment_id': payment.id,
+        'identifier': payment.identifier,
+        'payment_url': payment_url,
+        'method': 'redirect',
+        'message': 'Redirigez vers la page de paiement'
+    }
+
+
+def direct_result(payment, result):
+    """Corps et statut HTTP d'un paiement direct (l'indisponibilité, 503, est traitée par la vue)"""
+    if result['success']:
+        return {
+            'success': True,
+            'payment_id': payment.id,
+            'identifier': payment.identifier,
+            'tx_reference': result['tx_reference'],
+            'method': 'direct',
+            'message': result['message']
+        }, 200
+    return {
+        'success': False,
+        'error': result['error'],
+        'status_code': result.get('status_code')
+    }, 400
+
+
+def paygate_result(data):
+    """Corps et statut HTTP d'une réponse de statut ou de solde"""
+    if 'error' in data:
+        return {'error': data['error']}, 400
+    return data, 200
+
+
+def can_check_status(user, identifier):
+    """Un statut demandé par identifiant doit concerner un paiement de l'utilisateur"""
+    return not identifier or Payment.objects.filter(identifier=identifier, order__user=user).exists()
@@ -0,0 +1,30 @@
+# backend/apps/payments/hot_queries.py
+from apps.core.query_plans import register
+from .models import Payment
+from .reconciliation import pending_payments as reconciliation_pending
+
+
+@register('payments.by_user')
+def payments_by_user():
+    """PaymentViewSet.get_queryset"""
+    return Payment.objects.filter(order__user_id=1).select_related(
+        'order', 'order__user'
+    ).order_by('-order__created_at')
+
+
+@register('payments.pending')
+def pending_payments():
+    """Découverte du poller et lots de reconcile_payments"""
+    return reconciliation_pending()
+
+
+@register('payments.by_identifier')
+def payment_by_identifier():
+    """Webhook PayGate et check_status"""
+    return Payment.objects.filter(identifier='PAY0000000000000000000')
+
+
+@register('payments.by_tx_reference')
+def payment_by_tx_reference():
+    """Recherche par référence PayGate"""
+    return Payment.objects.filter(tx_reference='0')
@@ -0,0 +1,197 @@
+# backend/apps/payments/inbox.py
+import hashlib
+import json
+import logging
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from apps.core import metrics
+from apps.orders.models import Order
+from .models import Payment, PaymentPayload, WebhookEvent
+from .events import publish_status
+from .ledger import record_transitions
+from .services import (
+    WEBHOOK_UPDATE_FIELDS, apply_webhook, check_statuses, missing_webhook_field, save_payloads
+)
+
+logger = logging.getLogger(__name__)
+
+# Au-delà, l'événement reste en erreur et n'est plus repris
+MAX_ATTEMPTS = 8
+
+
+def dedupe_key(webhook_data):
+    """
+    Référence de transaction et empreinte du payload : les renvois identiques
+    de PayGate sont dédupliqués, mais un faux webhook portant une vraie
+    référence n'empêche pas d'enregistrer le vrai
+    """
+    payload = json.dumps(webhook_data, sort_keys=True, separators=(',', ':'), default=str)
+    digest = hashlib.sha256(payload.encode()).hexdigest()[:40]
+    return f"{str(webhook_data['tx_reference'])[:40]}:{digest}"
+
+
+def enqueue_webhook(webhook_data):
+    """
+    Enregistrer le webhook en une insertion. Les renvois de PayGate pour la
+    même transaction sont ignorés grâce à la clé de déduplication.
+    Retourne False si le payload est inexploitable.
+    """
+    if not webhook_data.get('tx_reference'):
+        return False
+
+    WebhookEvent.objects.bulk_create(
+        [WebhookEvent(dedupe_key=dedupe_key(webhook_data), payload=webhook_data)],
+        ignore_conflicts=True
+    )
+    metrics.increment('webhook.received')
+    return True
+
+
+def pending_events(now=None):
+    """Événements à traiter, dont le délai avant nouvelle tentative est écoulé"""
+    return WebhookEvent.objects.filter(
+        processed_at__isnull=True,
+        next_attempt_at__lte=now or timezone.now(),
+        attempts__lt=MAX_ATTEMPTS
+    ).order_by('next_attempt_at')
+
+
+def retry_delay(attempts):
+    """Backoff exponentiel : WEBHOOK_RETRY_BACKOFF, puis le double à chaque essai, plafonné"""
+    delay = settings.WEBHOOK_RETRY_BACKOFF * (2 ** (attempts - 1))
+    return timedelta(seconds=min(delay, settings.WEBHOOK_RETRY_MAX_DELAY))
+
+
+def verification_error(payment, webhook_data, status_data):
+    """
+    Le webhook n'est pas authentifié : le paiement n'est complété que si
+    PayGate confirme la transaction et que le montant correspond.
+    Retourne (erreur, à réessayer), ou (None, False) si le webhook est confirmé.
+    """
+    if not status_data or 'error' in status_data:
+        return 'Vérification PayGate impossible', True
+    if status_data.get('status') == 2:
+        return 'Paiement pas encore confirmé par PayGate', True
+    if status_data.get('status') != 0:
+        return f"Paiement non confirmé par PayGate (statut {status_data.get('status')})", False
+    if status_data.get('tx_reference') and str(status_data['tx_reference']) != str(webhook_data['tx_reference']):
+        return 'Référence de transaction différente de celle de PayGate', False
+    try:
+        amount_matches = Decimal(str(webhook_data['amount'])) == payment.amount
+    except InvalidOperation:
+        amount_matches = False
+    if not amount_matches:
+        return 'Montant différent de celui du paiement', False
+    return None, False
+
+
+def verify_payments(events):
+    """
+    Statut PayGate des paiements visés par les événements, demandé hors
+    transaction (aucun verrou pendant les appels) : {identifier: réponse}
+    """
+    identifiers = {
+        event.payload.get('identifier') for event in events
+        if not missing_webhook_field(event.payload)
+    }
+    payments = Payment.objects.filter(identifier__in=identifiers).exclude(status='completed')
+    return {payment.identifier: status_data for payment, status_data, _ in check_statuses(payments)}
+
+
+def process_batch(batch_size=100):
+    """
+    Traiter un lot d'événements. Les paiements visés sont d'abord vérifiés
+    auprès de PayGate ; les lignes verrouillées par un autre worker sont
+    sautées (skip_locked) ; les mises à jour sont idempotentes.
+    Retourne le nombre d'événements traités.
+    """
+    now = timezone.now()
+    candidates = list(pending_events(now)[:batch_size])
+    if not candidates:
+        return 0
+    statuses = verify_payments(candidates)
+
+    with transaction.atomic():
+        events = list(
+            pending_events(now).filter(id__in=[event.id for event in candidates]).select_for_update(skip_locked=True)
+        )
+        if not events:
+            return 0
+
+        identifiers = [event.payload.get('identifier') for event in events]
+        payments = Payment.objects.select_for_update().in_bulk(
+            [identifier for identifier in identifiers if identifier],
+            field_name='identifier'
+        )
+
+        changed = {}
+        payloads = []
+        transitions = []
+        rejected = []
+        for event in events:
+            event.attempts += 1
+            missing_field = missing_webhook_field(event.payload)
+            payment = payments.get(event.payload.get('identifier'))
+
+            if missing_field:
+                # Payload invalide : inutile de réessayer
+                event.error = f'Champ manquant: {missing_field}'
+                event.processed_at = now
+            elif payment is None:
+                event.error = 'Paiement non trouvé'
+            elif payment.status == 'completed':
+                # Renvoi pour un paiement déjà confirmé
+                event.error = ''
+                event.processed_at = now
+            else:
+                error, retry = verification_error(payment, event.payload, statuses.get(payment.identifier))
+                if error:
+                    event.error = error
+                    if not retry:
+                        event.processed_at = now
+                        rejected.append(event)
+                    continue
+
+                previous_status = payment.status
+                if apply_webhook(payment, event.payload):
+                    transitions.append((payment, previous_status))
+                    changed[payment.id] = payment
+                    payloads.append(PaymentPayload(payment=payment, response=event.payload))
+                event.error = ''
+                event.processed_at = now
+
+        for event in events:
+            if event.processed_at is None:
+                # Erreur temporaire (paiement pas encore enregistré, PayGate injoignable)
+                event.next_attempt_at = now + retry_delay(event.attempts)
+
+        Payment.objects.bulk_update(changed.values(), WEBHOOK_UPDATE_FIELDS)
+        if changed:
+            save_payloads(payloads, ['response'])
+            record_transitions(transitions, 'webhook')
+            Order.objects.filter(id__in=[payment.order_id for payment in changed.values()]).update(
+                payment_status='paid',
+                status='confirmed',
+                updated_at=now
+            )
+        WebhookEvent.objects.bulk_update(events, ['attempts', 'error', 'next_attempt_at', 'processed_at'])
+        publish_status(changed.values())
+
+    for event in rejected:
+        logger.warning(
+            "Webhook PayGate rejeté %s: %s", event.payload.get('tx_reference'), event.error,
+            extra={'identifier': event.payload.get('identifier')}
+        )
+    failed = sum(1 for event in events if event.error)
+    metrics.increment('webhook.processed', len(events) - failed)
+    if rejected:
+        metrics.increment('webhook.rejected', len(rejected))
+    if failed:
+        metrics.increment('webhook.error', failed)
+        logger.warning("%s webhook(s) en erreur sur %s", failed, len(events))
+    return len(events)
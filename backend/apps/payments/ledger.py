@@ -0,0 +1,121 @@
+# backend/apps/payments/ledger.py
+"""
+Journal des paiements et rapprochement avec l'export PayGate.
+
+Le rapprochement est une fusion de deux flux triés par identifier : totaux
+du journal (avec le total de la commande) lus par curseur, et lignes du
+fichier d'export lues une à une. La mémoire reste constante quel que soit
+le volume.
+"""
+import csv
+from decimal import Decimal, InvalidOperation
+from itertools import groupby
+
+from django.db.models import Max, Sum
+
+from .models import PaymentLedgerEntry
+
+
+def ledger_entry(payment, previous_status, source):
+    """Écriture correspondant au passage de previous_status au statut courant"""
+    if payment.status == 'completed' and previous_status != 'completed':
+        amount = payment.amount
+    elif previous_status == 'completed' and payment.status != 'completed':
+        amount = -payment.amount
+    else:
+        amount = 0
+
+    return PaymentLedgerEntry(
+        payment=payment,
+        identifier=payment.identifier,
+        source=source,
+        previous_status=previous_status,
+        new_status=payment.status,
+        amount=amount
+    )
+
+
+def record_transitions(changes, source):
+    """Journaliser en une insertion des couples (paiement, statut précédent)"""
+    entries = [
+        ledger_entry(payment, previous_status, source)
+        for payment, previous_status in changes
+        if payment.status != previous_status
+    ]
+    PaymentLedgerEntry.objects.bulk_create(entries)
+    return entries
+
+
+def ledger_totals(chunk_size=2000, using='default'):
+    """
+    Total encaissé par identifier, avec le total de la commande, trié par identifier.
+    Sur la base principale par défaut : le retard d'une réplique apparaîtrait comme des écarts.
+    """
+    return (
+        PaymentLedgerEntry.objects.using(using)
+        .values('identifier')
+        .annotate(ledger_total=Sum('amount'), order_total=Max('payment__order__total'))
+        .order_by('identifier')
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def read_export(lines, identifier_column='identifier', amount_column='amount'):
+    """
+    Lignes de l'export PayGate (CSV trié par identifier), regroupées par
+    identifier : couples (identifier, montant total).
+    """
+    rows = csv.DictReader(lines)
+    for identifier, group in groupby(rows, key=lambda row: row[identifier_column]):
+        total = Decimal(0)
+        for row in group:
+            try:
+                total += Decimal(row[amount_column])
+            except InvalidOperation:
+                raise ValueError(f"Montant invalide pour {identifier}: {row[amount_column]!r}")
+        yield identifier, total
+
+
+def _ascending(pairs, label):
+    previous = None
+    for pair in pairs:
+        if previous is not None and pair[0] <= previous:
+            raise ValueError(f"{label} non trié par identifier ({previous!r} puis {pair[0]!r})")
+        previous = pair[0]
+        yield pair
+
+
+def reconcile_with_export(ledger_rows, export_rows):
+    """
+    Fusion ordonnée du journal et de l'export. Produit les écarts sous la forme
+    (identifier, anomalie, total journal, total export, total commande).
+    """
+    ledger_rows = _ascending(
+        ((row['identifier'], row['ledger_total'], row['order_total']) for row in ledger_rows),
+        'Journal'
+    )
+    export_rows = _ascending(export_rows, 'Export')
+
+    ledger = next(ledger_rows, None)
+    export = next(export_rows, None)
+
+    while ledger is not None or export is not None:
+        if export is None or (ledger is not None and ledger[0] < export[0]):
+            identifier, ledger_total, order_total = ledger
+            if ledger_total:
+                yield identifier, 'absent_export', ledger_total, None, order_total
+            ledger = next(ledger_rows, None)
+            continue
+
+        if ledger is None or export[0] < ledger[0]:
+            yield export[0], 'absent_journal', None, export[1], None
+            export = next(export_rows, None)
+            continue
+
+        identifier, ledger_total, order_total = ledger
+        if ledger_total != export[1]:
+            yield identifier, 'montant_different', ledger_total, export[1], order_total
+        elif order_total is not None and ledger_total and ledger_total != order_total:
+            yield identifier, 'total_commande', ledger_total, export[1], order_total
+        ledger = next(ledger_rows, None)
+        export = next(export_rows, None)
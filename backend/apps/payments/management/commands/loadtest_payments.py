@@ -0,0 +1,135 @@
+# backend/apps/payments/management/commands/loadtest_payments.py
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.metrics import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        "Test de charge du parcours commande → paiement → webhook contre une API "
+        "en cours d'exécution (backend pointé sur run_paygate_simulator, "
+        "process_webhooks lancé)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--email', required=True, help="Compte client utilisé pour les commandes")
+        parser.add_argument('--password', required=True)
+        parser.add_argument('--product', type=int, required=True, help="ID du produit commandé")
+        parser.add_argument('--shipping-method', type=int, required=True, help="ID du mode de livraison")
+        parser.add_argument('--amount', default='1000.00', help="Prix unitaire et total de chaque commande")
+        parser.add_argument('--network', default='FLOOZ', choices=['FLOOZ', 'TMONEY'])
+        parser.add_argument('--phone', default='+22890123456')
+        parser.add_argument('--flows', type=int, default=100, help="Nombre de parcours complets")
+        parser.add_argument('--concurrency', type=int, default=10, help="Parcours simultanés")
+        parser.add_argument('--confirm-timeout', type=float, default=30.0,
+                            help="Attente maximale de la confirmation par webhook (secondes)")
+        parser.add_argument('--poll-interval', type=float, default=0.25,
+                            help="Intervalle de lecture du statut local (secondes)")
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.base_url = options['base_url'].rstrip('/')
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.outcomes = Counter()
+
+        self.token = self.login()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            for outcome in executor.map(lambda _: self.run_flow(), range(options['flows'])):
+                self.outcomes[outcome] += 1
+        elapsed = time.perf_counter() - started
+
+        self.report(elapsed)
+
+    def session(self):
+        """Une session HTTP (connexions réutilisées) par thread"""
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+            self.local.session.headers['Authorization'] = f'Bearer {self.token}'
+        return self.local.session
+
+    def login(self):
+        response = requests.post(f'{self.base_url}/api/auth/login/', json={
+            'email': self.options['email'],
+            'password': self.options['password'],
+        }, timeout=10)
+        if response.status_code != 200:
+            raise CommandError(f"Connexion impossible ({response.status_code}): {response.text[:200]}")
+        return response.json()['access']
+
+    def timed(self, step, method, path, **kwargs):
+        start = time.perf_counter()
+        response = self.session().request(method, f'{self.base_url}{path}', timeout=30, **kwargs)
+        with self.lock:
+            self.latencies[step].append(time.perf_counter() - start)
+        return response
+
+    def run_flow(self):
+        """Un parcours complet ; retourne son issue"""
+        amount = self.options['amount']
+        flow_start = time.perf_counter()
+        try:
+            response = self.timed('order', 'post', '/api/orders/orders/', json={
+                'shipping_address': {'address': 'Test de charge', 'city': 'Lomé', 'country': 'TG'},
+                'billing_address': {'address': 'Test de charge', 'city': 'Lomé', 'country': 'TG'},
+                'shipping_method': self.options['shipping_method'],
+                'payment_method': self.options['network'].lower(),
+                'items': [{'product': self.options['product'], 'quantity': 1, 'price': amount}],
+                'subtotal': amount,
+                'total': amount,
+            })
+            if response.status_code != 201:
+                return f'order_{response.status_code}'
+
+            response = self.timed('initiate', 'post', '/api/payments/mobile-payment/initiate/', json={
+                'order_id': response.json()['order_id'],
+                'phone_number': self.options['phone'],
+                'network': self.options['network'],
+            })
+            if response.status_code != 200 or not response.json().get('success'):
+                return f'initiate_{response.status_code}'
+            payment_id = response.json()['payment_id']
+
+            # Attendre la confirmation : simulateur -> webhook -> process_webhooks
+            deadline = time.monotonic() + self.options['confirm_timeout']
+            while time.monotonic() < deadline:
+                response = self.timed('status', 'get', f'/api/payments/payments/{payment_id}/status/')
+                if response.status_code == 200 and response.json().get('local_status') in ('completed', 'failed'):
+                    with self.lock:
+                        self.latencies['confirmed'].append(time.perf_counter() - flow_start)
+                    return response.json()['local_status']
+                time.sleep(self.options['poll_interval'])
+            return 'timeout'
+        except requests.RequestException as e:
+            return type(e).__name__
+
+    def report(self, elapsed):
+        completed = self.outcomes.get('completed', 0)
+        self.stdout.write(self.style.SUCCESS(
+            f"{self.options['flows']} parcours en {elapsed:.1f}s — "
+            f"{completed / elapsed:.2f} paiements confirmés/s"
+        ))
+        self.stdout.write("Issues : " + ', '.join(
+            f"{outcome}: {count}" for outcome, count in self.outcomes.most_common()
+        ))
+
+        self.stdout.write(f"{'étape':<10} {'n':>6} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+        for step in ('order', 'initiate', 'status', 'confirmed'):
+            samples = sorted(self.latencies.get(step, []))
+            if not samples:
+                continue
+            self.stdout.write(
+                f"{step:<10} {len(samples):>6} {len(samples) / elapsed:>8.1f} "
+                f"{percentile(samples, 0.50) * 1000:>9.1f} {percentile(samples, 0.95) * 1000:>9.1f} "
+                f"{percentile(samples, 0.99) * 1000:>9.1f} {samples[-1] * 1000:>9.1f}"
+            )
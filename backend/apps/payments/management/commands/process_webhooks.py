@@ -0,0 +1,47 @@
+# backend/apps/payments/management/commands/process_webhooks.py
+import logging
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.payments.inbox import process_batch
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Traiter les webhooks PayGate en attente dans la boîte de réception"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--idle-sleep', type=float, default=0.5,
+                            help="Pause (secondes) quand la boîte de réception est vide")
+        parser.add_argument('--once', action='store_true',
+                            help="Vider la boîte de réception puis s'arrêter")
+
+    def handle(self, *args, **options):
+        self.running = True
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        total = 0
+        while self.running:
+            close_old_connections()
+            try:
+                processed = process_batch(options['batch_size'])
+            except Exception:
+                logger.exception("Erreur lors du traitement d'un lot de webhooks")
+                processed = 0
+            total += processed
+
+            if not processed:
+                if options['once']:
+                    break
+                time.sleep(options['idle_sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f"{total} webhook(s) traité(s)"))
+
+    def stop(self, *args):
+        self.running = False
@@ -0,0 +1,49 @@
+# backend/apps/payments/management/commands/reconcile_ledger.py
+import csv
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.payments.ledger import ledger_totals, read_export, reconcile_with_export
+
+
+class Command(BaseCommand):
+    help = (
+        "Rapprocher le journal des paiements, l'export PayGate et le total des "
+        "commandes en une passe (fichier d'export trié par identifier)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('export', help="Export PayGate au format CSV, trié par identifier")
+        parser.add_argument('--identifier-column', default='identifier')
+        parser.add_argument('--amount-column', default='amount')
+        parser.add_argument('--output', help="Fichier CSV des écarts (défaut: sortie standard)")
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help="Lignes du journal lues par aller-retour en base")
+        parser.add_argument('--database', default='default',
+                            help="Base lue (une réplique en retard produit de faux écarts)")
+
+    def handle(self, *args, **options):
+        counts = Counter()
+        output = open(options['output'], 'w', newline='') if options['output'] else None
+        try:
+            writer = csv.writer(output or self.stdout)
+            writer.writerow(['identifier', 'anomalie', 'total_journal', 'total_export', 'total_commande'])
+
+            with open(options['export'], newline='') as export_file:
+                mismatches = reconcile_with_export(
+                    ledger_totals(chunk_size=options['chunk_size'], using=options['database']),
+                    read_export(export_file, options['identifier_column'], options['amount_column'])
+                )
+                for mismatch in mismatches:
+                    counts[mismatch[1]] += 1
+                    writer.writerow(mismatch)
+        except (OSError, KeyError, ValueError) as e:
+            raise CommandError(f"Rapprochement interrompu: {e}")
+        finally:
+            if output:
+                output.close()
+
+        summary = ', '.join(f"{anomaly}: {count}" for anomaly, count in sorted(counts.items()))
+        # Résumé sur stderr : stdout peut porter le CSV des écarts
+        self.stderr.write(f"{sum(counts.values())} écart(s){' — ' + summary if summary else ''}")
@@ -0,0 +1,38 @@
+# backend/apps/payments/management/commands/reconcile_payments.py
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from apps.payments.reconciliation import pending_payments, reconcile
+
+
+class Command(BaseCommand):
+    help = "Vérifier auprès de PayGate le statut des paiements initiés ou en traitement"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=None,
+                            help="Requêtes PayGate simultanées (défaut: PAYGATE_ASYNC_CONCURRENCY)")
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Paiements vérifiés puis enregistrés par lot")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        checked = 0
+        changes = Counter()
+        last_id = 0
+
+        while True:
+            # Pagination par clé : les paiements modifiés quittent le filtre
+            batch = list(
+                pending_payments().filter(id__gt=last_id).order_by('id')[:batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1].id
+            checked += len(batch)
+
+            for payment in reconcile(batch, concurrency=options['concurrency']):
+                changes[payment.status] += 1
+
+        summary = ', '.join(f"{status}: {count}" for status, count in sorted(changes.items())) or 'aucun changement'
+        self.stdout.write(self.style.SUCCESS(f"{checked} paiement(s) vérifié(s) — {summary}"))
@@ -0,0 +1,61 @@
+# backend/apps/payments/management/commands/run_paygate_simulator.py
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.payments.simulator import PayGateSimulator
+
+
+class Command(BaseCommand):
+    help = "Lancer un simulateur PayGate local (tests de charge sans le vrai fournisseur)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8900)
+        parser.add_argument('--latency', type=float, default=0.2,
+                            help="Latence moyenne de chaque réponse (secondes)")
+        parser.add_argument('--jitter', type=float, default=0.5,
+                            help="Variation de la latence, en fraction de la moyenne")
+        parser.add_argument('--error-rate', type=float, default=0.0,
+                            help="Part des requêtes répondues en HTTP 500")
+        parser.add_argument('--failure-rate', type=float, default=0.0,
+                            help="Part des paiements qui expirent au lieu d'aboutir")
+        parser.add_argument('--confirm-delay', type=float, default=2.0,
+                            help="Délai avant confirmation d'un paiement et appel du webhook (secondes)")
+        parser.add_argument('--callback-url', default='http://127.0.0.1:8000/api/payments/webhook/',
+                            help="URL du webhook appelée à la confirmation (vide pour désactiver)")
+
+    def handle(self, *args, **options):
+        simulator = PayGateSimulator(
+            host=options['host'],
+            port=options['port'],
+            auth_token=settings.PAYGATE_API_KEY,
+            latency=options['latency'],
+            jitter=options['jitter'],
+            error_rate=options['error_rate'],
+            failure_rate=options['failure_rate'],
+            confirm_delay=options['confirm_delay'],
+            callback_url=options['callback_url'] or None,
+        )
+        # serve_forever tourne dans ce thread : SIGTERM est traité comme Ctrl+C
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+        base_url = simulator.base_url
+        self.stdout.write(self.style.SUCCESS(f"Simulateur PayGate sur {base_url}"))
+        self.stdout.write("Pointer le backend dessus avec :")
+        for name, path in (
+            ('PAYGATE_API_URL', '/api/v1/pay'),
+            ('PAYGATE_STATUS_URL', '/api/v1/status'),
+            ('PAYGATE_STATUS_V2_URL', '/api/v2/status'),
+            ('PAYGATE_BALANCE_URL', '/api/v1/check-balance'),
+        ):
+            self.stdout.write(f"  {name}={base_url}{path}")
+
+        try:
+            simulator.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            simulator.server.server_close()
+            simulator.callbacks.close()
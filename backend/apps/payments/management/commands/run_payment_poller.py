@@ -0,0 +1,28 @@
+# backend/apps/payments/management/commands/run_payment_poller.py
+from django.core.management.base import BaseCommand
+
+from apps.payments.reconciliation import PaymentPoller
+
+
+class Command(BaseCommand):
+    help = "Processus long qui interroge PayGate pour les paiements initiés (backoff selon l'âge)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-interval', type=float, default=None)
+        parser.add_argument('--max-interval', type=float, default=None)
+        parser.add_argument('--expiry', type=float, default=None,
+                            help="Âge (secondes) au-delà duquel un paiement n'est plus interrogé")
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--concurrency', type=int, default=None)
+
+    def handle(self, *args, **options):
+        poller = PaymentPoller(
+            base_interval=options['base_interval'],
+            max_interval=options['max_interval'],
+            expiry=options['expiry'],
+            batch_size=options['batch_size'],
+            concurrency=options['concurrency'],
+        )
+        self.stdout.write("Interrogation des paiements PayGate démarrée")
+        poller.run_forever()
+        self.stdout.write("Interrogation arrêtée")
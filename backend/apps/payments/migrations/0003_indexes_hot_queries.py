@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 13:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_indexes_hot_queries'),
+        ('payments', '0002_rename_auth_code_payment_identifier_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['status', 'created_at'], name='payment_status_created_idx'),
+        ),
+    ]
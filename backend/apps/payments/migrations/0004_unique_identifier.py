@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-19 13:09
+
+import apps.payments.models
+from django.db import migrations, models
+from apps.payments.models import generate_payment_identifier
+
+
+def assign_missing_identifiers(apps, schema_editor):
+    """Attribuer un identifiant aux paiements vides ou en doublon avant la contrainte unique"""
+    Payment = apps.get_model('payments', 'Payment')
+    seen = set()
+    for payment in Payment.objects.order_by('id').only('id', 'identifier').iterator():
+        if payment.identifier and payment.identifier not in seen:
+            seen.add(payment.identifier)
+            continue
+        identifier = generate_payment_identifier()
+        Payment.objects.filter(pk=payment.pk).update(identifier=identifier)
+        seen.add(identifier)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_indexes_hot_queries'),
+    ]
+
+    operations = [
+        migrations.RunPython(assign_missing_identifiers, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='payment',
+            name='identifier',
+            field=models.CharField(default=apps.payments.models.generate_payment_identifier, editable=False, max_length=100, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='tx_reference',
+            field=models.CharField(blank=True, db_index=True, max_length=100),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2.8 on 2026-10-19 13:20
+
+import apps.payments.models
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Q
+
+BATCH_SIZE = 500
+
+
+def move_payloads(apps, schema_editor):
+    """Copier raw_request / raw_response vers PaymentPayload, par lots"""
+    Payment = apps.get_model('payments', 'Payment')
+    PaymentPayload = apps.get_model('payments', 'PaymentPayload')
+    with_payload = Payment.objects.filter(Q(raw_request__isnull=False) | Q(raw_response__isnull=False))
+
+    last_id = 0
+    while True:
+        batch = list(
+            with_payload.filter(id__gt=last_id).order_by('id')
+            .values_list('id', 'raw_request', 'raw_response')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        last_id = batch[-1][0]
+        PaymentPayload.objects.bulk_create([
+            PaymentPayload(payment_id=payment_id, request=raw_request, response=raw_response)
+            for payment_id, raw_request, raw_response in batch
+        ])
+
+
+def restore_payloads(apps, schema_editor):
+    Payment = apps.get_model('payments', 'Payment')
+    PaymentPayload = apps.get_model('payments', 'PaymentPayload')
+
+    last_id = 0
+    while True:
+        batch = list(PaymentPayload.objects.filter(payment_id__gt=last_id).order_by('payment_id')[:BATCH_SIZE])
+        if not batch:
+            break
+        last_id = batch[-1].payment_id
+        Payment.objects.bulk_update([
+            Payment(id=payload.payment_id, raw_request=payload.request, raw_response=payload.response)
+            for payload in batch
+        ], ['raw_request', 'raw_response'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0005_webhookevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentPayload',
+            fields=[
+                ('payment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='payload', serialize=False, to='payments.payment')),
+                ('request', apps.payments.models.CompressedJSONField(null=True)),
+                ('response', apps.payments.models.CompressedJSONField(null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Données PayGate brutes',
+                'verbose_name_plural': 'Données PayGate brutes',
+            },
+        ),
+        migrations.RunPython(move_payloads, restore_payloads),
+        migrations.RemoveField(
+            model_name='payment',
+            name='raw_request',
+        ),
+        migrations.RemoveField(
+            model_name='payment',
+            name='raw_response',
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-19 13:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0006_paymentpayload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('identifier', models.CharField(max_length=100)),
+                ('source', models.CharField(choices=[('api', 'API'), ('webhook', 'Webhook PayGate'), ('poll', 'Interrogation PayGate'), ('admin', 'Administration')], max_length=10)),
+                ('previous_status', models.CharField(choices=[('pending', 'En attente'), ('initiated', 'Initiated'), ('processing', 'En traitement'), ('completed', 'Complétée'), ('failed', 'Échouée'), ('refunded', 'Remboursée'), ('cancelled', 'Annulée')], max_length=20)),
+                ('new_status', models.CharField(choices=[('pending', 'En attente'), ('initiated', 'Initiated'), ('processing', 'En traitement'), ('completed', 'Complétée'), ('failed', 'Échouée'), ('refunded', 'Remboursée'), ('cancelled', 'Annulée')], max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('payment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='payments.payment')),
+            ],
+            options={
+                'verbose_name': 'Écriture de paiement',
+                'verbose_name_plural': 'Journal des paiements',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['identifier', 'created_at'], name='ledger_identifier_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_indexes_hot_queries'),
+        ('payments', '0008_webhookevent_next_attempt_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='payment',
+            name='tx_reference',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['tx_reference', '-created_at'], name='payment_tx_created_idx'),
+        ),
+    ]
@@ -1,8 +1,51 @@
 # backend/apps/payments/models.py
+import json
+import secrets
+import time
+import zlib
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
 from django.core.validators import MinValueValidator
 from apps.orders.models import Order
 
+BASE36 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+
+def _base36(value, width):
+    digits = []
+    for _ in range(width):
+        value, remainder = divmod(value, 36)
+        digits.append(BASE36[remainder])
+    return ''.join(reversed(digits))
+
+
+def generate_payment_identifier():
+    """
+    Identifiant unique ordonné dans le temps : PAY + millisecondes (9 car. base36)
+    + 10 caractères aléatoires (~51 bits), sans coordination entre processus.
+    """
+    timestamp = _base36(time.time_ns() // 1_000_000, 9)
+    suffix = ''.join(secrets.choice(BASE36) for _ in range(10))
+    return f"PAY{timestamp}{suffix}"
+
+
+class CompressedJSONField(models.BinaryField):
+    """JSON stocké compressé (zlib) ; lu et écrit comme un JSONField"""
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return None
+        return json.loads(zlib.decompress(bytes(value)))
+
+    def to_python(self, value):
+        return value
+
+    def get_prep_value(self, value):
+        if value is None:
+            return None
+        return zlib.compress(json.dumps(value, cls=DjangoJSONEncoder, ensure_ascii=False).encode())
+
 
 class Payment(models.Model):
     STATUS_CHOICES = [
@@ -30,7 +73,9 @@ class Payment(models.Model):
 
     # Identifiants PayGate Global
     tx_reference = models.CharField(max_length=100, blank=True)  # Référence PayGate
-    identifier = models.CharField(max_length=100, blank=True)  # Notre référence unique
+    identifier = models.CharField(
+        max_length=100, unique=True, editable=False, default=generate_payment_identifier
+    )  # Notre référence unique
     payment_reference = models.CharField(max_length=100, blank=True)  # Référence Flooz/T-Money
 
     # Informations de paiement mobile
@@ -47,8 +92,6 @@ class Payment(models.Model):
 
     # Données de réponse
     error_message = models.TextField(blank=True)
-    raw_request = models.JSONField(blank=True, null=True)
-    raw_response = models.JSONField(blank=True, null=True)
 
     # Timestamps
     payment_date = models.DateTimeField(null=True, blank=True)
@@ -60,5 +103,97 @@ class Payment(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='payment_status_created_idx'),
+            # Recherche par référence PayGate, dans l'ordre par défaut
+            models.Index(fields=['tx_reference', '-created_at'], name='payment_tx_created_idx'),
+        ]
         verbose_name = 'Paiement'
-        verbose_name_plural = 'Paiements'
\ No newline at end of file
+        verbose_name_plural = 'Paiements'
+
+
+class PaymentPayload(models.Model):
+    """
+    Requête et réponse PayGate brutes, hors de la table des paiements :
+    chargées seulement à la demande (page de détail de l'admin).
+    """
+    payment = models.OneToOneField(Payment, on_delete=models.CASCADE, primary_key=True, related_name='payload')
+    request = CompressedJSONField(null=True)
+    response = CompressedJSONField(null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Données PayGate brutes'
+        verbose_name_plural = 'Données PayGate brutes'
+
+    def __str__(self):
+        return f"Payload {self.payment_id}"
+
+
+class PaymentLedgerEntry(models.Model):
+    """
+    Journal append-only des changements de statut des paiements.
+    amount est signé : +montant à l'encaissement, -montant quand un paiement
+    complété change de statut (échec forcé, remboursement), 0 sinon.
+    """
+    SOURCE_CHOICES = [
+        ('api', 'API'),
+        ('webhook', 'Webhook PayGate'),
+        ('poll', 'Interrogation PayGate'),
+        ('admin', 'Administration'),
+    ]
+
+    payment = models.ForeignKey(
+        Payment, on_delete=models.SET_NULL, null=True, blank=True, related_name='ledger_entries'
+    )
+    identifier = models.CharField(max_length=100)  # Copie : le journal survit au paiement
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES)
+    previous_status = models.CharField(max_length=20, choices=Payment.STATUS_CHOICES)
+    new_status = models.CharField(max_length=20, choices=Payment.STATUS_CHOICES)
+    amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['identifier', 'created_at'], name='ledger_identifier_idx'),
+        ]
+        verbose_name = 'Écriture de paiement'
+        verbose_name_plural = 'Journal des paiements'
+
+    def __str__(self):
+        return f"{self.identifier}: {self.previous_status} -> {self.new_status}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Le journal des paiements n'accepte que des ajouts")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Le journal des paiements n'accepte que des ajouts")
+
+
+class WebhookEvent(models.Model):
+    """
+    Boîte de réception des webhooks PayGate : le payload brut est enregistré
+    en une insertion puis traité par process_webhooks.
+    """
+    dedupe_key = models.CharField(max_length=100, unique=True)  # tx_reference et empreinte du payload
+    payload = models.JSONField()
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['received_at']
+        indexes = [
+            models.Index(fields=['next_attempt_at'], name='webhook_pending_idx',
+                         condition=models.Q(processed_at__isnull=True)),
+        ]
+        verbose_name = 'Webhook PayGate'
+        verbose_name_plural = 'Webhooks PayGate'
+
+    def __str__(self):
+        return f"Webhook {self.dedupe_key}"
@@ -0,0 +1,164 @@
+# backend/apps/payments/reconciliation.py
+import asyncio
+import heapq
+import logging
+import signal
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.core import metrics
+from .models import Payment
+from .services import AsyncPayGateGlobalService, PENDING_STATUSES, apply_status_results
+
+logger = logging.getLogger(__name__)
+
+
+def pending_payments():
+    """
+    Paiements en attente de confirmation et interrogeables chez PayGate, sans
+    ordre : un tri sur plusieurs statuts ne peut pas être servi par l'index
+    """
+    return Payment.objects.filter(
+        status__in=PENDING_STATUSES
+    ).exclude(
+        Q(identifier='') & Q(tx_reference='')
+    ).order_by()
+
+
+def reconcile(payments, concurrency=None):
+    """
+    Vérifier en parallèle le statut d'un lot de paiements puis appliquer
+    les changements en une passe. Retourne les paiements modifiés.
+    """
+    payments = list(payments)
+    if not payments:
+        return []
+
+    start = time.perf_counter()
+    service = AsyncPayGateGlobalService(concurrency=concurrency)
+    results = asyncio.run(service.check_many(payments))
+    metrics.observe('reconciliation.batch', time.perf_counter() - start)
+
+    errors = sum(1 for _, status_data in results if 'error' in status_data)
+    if errors:
+        metrics.increment('reconciliation.error', errors)
+        logger.warning("%s vérification(s) de statut en erreur sur %s", errors, len(results))
+
+    return apply_status_results(results)
+
+
+class PaymentPoller:
+    """
+    Interrogation périodique de PayGate pour les paiements initiés.
+
+    Chaque paiement a une échéance dans une file de priorité. L'intervalle
+    double à chaque palier d'âge du paiement (base_interval, puis x2 tous les
+    backoff_step secondes, plafonné à max_interval). Un paiement sort de la
+    file dès qu'il atteint un statut final ou dépasse l'âge d'expiration.
+    """
+
+    def __init__(self, base_interval=None, max_interval=None, backoff_step=None,
+                 expiry=None, batch_size=None, discover_interval=None, concurrency=None):
+        self.base_interval = base_interval or settings.PAYGATE_POLL_BASE_INTERVAL
+        self.max_interval = max_interval or settings.PAYGATE_POLL_MAX_INTERVAL
+        self.backoff_step = backoff_step or settings.PAYGATE_POLL_BACKOFF_STEP
+        self.expiry = expiry or settings.PAYGATE_POLL_EXPIRY
+        self.batch_size = batch_size or settings.PAYGATE_POLL_BATCH_SIZE
+        self.discover_interval = discover_interval or self.base_interval
+        self.concurrency = concurrency
+
+        self.queue = []          # (échéance, payment_id)
+        self.created = {}        # payment_id -> created_at des paiements suivis
+        self.next_discovery = 0
+        self.running = False
+
+    def interval_for(self, age):
+        """Intervalle entre deux vérifications pour un paiement de cet âge (secondes)"""
+        steps = int(age // self.backoff_step)
+        return min(self.max_interval, self.base_interval * (2 ** min(steps, 16)))
+
+    def schedule(self, payment_id, created_at, now):
+        age = (timezone.now() - created_at).total_seconds()
+        if age > self.expiry:
+            self.created.pop(payment_id, None)
+            metrics.increment('poller.expired')
+            return
+        self.created[payment_id] = created_at
+        heapq.heappush(self.queue, (now + self.interval_for(age), payment_id))
+
+    def discover(self, now):
+        """Ajouter à la file les nouveaux paiements en attente non expirés"""
+        cutoff = timezone.now() - timedelta(seconds=self.expiry)
+        recent = pending_payments().filter(created_at__gte=cutoff)
+        for payment_id, created_at in recent.values_list('id', 'created_at').iterator():
+            if payment_id not in self.created:
+                self.created[payment_id] = created_at
+                # Première vérification immédiate
+                heapq.heappush(self.queue, (now, payment_id))
+        self.next_discovery = now + self.discover_interval
+
+    def due(self, now):
+        """Retirer de la file jusqu'à batch_size paiements arrivés à échéance"""
+        payment_ids = []
+        while self.queue and self.queue[0][0] <= now and len(payment_ids) < self.batch_size:
+            _, payment_id = heapq.heappop(self.queue)
+            if payment_id in self.created:
+                payment_ids.append(payment_id)
+        return payment_ids
+
+    def run_once(self, now=None):
+        """Un cycle : découverte éventuelle puis vérification d'un lot. Retourne le nombre vérifié."""
+        now = time.monotonic() if now is None else now
+        if now >= self.next_discovery:
+            self.discover(now)
+
+        payment_ids = self.due(now)
+        if not payment_ids:
+            return 0
+
+        # Une seule lecture pour tout le lot ; les paiements déjà finalisés sont ignorés
+        batch = list(pending_payments().filter(id__in=payment_ids))
+        reconcile(batch, concurrency=self.concurrency)
+
+        for payment in batch:
+            if payment.status in PENDING_STATUSES:
+                self.schedule(payment.id, payment.created_at, now)
+            else:
+                self.created.pop(payment.id, None)
+
+        # Paiements finalisés ailleurs (webhook, admin) entre-temps
+        for payment_id in set(payment_ids) - {payment.id for payment in batch}:
+            self.created.pop(payment_id, None)
+
+        metrics.set_gauge('poller.tracked', len(self.created))
+        return len(batch)
+
+    def next_wakeup(self, now):
+        wakeup = self.next_discovery
+        if self.queue:
+            wakeup = min(wakeup, self.queue[0][0])
+        return max(0, wakeup - now)
+
+    def stop(self, *args):
+        self.running = False
+
+    def run_forever(self):
+        self.running = True
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        while self.running:
+            close_old_connections()
+            try:
+                checked = self.run_once()
+            except Exception:
+                logger.exception("Erreur lors du cycle d'interrogation PayGate")
+                checked = 0
+
+            if not checked:
+                time.sleep(min(1.0, self.next_wakeup(time.monotonic())))
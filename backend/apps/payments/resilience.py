@@ -0,0 +1,156 @@
+# backend/apps/payments/resilience.py
+import threading
+import time
+from collections import deque
+
+import requests
+from django.conf import settings
+
+from apps.core import metrics
+
+
+class PayGateUnavailable(requests.RequestException):
+    """Appel refusé localement : disjoncteur ouvert ou trop d'appels PayGate en cours"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Disjoncteur sur une fenêtre glissante des derniers appels.
+
+    - fermé : les appels passent ; il s'ouvre si, sur au moins min_calls appels,
+      le taux d'échecs ou d'appels lents dépasse son seuil
+    - ouvert : les appels échouent immédiatement pendant reset_timeout secondes
+    - semi-ouvert : un seul appel d'essai ; succès -> fermé, échec -> ouvert
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, window=None, min_calls=None, failure_rate=None,
+                 slow_call_rate=None, slow_call_duration=None, reset_timeout=None):
+        self.name = name
+        self.min_calls = min_calls or settings.PAYGATE_BREAKER_MIN_CALLS
+        self.failure_rate = failure_rate or settings.PAYGATE_BREAKER_FAILURE_RATE
+        self.slow_call_rate = slow_call_rate or settings.PAYGATE_BREAKER_SLOW_CALL_RATE
+        self.slow_call_duration = slow_call_duration or settings.PAYGATE_BREAKER_SLOW_CALL_DURATION
+        self.reset_timeout = reset_timeout or settings.PAYGATE_BREAKER_RESET_TIMEOUT
+
+        self._lock = threading.Lock()
+        self._calls = deque(maxlen=window or settings.PAYGATE_BREAKER_WINDOW)  # (succès, lent)
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+        self._publish()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == self.OPEN and self._reset_elapsed():
+                return self.HALF_OPEN
+            return self._state
+
+    def _reset_elapsed(self):
+        return time.monotonic() - self._opened_at >= self.reset_timeout
+
+    def _publish(self):
+        metrics.set_gauge(f'{self.name}.circuit', self._state)
+
+    def retry_after(self):
+        return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def allow(self):
+        """Lever PayGateUnavailable si l'appel ne doit pas partir"""
+        with self._lock:
+            if self._state == self.OPEN and self._reset_elapsed():
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+                self._publish()
+
+            # Un essai sans issue connue (exception inattendue) n'est pas attendu indéfiniment
+            probe_blocking = (
+                self._probe_in_flight
+                and time.monotonic() - self._probe_started < self.reset_timeout
+            )
+            if self._state == self.OPEN or (self._state == self.HALF_OPEN and probe_blocking):
+                metrics.increment(f'{self.name}.circuit.rejected')
+                raise PayGateUnavailable(
+                    'Service de paiement temporairement indisponible',
+                    retry_after=self.retry_after()
+                )
+
+            if self._state == self.HALF_OPEN:
+                self._probe_in_flight = True
+                self._probe_started = time.monotonic()
+
+    def record(self, success, duration):
+        slow = duration >= self.slow_call_duration
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                if success and not slow:
+                    self._state = self.CLOSED
+                    self._calls.clear()
+                else:
+                    self._trip()
+                self._probe_in_flight = False
+                self._publish()
+                return
+
+            self._calls.append((success, slow))
+            if self._state == self.CLOSED and len(self._calls) >= self.min_calls:
+                failures = sum(1 for ok, _ in self._calls if not ok) / len(self._calls)
+                slow_calls = sum(1 for _, is_slow in self._calls if is_slow) / len(self._calls)
+                if failures >= self.failure_rate or slow_calls >= self.slow_call_rate:
+                    self._trip()
+                    self._publish()
+
+    def _trip(self):
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._calls.clear()
+        metrics.increment(f'{self.name}.circuit.opened')
+
+
+class Bulkhead:
+    """Limite le nombre d'appels PayGate simultanés dans le processus"""
+
+    def __init__(self, name, size=None, timeout=None):
+        self.name = name
+        self.size = size or settings.PAYGATE_BULKHEAD_SIZE
+        self.timeout = settings.PAYGATE_BULKHEAD_TIMEOUT if timeout is None else timeout
+        self._semaphore = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+
+    def __enter__(self):
+        if not self._semaphore.acquire(timeout=self.timeout):
+            metrics.increment(f'{self.name}.bulkhead.rejected')
+            raise PayGateUnavailable('Trop de requêtes de paiement en cours, réessayez')
+        with self._lock:
+            self.in_flight += 1
+            metrics.set_gauge(f'{self.name}.bulkhead.in_flight', self.in_flight)
+        return self
+
+    def __exit__(self, *exc_info):
+        with self._lock:
+            self.in_flight -= 1
+            metrics.set_gauge(f'{self.name}.bulkhead.in_flight', self.in_flight)
+        self._semaphore.release()
+
+
+_breaker = None
+_breaker_lock = threading.Lock()
+
+
+def get_breaker():
+    """Disjoncteur PayGate partagé par le processus (clients sync et async)"""
+    global _breaker
+    if _breaker is None:
+        with _breaker_lock:
+            if _breaker is None:
+                _breaker = CircuitBreaker('paygate')
+    return _breaker
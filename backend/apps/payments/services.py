@@ -1,31 +1,239 @@
 # backend/apps/payments/services.py
+import asyncio
+import httpx
 import requests
 import json
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
-from .models import Payment
+from apps.orders.models import Order
+from .models import Payment, PaymentPayload
+from .transport import get_transport, AsyncPayGateTransport, PayGateTransport
+from .events import publish_status
+from .status_cache import status_cache
+from .resilience import Bulkhead, PayGateUnavailable
+from .ledger import record_transitions
 
 logger = logging.getLogger(__name__)
 
+# Codes de statut PayGate -> statut local (2 = en cours, pas de changement)
+PAYGATE_STATUS_MAP = {
+    0: 'completed',
+    4: 'failed',
+    6: 'cancelled',
+}
 
-class PayGateGlobalService:
+PAYGATE_STATUS_MESSAGES = {
+    4: 'Paiement expiré',
+    6: 'Paiement annulé',
+}
+
+# Statuts locaux en attente d'une confirmation PayGate
+PENDING_STATUSES = ('initiated', 'processing')
+
+# Statuts qui n'évoluent plus
+FINAL_STATUSES = ('completed', 'failed', 'cancelled', 'refunded')
+
+STATUS_UPDATE_FIELDS = [
+    'status', 'payment_reference', 'payment_method_detail',
+    'payment_date', 'error_message', 'updated_at'
+]
+
+
+def apply_status(payment, status_data):
     """
-    Service pour l'intégration avec PayGate Global (FLOOZ/T-Money)
+    Appliquer une réponse de statut PayGate au paiement, sans sauvegarder.
+    Retourne True si le statut local a changé.
+    """
+    if not status_data or 'error' in status_data:
+        return False
+
+    new_status = PAYGATE_STATUS_MAP.get(status_data.get('status'))
+    if new_status is None or payment.status == new_status or payment.status == 'completed':
+        return False
+
+    payment.status = new_status
+    payment.updated_at = timezone.now()
+    if new_status == 'completed':
+        payment.payment_reference = status_data.get('payment_reference', '') or ''
+        payment.payment_method_detail = status_data.get('payment_method', '') or ''
+        payment_date = status_data.get('datetime')
+        payment.payment_date = (parse_datetime(payment_date) if payment_date else None) or timezone.now()
+    else:
+        payment.error_message = PAYGATE_STATUS_MESSAGES[status_data['status']]
+    return True
+
+
+WEBHOOK_REQUIRED_FIELDS = ['tx_reference', 'identifier', 'amount', 'payment_method', 'phone_number']
+
+WEBHOOK_UPDATE_FIELDS = [
+    'tx_reference', 'payment_reference', 'payment_method_detail', 'phone_number',
+    'status', 'payment_date', 'updated_at'
+]
+
+
+def missing_webhook_field(webhook_data):
+    """Premier champ obligatoire absent du webhook, ou None"""
+    for field in WEBHOOK_REQUIRED_FIELDS:
+        if field not in webhook_data:
+            return field
+    return None
+
+
+def apply_webhook(payment, webhook_data):
+    """
+    Appliquer une confirmation PayGate au paiement, sans sauvegarder.
+    Idempotent : retourne False si le paiement est déjà complété.
+    """
+    if payment.status == 'completed':
+        return False
+
+    payment.tx_reference = webhook_data['tx_reference']
+    payment.payment_reference = webhook_data.get('payment_reference', '')
+    payment.payment_method_detail = webhook_data['payment_method']
+    payment.phone_number = webhook_data['phone_number']
+    payment.status = 'completed'
+    payment.payment_date = timezone.now()
+    payment.updated_at = timezone.now()
+    return True
+
+
+def save_payloads(payloads, fields):
+    """
+    Enregistrer en une requête les données brutes (PaymentPayload) :
+    insertion, ou mise à jour des seuls champs indiqués si la ligne existe.
+    """
+    PaymentPayload.objects.bulk_create(
+        payloads,
+        update_conflicts=True,
+        unique_fields=['payment'],
+        update_fields=[*fields, 'updated_at']
+    )
+
+
+def apply_status_results(results, source='poll'):
+    """
+    Appliquer en masse des couples (paiement, réponse PayGate) :
+    un bulk_update des paiements, une mise à jour des commandes payées et
+    les écritures du journal. Retourne la liste des paiements modifiés.
+
+    Les paiements ont été lus avant l'appel PayGate : ils sont relus
+    verrouillés, et la réponse est ignorée si le statut a changé entre-temps
+    (webhook, autre worker). Les objets reçus reprennent l'état relu.
+    """
+    results = list(results)
+    with transaction.atomic():
+        locked = Payment.objects.select_for_update().in_bulk([payment.id for payment, _ in results])
+        transitions = []
+        for payment, status_data in results:
+            current = locked.get(payment.id)
+            if current is None:
+                continue
+            if current.status == payment.status and apply_status(current, status_data):
+                transitions.append((current, payment.status))
+            for field in STATUS_UPDATE_FIELDS:
+                setattr(payment, field, getattr(current, field))
+        changed = [payment for payment, _ in transitions]
+        paid_order_ids = [payment.order_id for payment in changed if payment.status == 'completed']
+
+        Payment.objects.bulk_update(changed, STATUS_UPDATE_FIELDS)
+        record_transitions(transitions, source)
+        if paid_order_ids:
+            Order.objects.filter(id__in=paid_order_ids).update(
+                payment_status='paid',
+                status='confirmed',
+                updated_at=timezone.now()
+            )
+        publish_status(changed)
+
+    changed_ids = {payment.id for payment in changed}
+    return [payment for payment, _ in results if payment.id in changed_ids]
+
+
+_status_checks = None
+_status_checks_lock = threading.Lock()
+
+
+def status_check_pool():
+    """
+    Pool de threads et transport des vérifications de statut en masse, partagés
+    par le processus : actions de l'admin et webhooks simultanés se répartissent
+    PAYGATE_STATUS_CHECK_WORKERS appels PayGate au plus. Transport dédié (pool
+    de connexions et cloisonnement à cette taille) pour ne pas épuiser le
+    cloisonnement des paiements ; le disjoncteur reste commun.
     """
+    global _status_checks
+    if _status_checks is None:
+        with _status_checks_lock:
+            if _status_checks is None:
+                size = settings.PAYGATE_STATUS_CHECK_WORKERS
+                transport = PayGateTransport(
+                    pool_size=size,
+                    bulkhead=Bulkhead('paygate.status_check', size=size)
+                )
+                _status_checks = (
+                    ThreadPoolExecutor(max_workers=size, thread_name_prefix='paygate-status'),
+                    transport
+                )
+    return _status_checks
+
+
+def check_statuses(payments):
+    """
+    Vérifier le statut de plusieurs paiements sur le pool partagé.
+    Retourne des triplets (paiement, réponse, durée).
+    """
+    payments = list(payments)
+    if not payments:
+        return []
+    executor, transport = status_check_pool()
+    service = PayGateGlobalService(transport)
+
+    def check(payment):
+        start = time.perf_counter()
+        status_data = service.check_payment_status(payment.identifier, payment.tx_reference)
+        return payment, status_data, time.perf_counter() - start
+
+    return list(executor.map(check, payments))
+
 
-    def __init__(self):
+class BasePayGateService:
+    """
+    Configuration et construction des requêtes PayGate, communes aux clients
+    synchrone et asynchrone
+    """
+
+    def __init__(self, transport):
         self.api_key = settings.PAYGATE_API_KEY
         self.api_url = settings.PAYGATE_API_URL
         self.page_url = settings.PAYGATE_PAGE_URL
         self.status_url = settings.PAYGATE_STATUS_URL
+        self.status_v2_url = settings.PAYGATE_STATUS_V2_URL
+        self.balance_url = settings.PAYGATE_BALANCE_URL
+        self.transport = transport
 
-    def initiate_direct_payment(self, payment):
-        """
-        Méthode 1: Paiement direct via API
-        """
-        data = {
+    def status_request(self, identifier=None, tx_reference=None):
+        """URL et corps de la requête de statut (v1 par tx_reference, v2 par identifier)"""
+        if tx_reference:
+            return self.status_url, {'auth_token': self.api_key, 'tx_reference': tx_reference}
+        return self.status_v2_url, {'auth_token': self.api_key, 'identifier': identifier}
+
+    def save_transition(self, payment, previous_status, source='api'):
+        """Sauvegarder le paiement et journaliser son changement de statut"""
+        with transaction.atomic():
+            payment.save()
+            record_transitions([(payment, previous_status)], source)
+
+    def pay_request(self, payment):
+        """Corps de la requête de paiement direct (payment.order doit être chargé)"""
+        return {
             'auth_token': self.api_key,
             'phone_number': payment.phone_number,
             'amount': str(int(payment.amount)),
@@ -34,79 +242,43 @@ class PayGateGlobalService:
             'network': payment.network
         }
 
-        try:
-            logger.info(f"Envoi requête PayGate: {data}")
+    def record_pay_response(self, payment, previous_status, data, http_status, response_data):
+        """Enregistrer la réponse de PayGate à une demande de paiement ; retourne le résultat"""
+        save_payloads([PaymentPayload(payment=payment, request=data, response=response_data)],
+                      ['request', 'response'])
 
-            response = requests.post(
-                self.api_url,
-                json=data,
-                headers={'Content-Type': 'application/json'},
-                timeout=30
-            )
+        if http_status == 200:
+            status_code = response_data.get('status')
 
-            response_data = response.json()
-            logger.info(f"Réponse PayGate: {response_data}")
-
-            payment.raw_request = data
-            payment.raw_response = response_data
-
-            if response.status_code == 200:
-                status_code = response_data.get('status')
-
-                if status_code == 0:
-                    payment.tx_reference = response_data.get('tx_reference')
-                    payment.status = 'initiated'
-                    payment.save()
-
-                    return {
-                        'success': True,
-                        'tx_reference': response_data.get('tx_reference'),
-                        'status': status_code,
-                        'message': 'Paiement initié avec succès'
-                    }
-                else:
-                    error_messages = {
-                        2: 'Jeton d\'authentification invalide',
-                        4: 'Paramètres invalides',
-                        6: 'Doublon détecté'
-                    }
-                    error_message = error_messages.get(status_code, f'Erreur: {status_code}')
-                    payment.status = 'failed'
-                    payment.error_message = error_message
-                    payment.save()
-
-                    return {
-                        'success': False,
-                        'error': error_message,
-                        'status_code': status_code
-                    }
-            else:
-                error_msg = f'Erreur HTTP: {response.status_code}'
-                payment.status = 'failed'
-                payment.error_message = error_msg
-                payment.save()
+            if status_code == 0:
+                payment.tx_reference = response_data.get('tx_reference')
+                payment.status = 'initiated'
+                self.save_transition(payment, previous_status)
 
                 return {
-                    'success': False,
-                    'error': error_msg
+                    'success': True,
+                    'tx_reference': response_data.get('tx_reference'),
+                    'status': status_code,
+                    'message': 'Paiement initié avec succès'
                 }
-
-        except requests.RequestException as e:
-            logger.error(f"Erreur connexion PayGate: {str(e)}")
-            error_msg = 'Erreur de connexion au service de paiement'
-            payment.status = 'failed'
-            payment.error_message = error_msg
-            payment.save()
-
-            return {
-                'success': False,
-                'error': error_msg
-            }
+            else:
+                error_messages = {
+                    2: 'Jeton d\'authentification invalide',
+                    4: 'Paramètres invalides',
+                    6: 'Doublon détecté'
+                }
+                error_message = error_messages.get(status_code, f'Erreur: {status_code}')
+                result = self.record_pay_failure(payment, previous_status, error_message)
+                result['status_code'] = status_code
+                return result
+        else:
+            return self.record_pay_failure(payment, previous_status, f'Erreur HTTP: {http_status}')
 
     def generate_redirect_url(self, payment, return_url=None):
         """
         Méthode 2: Générer l'URL de redirection
         """
+        previous_status = payment.status
         params = {
             'token': self.api_key,
             'amount': str(int(payment.amount)),
@@ -124,103 +296,205 @@ class PayGateGlobalService:
         query_string = '&'.join([f"{key}={value}" for key, value in params.items()])
         payment_url = f"{self.page_url}?{query_string}"
 
-        payment.raw_request = params
         payment.status = 'initiated'
-        payment.save()
+        self.save_transition(payment, previous_status)
+        save_payloads([PaymentPayload(payment=payment, request=params)], ['request'])
 
         return payment_url
 
+    def record_pay_failure(self, payment, previous_status, error_message, **extra):
+        """Paiement en échec (refus, erreur HTTP ou de connexion) ; retourne le résultat"""
+        payment.status = 'failed'
+        payment.error_message = error_message
+        self.save_transition(payment, previous_status)
+
+        return {
+            'success': False,
+            'error': error_message,
+            **extra
+        }
+
+
+class PayGateGlobalService(BasePayGateService):
+    """
+    Service pour l'intégration avec PayGate Global (FLOOZ/T-Money)
+    """
+
+    def __init__(self, transport=None):
+        super().__init__(transport or get_transport())
+
+    def initiate_direct_payment(self, payment):
+        """
+        Méthode 1: Paiement direct via API
+        """
+        previous_status = payment.status
+        data = self.pay_request(payment)
+
+        try:
+            logger.info("Envoi requête PayGate %s", payment.identifier, extra={'paygate_request': data})
+
+            response = self.transport.post(self.api_url, data, operation='pay')
+
+            response_data = response.json()
+            logger.info(
+                "Réponse PayGate %s", payment.identifier,
+                extra={'paygate_response': response_data, 'http_status': response.status_code}
+            )
+
+            return self.record_pay_response(payment, previous_status, data, response.status_code, response_data)
+
+        except PayGateUnavailable as e:
+            logger.warning("Appel PayGate refusé: %s", e)
+            return self.record_pay_failure(
+                payment, previous_status, str(e), unavailable=True, retry_after=e.retry_after
+            )
+
+        except requests.RequestException as e:
+            logger.error("Erreur connexion PayGate: %s", e)
+            return self.record_pay_failure(payment, previous_status, 'Erreur de connexion au service de paiement')
+
     def check_payment_status(self, identifier=None, tx_reference=None):
         """
-        Vérifier le statut d'un paiement
+        Vérifier le statut d'un paiement.
+        Réponses mises en cache quelques secondes (définitivement pour un statut
+        final) ; les demandes simultanées identiques partagent un seul appel.
         """
         if not identifier and not tx_reference:
             return {'error': 'Identifier ou tx_reference requis'}
 
-        if tx_reference:
-            data = {'auth_token': self.api_key, 'tx_reference': tx_reference}
-            url = self.status_url
-        else:
-            data = {'auth_token': self.api_key, 'identifier': identifier}
-            url = 'https://paygateglobal.com/api/v2/status'
+        return status_cache.get_or_fetch(
+            identifier, tx_reference,
+            lambda: self.fetch_payment_status(identifier, tx_reference)
+        )
+
+    def fetch_payment_status(self, identifier=None, tx_reference=None):
+        """Appel PayGate direct, sans cache"""
+        url, data = self.status_request(identifier, tx_reference)
 
         try:
-            response = requests.post(
-                url,
-                json=data,
-                headers={'Content-Type': 'application/json'},
-                timeout=30
-            )
+            response = self.transport.post(url, data, operation='status', idempotent=True)
 
             if response.status_code == 200:
                 return response.json()
             else:
                 return {'error': f'Erreur HTTP: {response.status_code}'}
 
+        except PayGateUnavailable as e:
+            return {'error': str(e), 'unavailable': True}
         except requests.RequestException as e:
-            logger.error(f"Erreur vérification statut: {str(e)}")
+            logger.error("Erreur vérification statut: %s", e)
             return {'error': 'Erreur de connexion au service'}
 
-    def process_webhook(self, webhook_data):
+    def get_balance(self):
         """
-        Traiter les webhooks de confirmation
+        Consulter le solde
         """
-        required_fields = ['tx_reference', 'identifier', 'amount', 'payment_method', 'phone_number']
+        data = {'auth_token': self.api_key}
+
+        try:
+            response = self.transport.post(self.balance_url, data, operation='balance', idempotent=True)
+
+            if response.status_code == 200:
+                return response.json()
+            else:
+                return {'error': f'Erreur HTTP: {response.status_code}'}
+
+        except PayGateUnavailable as e:
+            return {'error': str(e), 'unavailable': True}
+        except requests.RequestException as e:
+            logger.error("Erreur consultation solde: %s", e)
+            return {'error': 'Erreur de connexion'}
+
+
+class AsyncPayGateGlobalService(BasePayGateService):
+    """
+    Variante asynchrone : vérifications de statut en masse et vues async
+    (paiement direct, statut, solde) servies sous ASGI. Les vues passent le
+    transport partagé de leur boucle (get_async_transport) ; sans transport,
+    en ouvrir un avec `async with service.transport`.
+    """
 
-        for field in required_fields:
-            if field not in webhook_data:
-                logger.error(f"Champ manquant: {field}")
-                return {'success': False, 'error': f'Champ manquant: {field}'}
+    def __init__(self, concurrency=None, transport=None):
+        super().__init__(transport=transport or AsyncPayGateTransport(concurrency=concurrency))
+
+    async def initiate_direct_payment(self, payment):
+        """Paiement direct via API ; l'attente réseau ne bloque aucun thread"""
+        previous_status = payment.status
+        data = self.pay_request(payment)
 
         try:
-            payment = Payment.objects.get(identifier=webhook_data['identifier'])
-
-            if payment.status == 'completed':
-                return {'success': True, 'message': 'Paiement déjà complété'}
-
-            payment.tx_reference = webhook_data['tx_reference']
-            payment.payment_reference = webhook_data.get('payment_reference', '')
-            payment.payment_method_detail = webhook_data['payment_method']
-            payment.phone_number = webhook_data['phone_number']
-            payment.raw_response = webhook_data
-            payment.status = 'completed'
-            payment.payment_date = timezone.now()
-            payment.save()
+            logger.info("Envoi requête PayGate %s", payment.identifier, extra={'paygate_request': data})
+
+            response = await self.transport.post(self.api_url, data, operation='pay')
+
+            response_data = response.json()
+            logger.info(
+                "Réponse PayGate %s", payment.identifier,
+                extra={'paygate_response': response_data, 'http_status': response.status_code}
+            )
 
-            order = payment.order
-            order.payment_status = 'paid'
-            order.status = 'confirmed'
-            order.save()
+            return await sync_to_async(self.record_pay_response)(
+                payment, previous_status, data, response.status_code, response_data
+            )
 
-            logger.info(f"Paiement {payment.identifier} complété via webhook")
-            return {'success': True, 'payment_id': payment.id}
+        except PayGateUnavailable as e:
+            logger.warning("Appel PayGate refusé: %s", e)
+            return await sync_to_async(self.record_pay_failure)(
+                payment, previous_status, str(e), unavailable=True, retry_after=e.retry_after
+            )
 
-        except Payment.DoesNotExist:
-            logger.error(f"Paiement non trouvé: {webhook_data['identifier']}")
-            return {'success': False, 'error': 'Paiement non trouvé'}
-        except Exception as e:
-            logger.error(f"Erreur traitement webhook: {str(e)}")
-            return {'success': False, 'error': 'Erreur lors du traitement'}
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error("Erreur connexion PayGate: %s", e)
+            return await sync_to_async(self.record_pay_failure)(
+                payment, previous_status, 'Erreur de connexion au service de paiement'
+            )
 
-    def get_balance(self):
-        """
-        Consulter le solde
-        """
+    async def get_balance(self):
         data = {'auth_token': self.api_key}
 
         try:
-            response = requests.post(
-                'https://paygateglobal.com/api/v1/check-balance',
-                json=data,
-                headers={'Content-Type': 'application/json'},
-                timeout=30
-            )
+            response = await self.transport.post(self.balance_url, data, operation='balance', idempotent=True)
+            if response.status_code == 200:
+                return response.json()
+            return {'error': f'Erreur HTTP: {response.status_code}'}
+
+        except PayGateUnavailable as e:
+            return {'error': str(e), 'unavailable': True}
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error("Erreur consultation solde: %s", e)
+            return {'error': 'Erreur de connexion'}
+
+    async def check_payment_status(self, identifier=None, tx_reference=None):
+        if not identifier and not tx_reference:
+            return {'error': 'Identifier ou tx_reference requis'}
+
+        return await status_cache.aget_or_fetch(
+            identifier, tx_reference, lambda: self.fetch_payment_status(identifier, tx_reference)
+        )
+
+    async def fetch_payment_status(self, identifier=None, tx_reference=None):
+        url, data = self.status_request(identifier, tx_reference)
 
+        try:
+            response = await self.transport.post(url, data, operation='status', idempotent=True)
             if response.status_code == 200:
                 return response.json()
-            else:
-                return {'error': f'Erreur HTTP: {response.status_code}'}
+            return {'error': f'Erreur HTTP: {response.status_code}'}
 
-        except requests.RequestException as e:
-            logger.error(f"Erreur consultation solde: {str(e)}")
-            return {'error': 'Erreur de connexion'}
\ No newline at end of file
+        except PayGateUnavailable as e:
+            return {'error': str(e), 'unavailable': True}
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error("Erreur vérification statut: %s", e)
+            return {'error': 'Erreur de connexion au service'}
+
+    async def check_many(self, payments):
+        """
+        Vérifier le statut de plusieurs paiements en parallèle (dans la limite
+        de concurrence du transport). Retourne des couples (paiement, réponse).
+        """
+        async with self.transport:
+            statuses = await asyncio.gather(*[
+                self.check_payment_status(payment.identifier, payment.tx_reference)
+                for payment in payments
+            ])
+        return list(zip(payments, statuses))
@@ -0,0 +1,198 @@
+# backend/apps/payments/simulator.py
+"""
+Simulateur PayGate local, pour les tests de charge sans le vrai fournisseur.
+
+Implémente /api/v1/pay, /api/v1/status, /api/v2/status et /api/v1/check-balance,
+puis confirme chaque paiement après un délai en appelant le webhook configuré.
+Latence, taux d'erreurs HTTP et taux d'échec des paiements sont paramétrables.
+"""
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class SimulatorHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        simulator = self.server.simulator
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            payload = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            return self.reply(400, {'error': 'JSON invalide'})
+
+        simulator.sleep_latency()
+        if simulator.should_fail():
+            return self.reply(500, {'error': 'Erreur simulée'})
+
+        if payload.get('auth_token') != simulator.auth_token:
+            return self.reply(200, {'status': 2})  # Jeton invalide
+
+        routes = {
+            '/api/v1/pay': simulator.pay,
+            '/api/v1/status': simulator.status_by_tx_reference,
+            '/api/v2/status': simulator.status_by_identifier,
+            '/api/v1/check-balance': simulator.balance,
+        }
+        route = routes.get(self.path.split('?')[0])
+        if route is None:
+            return self.reply(404, {'error': 'Route inconnue'})
+        self.reply(*route(payload))
+
+    def reply(self, status_code, data):
+        body = json.dumps(data).encode()
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SimulatorServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # la file listen() par défaut (5) perd des connexions en charge
+
+
+class PayGateSimulator:
+
+    def __init__(self, host='127.0.0.1', port=0, auth_token='', latency=0.0, jitter=0.5,
+                 error_rate=0.0, failure_rate=0.0, confirm_delay=1.0, callback_url=None):
+        self.auth_token = auth_token
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.failure_rate = failure_rate
+        self.confirm_delay = confirm_delay
+        self.callback_url = callback_url
+
+        self.lock = threading.Lock()
+        self.transactions = {}   # tx_reference -> transaction
+        self.identifiers = {}    # identifier -> tx_reference
+        self.callbacks = requests.Session()
+
+        self.server = SimulatorServer((host, port), SimulatorHandler)
+        self.server.simulator = self
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def serve_forever(self):
+        self.server.serve_forever()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.callbacks.close()
+
+    # Comportement simulé
+
+    def sleep_latency(self):
+        if self.latency:
+            time.sleep(max(0.0, random.uniform(self.latency * (1 - self.jitter), self.latency * (1 + self.jitter))))
+
+    def should_fail(self):
+        return random.random() < self.error_rate
+
+    def pay(self, payload):
+        identifier = payload.get('identifier')
+        if not identifier or not payload.get('amount') or payload.get('network') not in ('FLOOZ', 'TMONEY'):
+            return 200, {'status': 4}  # Paramètres invalides
+
+        with self.lock:
+            if identifier in self.identifiers:
+                return 200, {'status': 6}  # Doublon
+            tx_reference = str(uuid.uuid4().int)[:10]
+            self.identifiers[identifier] = tx_reference
+            self.transactions[tx_reference] = {
+                'tx_reference': tx_reference,
+                'identifier': identifier,
+                'amount': payload['amount'],
+                'phone_number': payload.get('phone_number', ''),
+                'payment_method': payload['network'],
+                'status': 2,
+                'payment_reference': '',
+                'datetime': None,
+            }
+
+        threading.Timer(self.confirm_delay, self.confirm, args=[tx_reference]).start()
+        return 200, {'tx_reference': tx_reference, 'status': 0}
+
+    def confirm(self, tx_reference):
+        """Fin du paiement côté opérateur, puis appel du webhook si succès"""
+        with self.lock:
+            transaction = self.transactions[tx_reference]
+            if random.random() < self.failure_rate:
+                transaction['status'] = 4
+                return
+            transaction['status'] = 0
+            transaction['payment_reference'] = f'SIM{tx_reference}'
+            transaction['datetime'] = timezone.now().isoformat()
+            callback = dict(transaction)
+
+        if self.callback_url:
+            try:
+                self.callbacks.post(self.callback_url, json={
+                    'tx_reference': callback['tx_reference'],
+                    'identifier': callback['identifier'],
+                    'payment_reference': callback['payment_reference'],
+                    'amount': callback['amount'],
+                    'datetime': callback['datetime'],
+                    'payment_method': callback['payment_method'],
+                    'phone_number': callback['phone_number'],
+                }, timeout=10)
+            except requests.RequestException as e:
+                logger.warning("Échec de l'appel webhook simulé: %s", e)
+
+    def status_payload(self, transaction):
+        return {
+            'tx_reference': transaction['tx_reference'],
+            'identifier': transaction['identifier'],
+            'payment_reference': transaction['payment_reference'],
+            'status': transaction['status'],
+            'datetime': transaction['datetime'],
+            'payment_method': transaction['payment_method'],
+        }
+
+    def status_by_tx_reference(self, payload):
+        with self.lock:
+            transaction = self.transactions.get(str(payload.get('tx_reference')))
+            if transaction is None:
+                return 404, {'error': 'Transaction inconnue'}
+            return 200, self.status_payload(transaction)
+
+    def status_by_identifier(self, payload):
+        with self.lock:
+            tx_reference = self.identifiers.get(payload.get('identifier'))
+            if tx_reference is None:
+                return 404, {'error': 'Transaction inconnue'}
+            return 200, self.status_payload(self.transactions[tx_reference])
+
+    def balance(self, payload):
+        with self.lock:
+            totals = {'FLOOZ': 0, 'TMONEY': 0}
+            for transaction in self.transactions.values():
+                if transaction['status'] == 0:
+                    totals[transaction['payment_method']] += int(transaction['amount'])
+        return 200, {'flooz': totals['FLOOZ'], 'tmoney': totals['TMONEY']}
@@ -0,0 +1,155 @@
+# backend/apps/payments/status_cache.py
+import asyncio
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.core import metrics
+
+# Codes PayGate définitifs (0 succès, 4 expiré, 6 annulé) : mis en cache sans expiration
+FINAL_PAYGATE_STATUSES = {0, 4, 6}
+
+
+class SingleFlight:
+    """
+    Regroupe les appels simultanés portant sur la même clé : un seul appel
+    sortant, les autres threads attendent et partagent son résultat.
+    """
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+
+        if not leader:
+            metrics.increment('paygate.status_cache.coalesced')
+            call.done.wait()
+        else:
+            try:
+                call.result = fn()
+            except Exception as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+
+class AsyncSingleFlight:
+    """
+    Équivalent asyncio de SingleFlight : les coroutines d'une même boucle
+    attendent la même tâche. La tâche est protégée (shield) : une requête
+    annulée n'interrompt pas l'appel partagé avec les autres.
+    """
+
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key, fn):
+        loop = asyncio.get_running_loop()
+        task = self._calls.get((loop, key))
+        if task is None:
+            task = self._calls[(loop, key)] = loop.create_task(fn())
+            task.add_done_callback(lambda _: self._calls.pop((loop, key), None))
+        else:
+            metrics.increment('paygate.status_cache.coalesced')
+        return await asyncio.shield(task)
+
+
+class StatusCache:
+    """Cache court des réponses de statut PayGate, par tx_reference ou identifier"""
+
+    def __init__(self):
+        self._flight = SingleFlight()
+        self._async_flight = AsyncSingleFlight()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(identifier=None, tx_reference=None):
+        if tx_reference:
+            return f'paygate:status:tx:{tx_reference}'
+        return f'paygate:status:id:{identifier}'
+
+    def _record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            hit_rate = self.hits / (self.hits + self.misses)
+        metrics.increment('paygate.status_cache.hit' if hit else 'paygate.status_cache.miss')
+        metrics.set_gauge('paygate.status_cache.hit_rate', round(hit_rate, 4))
+
+    def get(self, key):
+        cached = cache.get(key)
+        self._record(cached is not None)
+        return cached
+
+    @staticmethod
+    def timeout_for(status_data):
+        if status_data.get('status') in FINAL_PAYGATE_STATUSES:
+            return None
+        return settings.PAYGATE_STATUS_CACHE_TTL
+
+    def set(self, key, status_data):
+        """Les erreurs ne sont pas mises en cache"""
+        if status_data and 'error' not in status_data:
+            cache.set(key, status_data, self.timeout_for(status_data))
+
+    async def aget(self, key):
+        cached = await cache.aget(key)
+        self._record(cached is not None)
+        return cached
+
+    async def aset(self, key, status_data):
+        if status_data and 'error' not in status_data:
+            await cache.aset(key, status_data, self.timeout_for(status_data))
+
+    def get_or_fetch(self, identifier, tx_reference, fetch):
+        key = self.key(identifier, tx_reference)
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        def load():
+            status_data = fetch()
+            self.set(key, status_data)
+            return status_data
+
+        return self._flight.do(key, load)
+
+    async def aget_or_fetch(self, identifier, tx_reference, fetch):
+        """Variante async de get_or_fetch ; fetch est une fonction coroutine"""
+        key = self.key(identifier, tx_reference)
+        cached = await self.aget(key)
+        if cached is not None:
+            return cached
+
+        async def load():
+            status_data = await fetch()
+            await self.aset(key, status_data)
+            return status_data
+
+        return await self._async_flight.do(key, load)
+
+
+status_cache = StatusCache()
@@ -1,3 +1,813 @@
-from django.test import TestCase
+import asyncio
+import csv
+import io
+import json
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+import requests
+from asgiref.sync import async_to_sync
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from apps.core import metrics
+from apps.orders.models import Order
+from apps.users.models import CustomUser
+from .events import broker
+from .models import Payment, PaymentLedgerEntry, PaymentPayload, WebhookEvent, generate_payment_identifier
+from .reconciliation import PaymentPoller
+from .status_cache import StatusCache
+from . import services, views
+from . import transport as transport_module
+from .services import PayGateGlobalService, apply_status_results
+from .transport import AsyncPayGateTransport, PayGateTransport
+from .resilience import Bulkhead, CircuitBreaker, PayGateUnavailable
+from .simulator import PayGateSimulator
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Imitation minimale de PayGate, en HTTP/1.1 pour autoriser le keep-alive"""
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        with self.server.lock:
+            self.server.requests += 1
+            status_code = self.server.failures.pop(0) if self.server.failures else 200
+        time.sleep(self.server.delay)
+
+        key = payload.get('tx_reference') or payload.get('identifier')
+        paygate_status = getattr(self.server, 'statuses', {}).get(key, 0)
+        body = json.dumps({
+            'status': paygate_status, 'tx_reference': payload.get('tx_reference', '123'), 'payment_reference': 'REF'
+        }).encode()
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    request_queue_size = 128  # file d'attente listen() assez longue pour les appels simultanés
+
+
+def start_stand_in():
+    server = StandInServer(('127.0.0.1', 0), StandInHandler)
+    server.lock = threading.Lock()
+    server.connections = 0
+    server.requests = 0
+    server.failures = []
+    server.statuses = {}
+    server.delay = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+class PayGateTransportTests(SimpleTestCase):
+
+    def setUp(self):
+        self.server, self.base_url = start_stand_in()
+        self.transport = PayGateTransport(retry_backoff=0.001, breaker=CircuitBreaker('test'))
+        metrics.reset()
+        cache.clear()
+
+    def tearDown(self):
+        self.transport.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_session_reuses_connection(self):
+        calls = 20
+        url = f'{self.base_url}/api/v1/status'
+
+        for _ in range(calls):
+            requests.post(url, json={}, timeout=5)
+        self.assertEqual(self.server.connections, calls)
+
+        self.server.connections = 0
+        for _ in range(calls):
+            self.transport.post(url, {}, operation='status', idempotent=True)
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(metrics.snapshot()['latencies']['paygate.status']['count'], calls)
+
+    def test_idempotent_call_is_retried(self):
+        self.server.failures = [503, 503]
+        with override_settings(PAYGATE_STATUS_URL=f'{self.base_url}/api/v1/status'):
+            service = PayGateGlobalService(transport=self.transport)
+            result = service.check_payment_status(tx_reference='123')
+
+        self.assertEqual(result['status'], 0)
+        self.assertEqual(self.server.requests, 3)
+        self.assertEqual(metrics.snapshot()['counters']['paygate.status.retry'], 2)
+
+    def test_non_idempotent_call_is_not_retried(self):
+        self.server.failures = [503]
+        response = self.transport.post(f'{self.base_url}/api/v1/pay', {}, operation='pay')
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(metrics.snapshot()['latencies']['paygate.pay']['count'], 1)
+
+
+class ReconcilePaymentsTests(TestCase):
+
+    def setUp(self):
+        self.server, base_url = start_stand_in()
+        cache.clear()
+        settings_override = override_settings(
+            PAYGATE_STATUS_URL=f'{base_url}/api/v1/status',
+            PAYGATE_STATUS_V2_URL=f'{base_url}/api/v2/status',
+            PAYGATE_RETRY_BACKOFF=0.001,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = CustomUser.objects.create_user(email='client@example.com', username='client', password='x')
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def create_payment(self, tx_reference, status='initiated'):
+        order = Order.objects.create(
+            user=self.user, shipping_address={}, billing_address={}, subtotal=1000, total=1000
+        )
+        return Payment.objects.create(order=order, amount=1000, status=status, tx_reference=tx_reference)
+
+    def test_reconcile_applies_statuses_in_bulk(self):
+        paid = [self.create_payment(f'TX{i}') for i in range(30)]
+        expired = self.create_payment('EXPIRED')
+        waiting = self.create_payment('WAITING')
+        completed = self.create_payment('DONE', status='completed')
+        self.server.statuses = {'EXPIRED': 4, 'WAITING': 2}
+
+        out = io.StringIO()
+        with self.assertNumQueries(8):
+            # lot, savepoint, relecture verrouillée, bulk_update des paiements, journal, commandes,
+            # release, lot vide
+            call_command('reconcile_payments', batch_size=100, concurrency=8, stdout=out)
+
+        self.assertIn('32 paiement(s) vérifié(s) — completed: 30, failed: 1', out.getvalue())
+
+        self.assertEqual(self.server.requests, 32)
+        self.assertEqual(Payment.objects.filter(id__in=[p.id for p in paid], status='completed').count(), 30)
+        self.assertEqual(Order.objects.filter(payment_status='paid', status='confirmed').count(), 30)
+
+        expired.refresh_from_db()
+        waiting.refresh_from_db()
+        completed.order.refresh_from_db()
+        self.assertEqual(expired.status, 'failed')
+        self.assertEqual(waiting.status, 'initiated')
+        self.assertEqual(completed.order.payment_status, 'pending')
+
+    def test_admin_status_check_runs_calls_concurrently(self):
+        payments = [self.create_payment(f'TX{i}') for i in range(40)]
+        self.server.statuses = {'TX0': 4, 'TX1': 2}
+        self.server.delay = 0.3
+        admin_user = CustomUser.objects.create_superuser(email='admin@example.com', username='admin', password='x')
+        self.client.force_login(admin_user)
+
+        start = time.perf_counter()
+        response = self.client.post('/admin/payments/payment/', {
+            'action': 'check_payment_status',
+            '_selected_action': [payment.id for payment in payments],
+        }, follow=True)
+        elapsed = time.perf_counter() - start
+
+        self.assertLess(elapsed, 0.3 * 4)
+        self.assertEqual(self.server.requests, 40)
+        self.assertContains(response, 'Statut vérifié pour 40 paiement(s) (completed: 38, failed: 1, inchangé: 1)')
+        self.assertEqual(Order.objects.filter(payment_status='paid', status='confirmed').count(), 38)
+
+    def test_admin_status_check_does_not_overwrite_concurrent_completion(self):
+        payment = self.create_payment('LATE')
+        self.server.statuses = {'LATE': 4}
+        admin_user = CustomUser.objects.create_superuser(email='admin@example.com', username='admin', password='x')
+        self.client.force_login(admin_user)
+
+        def check_then_complete(payments):
+            # Le webhook complète le paiement pendant l'appel PayGate de l'action
+            results = check_statuses(payments)
+            Payment.objects.filter(id=payment.id).update(status='completed')
+            return results
+
+        check_statuses = services.check_statuses
+        with mock.patch('apps.payments.services.check_statuses', check_then_complete):
+            response = self.client.post('/admin/payments/payment/', {
+                'action': 'check_payment_status', '_selected_action': [payment.id],
+            }, follow=True)
+
+        self.assertContains(response, 'Statut vérifié pour 1 paiement(s) (inchangé: 1)')
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'completed')
+        self.assertFalse(PaymentLedgerEntry.objects.filter(payment=payment, source='admin').exists())
+
+    @override_settings(PAYGATE_STATUS_CHECK_WORKERS=4)
+    def test_concurrent_status_checks_share_one_pool(self):
+        services._status_checks = None
+        self.addCleanup(setattr, services, '_status_checks', None)
+        batches = [[self.create_payment(f'TX{batch}-{i}') for i in range(10)] for batch in range(2)]
+        self.server.delay = 0.1
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=services.check_statuses, args=[batch]) for batch in batches]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # 20 appels, 4 à la fois pour tout le processus : au moins 5 vagues de 0,1 s
+        self.assertGreaterEqual(time.perf_counter() - start, 0.45)
+        self.assertEqual(self.server.requests, 20)
+
+    def test_poller_backs_off_and_drops_final_payments(self):
+        paid = self.create_payment('PAID')
+        waiting = self.create_payment('WAITING')
+        self.server.statuses = {'WAITING': 2}
+        poller = PaymentPoller(base_interval=5, max_interval=60, backoff_step=60, expiry=3600)
+
+        self.assertEqual(poller.run_once(now=0), 2)
+        self.assertEqual(list(poller.created), [waiting.id])
+        self.assertEqual(poller.queue, [(5, waiting.id)])
+
+        # Rien n'est dû avant l'échéance
+        self.assertEqual(poller.run_once(now=4), 0)
+        self.assertEqual(self.server.requests, 2)
+
+        self.assertEqual(poller.interval_for(0), 5)
+        self.assertEqual(poller.interval_for(130), 20)
+        self.assertEqual(poller.interval_for(10000), 60)
+        paid.refresh_from_db()
+        self.assertEqual(paid.status, 'completed')
+
+
+class WebhookInboxTests(TestCase):
+
+    def setUp(self):
+        self.server, base_url = start_stand_in()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        settings_override = override_settings(PAYGATE_STATUS_URL=f'{base_url}/api/v1/status')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.clear()
+
+        user = CustomUser.objects.create_user(email='client@example.com', username='client', password='x')
+        order = Order.objects.create(user=user, shipping_address={}, billing_address={}, subtotal=500, total=500)
+        self.payment = Payment.objects.create(order=order, amount=500, status='initiated', tx_reference='TX42')
+        self.webhook = {
+            'tx_reference': 'TX42',
+            'identifier': self.payment.identifier,
+            'payment_reference': 'REF42',
+            'amount': '500',
+            'payment_method': 'FLOOZ',
+            'phone_number': '90123456',
+        }
+
+    def test_webhook_is_acknowledged_then_applied_once(self):
+        client = APIClient()
+        for _ in range(3):
+            response = client.post('/api/payments/webhook/', self.webhook, format='json')
+            self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(WebhookEvent.objects.count(), 1)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'initiated')
+
+        out = io.StringIO()
+        call_command('process_webhooks', once=True, stdout=out)
+        call_command('process_webhooks', once=True, stdout=out)
+        self.assertEqual(out.getvalue().splitlines(), ['1 webhook(s) traité(s)', '0 webhook(s) traité(s)'])
+
+        self.payment.refresh_from_db()
+        self.payment.order.refresh_from_db()
+        self.assertEqual(self.payment.status, 'completed')
+        self.assertEqual(self.payment.payment_reference, 'REF42')
+        self.assertEqual(self.payment.order.payment_status, 'paid')
+        self.assertEqual(PaymentPayload.objects.get(payment=self.payment).response, self.webhook)
+        self.assertIsNotNone(WebhookEvent.objects.get().processed_at)
+
+    def test_invalid_payload_is_not_retried(self):
+        del self.webhook['phone_number']
+        APIClient().post('/api/payments/webhook/', self.webhook, format='json')
+
+        call_command('process_webhooks', once=True, stdout=io.StringIO())
+
+        event = WebhookEvent.objects.get()
+        self.assertEqual(event.error, 'Champ manquant: phone_number')
+        self.assertIsNotNone(event.processed_at)
+
+    def test_webhook_must_be_confirmed_by_paygate(self):
+        forged = {**self.webhook, 'amount': '1'}
+        APIClient().post('/api/payments/webhook/', forged, format='json')
+        call_command('process_webhooks', once=True, stdout=io.StringIO())
+
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'initiated')
+        event = WebhookEvent.objects.get()
+        self.assertEqual(event.error, 'Montant différent de celui du paiement')
+        self.assertIsNotNone(event.processed_at)
+
+        cache.clear()
+        event.delete()
+        self.server.statuses = {'TX42': 6}
+        APIClient().post('/api/payments/webhook/', self.webhook, format='json')
+        call_command('process_webhooks', once=True, stdout=io.StringIO())
+
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'initiated')
+        self.assertEqual(WebhookEvent.objects.get().error, 'Paiement non confirmé par PayGate (statut 6)')
+        self.assertEqual(self.server.requests, 2)
+
+    def test_forged_webhook_does_not_shadow_genuine_callback(self):
+        client = APIClient()
+        client.post('/api/payments/webhook/', {**self.webhook, 'amount': '1'}, format='json')
+        call_command('process_webhooks', once=True, stdout=io.StringIO())
+        self.assertEqual(WebhookEvent.objects.get().error, 'Montant différent de celui du paiement')
+
+        # Même tx_reference, payload différent : le vrai rappel est enregistré puis appliqué
+        cache.clear()
+        client.post('/api/payments/webhook/', self.webhook, format='json')
+        self.assertEqual(WebhookEvent.objects.count(), 2)
+        call_command('process_webhooks', once=True, stdout=io.StringIO())
+
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'completed')
+
+    def test_unknown_payment_is_retried_with_backoff(self):
+        APIClient().post('/api/payments/webhook/', {**self.webhook, 'identifier': 'PAYINCONNU'}, format='json')
+
+        for _ in range(3):
+            call_command('process_webhooks', once=True, stdout=io.StringIO())
+        event = WebhookEvent.objects.get()
+        self.assertEqual((event.attempts, event.error), (1, 'Paiement non trouvé'))
+        self.assertIsNone(event.processed_at)
+        self.assertAlmostEqual((event.next_attempt_at - timezone.now()).total_seconds(), 10, delta=1)
+
+        # Le paiement apparaît avant la tentative suivante
+        WebhookEvent.objects.update(payload=self.webhook, next_attempt_at=timezone.now())
+        call_command('process_webhooks', once=True, stdout=io.StringIO())
+
+        event.refresh_from_db()
+        self.assertEqual((event.attempts, event.error), (2, ''))
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'completed')
+
+
+    def test_poll_answer_read_before_webhook_is_discarded(self):
+        # Le poller lit le paiement puis attend PayGate ; le webhook le complète entre-temps
+        stale = Payment.objects.get(id=self.payment.id)
+        APIClient().post('/api/payments/webhook/', self.webhook, format='json')
+        call_command('process_webhooks', once=True, stdout=io.StringIO())
+
+        for paygate_status in (0, 4):
+            self.assertEqual(apply_status_results([(stale, {'status': paygate_status})]), [])
+            # L'objet du poller reprend l'état relu
+            self.assertEqual(stale.status, 'completed')
+            stale.status = 'initiated'
+
+        self.payment.order.refresh_from_db()
+        self.assertEqual(self.payment.order.payment_status, 'paid')
+        self.assertEqual(
+            list(PaymentLedgerEntry.objects.filter(payment=self.payment).values_list('source', 'amount')),
+            [('webhook', Decimal('500'))]
+        )
+
+
+class PaymentLedgerTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_superuser(email='admin@example.com', username='admin', password='x')
+        self.payments = []
+        for amount in (500, 700, 900):
+            order = Order.objects.create(
+                user=self.user, shipping_address={}, billing_address={}, subtotal=amount, total=amount
+            )
+            self.payments.append(Payment.objects.create(order=order, amount=amount, status='initiated'))
+
+    def reconcile(self, export):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as export_file:
+            export_file.write(export)
+            export_file.flush()
+            out = io.StringIO()
+            call_command('reconcile_ledger', export_file.name, chunk_size=2, stdout=out, stderr=io.StringIO())
+        # (identifier, anomalie, total export) : les décimaux du journal dépendent de la base
+        return sorted(
+            (identifier, anomaly, export_total)
+            for identifier, anomaly, _, export_total, _ in csv.reader(out.getvalue().splitlines()[1:])
+        )
+
+    def test_transitions_are_journaled_and_reconciled(self):
+        first, second, third = self.payments
+        self.client.force_login(self.user)
+        self.client.post('/admin/payments/payment/', {
+            'action': 'mark_as_completed', '_selected_action': [p.id for p in self.payments]
+        })
+        self.client.post('/admin/payments/payment/', {
+            'action': 'mark_as_failed', '_selected_action': [third.id]
+        })
+
+        entries = PaymentLedgerEntry.objects.filter(identifier=third.identifier)
+        self.assertEqual(
+            [(e.source, e.previous_status, e.new_status, e.amount) for e in entries],
+            [('admin', 'initiated', 'completed', Decimal('900')), ('admin', 'completed', 'failed', Decimal('-900'))]
+        )
+        with self.assertRaises(ValueError):
+            entries[0].save()
+        # Encaissement annulé : la commande repasse en attente, non payée
+        third.order.refresh_from_db()
+        self.assertEqual((third.order.status, third.order.payment_status), ('pending', 'failed'))
+
+        # Export trié : un paiement en trop, un montant divergent, un paiement manquant
+        rows = sorted([(first.identifier, '500'), (second.identifier, '650'), ('PAY0EXTRA', '100')])
+        export = 'identifier,amount\n' + ''.join(f'{identifier},{amount}\n' for identifier, amount in rows)
+        self.assertEqual(self.reconcile(export), sorted([
+            (second.identifier, 'montant_different', '650'),
+            ('PAY0EXTRA', 'absent_journal', '100'),
+        ]))
+
+        Order.objects.filter(id=first.order_id).update(total=450)
+        self.assertIn((first.identifier, 'total_commande', '500'), self.reconcile(export))
+
+    def test_change_form_cannot_bypass_journal(self):
+        payment = self.payments[0]
+        self.client.force_login(self.user)
+        response = self.client.get(f'/admin/payments/payment/{payment.id}/change/')
+        fields = response.context['adminform'].form.fields
+        self.assertNotIn('status', fields)
+        self.assertNotIn('amount', fields)
+
+
+class StatusCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+
+    def test_concurrent_lookups_share_one_call(self):
+        status_cache = StatusCache()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            time.sleep(0.1)
+            return {'status': 2}
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(status_cache.get_or_fetch(None, 'TX1', fetch)))
+            for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'status': 2}] * 10)
+
+        # Appel suivant servi par le cache
+        status_cache.get_or_fetch(None, 'TX1', fetch)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(status_cache.hits, 1)
+
+    async def test_concurrent_async_lookups_share_one_call(self):
+        status_cache = StatusCache()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            return {'status': 2}
+
+        lookups = [asyncio.ensure_future(status_cache.aget_or_fetch(None, 'TX1', fetch)) for _ in range(10)]
+        while not calls:
+            await asyncio.sleep(0.005)
+        lookups[0].cancel()  # une requête abandonnée n'annule pas l'appel partagé
+        results = await asyncio.gather(*lookups[1:])
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'status': 2}] * 9)
+        self.assertEqual(metrics.snapshot()['counters']['paygate.status_cache.coalesced'], 9)
+        self.assertEqual(await status_cache.aget_or_fetch(None, 'TX1', fetch), {'status': 2})
+        self.assertEqual(len(calls), 1)
+
+    @override_settings(PAYGATE_STATUS_CACHE_TTL=0.01)
+    def test_final_status_outlives_ttl_and_errors_are_not_cached(self):
+        status_cache = StatusCache()
+        status_cache.get_or_fetch(None, 'FINAL', lambda: {'status': 0})
+        status_cache.get_or_fetch(None, 'PENDING', lambda: {'status': 2})
+        status_cache.get_or_fetch(None, 'ERROR', lambda: {'error': 'Erreur HTTP: 500'})
+        time.sleep(0.05)
+
+        self.assertEqual(cache.get(StatusCache.key(tx_reference='FINAL')), {'status': 0})
+        self.assertIsNone(cache.get(StatusCache.key(tx_reference='PENDING')))
+        self.assertIsNone(cache.get(StatusCache.key(tx_reference='ERROR')))
+
+
+class CircuitBreakerTests(SimpleTestCase):
+
+    def test_breaker_opens_fails_fast_then_recovers(self):
+        breaker = CircuitBreaker('test', window=4, min_calls=4, failure_rate=0.5, reset_timeout=0.05)
+        for success in (True, False, True, False):
+            breaker.allow()
+            breaker.record(success, 0.01)
+
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(PayGateUnavailable):
+            breaker.allow()
+
+        time.sleep(0.06)
+        breaker.allow()  # appel d'essai
+        with self.assertRaises(PayGateUnavailable):
+            breaker.allow()
+        breaker.record(True, 0.01)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_slow_calls_trip_the_breaker(self):
+        breaker = CircuitBreaker('test', window=3, min_calls=3, slow_call_rate=1, slow_call_duration=1)
+        for _ in range(3):
+            breaker.allow()
+            breaker.record(True, 2)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+    def test_bulkhead_rejects_beyond_capacity(self):
+        bulkhead = Bulkhead('test', size=1, timeout=0.01)
+        with bulkhead:
+            with self.assertRaises(PayGateUnavailable):
+                with bulkhead:
+                    pass
+        with bulkhead:
+            self.assertEqual(bulkhead.in_flight, 1)
+
+
+class PayGateSimulatorTests(SimpleTestCase):
+
+    def setUp(self):
+        self.simulator = PayGateSimulator(auth_token='secret', confirm_delay=0.05).start()
+        self.addCleanup(self.simulator.stop)
+
+    def post(self, path, **data):
+        return requests.post(f'{self.simulator.base_url}{path}', json={'auth_token': 'secret', **data}, timeout=5).json()
+
+    def test_payment_is_confirmed_after_delay(self):
+        payment = {'identifier': 'PAY1', 'amount': '1000', 'network': 'FLOOZ', 'phone_number': '90123456'}
+        tx_reference = self.post('/api/v1/pay', **payment)['tx_reference']
+
+        self.assertEqual(self.post('/api/v1/pay', **payment), {'status': 6})
+        self.assertEqual(self.post('/api/v2/status', identifier='PAY1')['status'], 2)
+
+        time.sleep(0.2)
+        self.assertEqual(self.post('/api/v1/status', tx_reference=tx_reference)['status'], 0)
+        self.assertEqual(self.post('/api/v1/check-balance'), {'flooz': 1000, 'tmoney': 0})
+        self.assertEqual(self.post('/api/v1/pay', auth_token='wrong', **{**payment, 'identifier': 'PAY2'}), {'status': 2})
+
+
+class AsyncPaymentViewTests(TestCase):
+
+    def setUp(self):
+        self.simulator = PayGateSimulator(auth_token='secret', latency=0.2, jitter=0).start()
+        self.addCleanup(self.simulator.stop)
+        base_url = self.simulator.base_url
+        settings_override = override_settings(
+            PAYGATE_API_KEY='secret',
+            PAYGATE_API_URL=f'{base_url}/api/v1/pay',
+            PAYGATE_STATUS_V2_URL=f'{base_url}/api/v2/status',
+            PAYGATE_BALANCE_URL=f'{base_url}/api/v1/check-balance',
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.clear()
+
+        self.user = CustomUser.objects.create_user(email='client@example.com', username='client', password='x')
+        self.orders = [
+            Order.objects.create(user=self.user, shipping_address={}, billing_address={}, subtotal=1000, total=1000)
+            for _ in range(10)
+        ]
+        self.headers = {'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+
+    async def test_paygate_calls_overlap(self):
+        async def initiate(order):
+            return await self.async_client.post('/api/payments/mobile-payment/initiate/', {
+                'order_id': order.id, 'phone_number': '+22890123456', 'network': 'FLOOZ'
+            }, content_type='application/json', headers=self.headers)
+
+        start = time.perf_counter()
+        responses = await asyncio.gather(*[initiate(order) for order in self.orders])
+        elapsed = time.perf_counter() - start
+
+        self.assertLess(elapsed, 0.2 * len(self.orders) / 2)
+        self.assertEqual({response.status_code for response in responses}, {200})
+        self.assertEqual(await Payment.objects.filter(status='initiated').acount(), 10)
+
+        identifier = responses[0].json()['identifier']
+        response = await self.async_client.post(
+            '/api/payments/check-status/', {'identifier': identifier},
+            content_type='application/json', headers=self.headers
+        )
+        self.assertEqual(response.json()['status'], 2)
+
+        response = await self.async_client.get('/api/payments/balance/', headers=self.headers)
+        self.assertEqual(response.json(), {'flooz': 0, 'tmoney': 0})
+        self.assertEqual((await self.async_client.get('/api/payments/balance/')).status_code, 401)
+
+    def test_wsgi_request_closes_its_async_transport(self):
+        opened = []
+        open_transport = AsyncPayGateTransport.open
+
+        def record(transport):
+            opened.append(transport)
+            return open_transport(transport)
+
+        request = RequestFactory().get('/api/payments/balance/', HTTP_AUTHORIZATION=self.headers['Authorization'])
+        with mock.patch.object(AsyncPayGateTransport, 'open', record):
+            # Sous WSGI, chaque appel d'une vue async a sa propre boucle
+            responses = [async_to_sync(views.balance)(request) for _ in range(2)]
+
+        self.assertEqual([response.status_code for response in responses], [200, 200])
+        self.assertEqual(len(opened), 2)
+        self.assertTrue(all(transport.client.is_closed for transport in opened))
+        self.assertFalse(set(opened) & set(transport_module._async_transports.values()))
+
+    async def test_redirect_payment_reuses_pending_payment(self):
+        order = self.orders[0]
+        await Payment.objects.acreate(order=order, amount=1000)  # tentative précédente interrompue
+        body = {
+            'order_id': order.id, 'phone_number': '+22890123456', 'network': 'TMONEY',
+            'use_redirect': True, 'return_url': 'https://boutique.example/retour'
+        }
+
+        response = await self.async_client.post(
+            '/api/payments/mobile-payment/initiate/', body, content_type='application/json', headers=self.headers
+        )
+        data = response.json()
+        self.assertEqual(data['method'], 'redirect')
+        self.assertIn(f"identifier={data['identifier']}", data['payment_url'])
+        payment = await Payment.objects.aget(order=order)
+        self.assertEqual((payment.id, payment.status, payment.network), (data['payment_id'], 'initiated', 'TMONEY'))
+
+        response = await self.async_client.post(
+            '/api/payments/mobile-payment/initiate/', body, content_type='application/json', headers=self.headers
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Un paiement est déjà en cours pour cette commande')
+
+    async def test_payment_can_be_retried_after_refusal(self):
+        order = self.orders[0]
+        body = {'order_id': order.id, 'phone_number': '+22890123456', 'network': 'FLOOZ'}
+
+        async def initiate():
+            return await self.async_client.post(
+                '/api/payments/mobile-payment/initiate/', body, content_type='application/json', headers=self.headers
+            )
+
+        breaker = CircuitBreaker('test', min_calls=1, reset_timeout=0.3)
+        breaker.record(False, 0)
+        with mock.patch('apps.payments.resilience._breaker', breaker):
+            response = await initiate()
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response['Retry-After'], '1')
+            self.assertFalse(await Payment.objects.filter(order=order).aexists())
+
+            await asyncio.sleep(0.3)
+            with self.settings(PAYGATE_API_URL=f'{self.simulator.base_url}/introuvable'):
+                response = await initiate()
+            self.assertEqual(response.status_code, 400)
+            failed = await Payment.objects.aget(order=order)
+            self.assertEqual(failed.status, 'failed')
+
+            response = await initiate()
+
+        self.assertEqual(response.status_code, 200)
+        payment = await Payment.objects.aget(order=order)
+        self.assertEqual((payment.id, payment.status, payment.error_message), (failed.id, 'initiated', ''))
+        self.assertNotEqual(payment.identifier, failed.identifier)
+        self.assertEqual(await PaymentLedgerEntry.objects.filter(payment=payment).acount(), 2)
+
+
+@override_settings(PAYMENT_EVENTS_POLL_INTERVAL=0.1, PAYMENT_EVENTS_MAX_DURATION=5)
+class PaymentEventsTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email='client@example.com', username='client', password='x')
+        order = Order.objects.create(user=self.user, shipping_address={}, billing_address={}, subtotal=1000, total=1000)
+        self.payment = Payment.objects.create(order=order, amount=1000, status='initiated')
+        self.url = f'/api/payments/{self.payment.id}/events/'
+        self.headers = {'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+
+    async def events(self, response):
+        """Statuts des événements reçus jusqu'à la fermeture du flux, et nombre de keep-alive"""
+        statuses, keep_alives = [], 0
+        async for chunk in response.streaming_content:
+            chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+            if chunk.startswith(': keep-alive'):
+                keep_alives += 1
+            else:
+                statuses.append(json.loads(chunk.split('data: ', 1)[1])['status'])
+        return statuses, keep_alives
+
+    async def test_requires_owner(self):
+        self.assertEqual((await self.async_client.get(self.url)).status_code, 401)
+
+        other = await CustomUser.objects.acreate(email='autre@example.com', username='autre')
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(other)}'}
+        self.assertEqual((await self.async_client.get(self.url, headers=headers)).status_code, 404)
+
+    @override_settings(PAYMENT_EVENTS_POLL_INTERVAL=5)
+    async def test_status_change_is_pushed_and_closes_stream(self):
+        response = await self.async_client.get(self.url, headers=self.headers)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        async def complete():
+            # Après l'événement initial ; sans le réveil du broker, le flux attendrait 5 s
+            await asyncio.sleep(0.05)
+            await Payment.objects.filter(id=self.payment.id).aupdate(status='completed')
+            broker.publish(self.payment.id, 'completed')
+
+        start = time.monotonic()
+        (statuses, _), _ = await asyncio.gather(self.events(response), complete())
+        self.assertEqual(statuses, ['initiated', 'completed'])
+        self.assertLess(time.monotonic() - start, 1)
+
+    async def test_final_status_sends_one_event(self):
+        await Payment.objects.filter(id=self.payment.id).aupdate(status='failed')
+        response = await self.async_client.get(self.url, headers=self.headers)
+        self.assertEqual(await self.events(response), (['failed'], 0))
+
+    @override_settings(PAYMENT_EVENTS_MAX_DURATION=0.35)
+    async def test_stream_ends_after_max_duration(self):
+        response = await self.async_client.get(self.url, headers=self.headers)
+        start = time.monotonic()
+        statuses, keep_alives = await self.events(response)
+        self.assertEqual(statuses, ['initiated'])
+        self.assertGreaterEqual(keep_alives, 3)
+        self.assertLess(time.monotonic() - start, 1)
+
+
+class PaymentIdentifierTests(SimpleTestCase):
+
+    def test_identifiers_are_unique_and_time_ordered(self):
+        identifiers = [generate_payment_identifier() for _ in range(5000)]
+        self.assertEqual(len(set(identifiers)), len(identifiers))
+        for identifier in identifiers:
+            self.assertRegex(identifier, r'^PAY[0-9A-Z]{19}$')
+
+        # Horodatage en tête (9 caractères base36) : l'ordre lexicographique suit le temps
+        time.sleep(0.002)
+        later = generate_payment_identifier()
+        self.assertGreater(later[:12], max(identifier[:12] for identifier in identifiers))
+
+
+class UniqueIdentifierMigrationTests(TransactionTestCase):
+    migrate_from = [('payments', '0003_indexes_hot_queries')]
+    migrate_to = [('payments', '0004_unique_identifier')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_blank_and_duplicate_identifiers_are_replaced(self):
+        old_apps = self.migrate(self.migrate_from)
+        user = old_apps.get_model('users', 'CustomUser').objects.create(email='client@example.com', username='client')
+        Order = old_apps.get_model('orders', 'Order')
+        Payment = old_apps.get_model('payments', 'Payment')
+        payments = []
+        for number, identifier in enumerate(['', 'PAYDOUBLON', '', 'PAYDOUBLON', 'PAYUNIQUE']):
+            order = Order.objects.create(
+                user=user, order_number=f'CMD{number}', shipping_address={}, billing_address={},
+                subtotal=1000, total=1000
+            )
+            payments.append(Payment.objects.create(order=order, amount=1000, identifier=identifier).id)
+
+        new_apps = self.migrate(self.migrate_to)
+        identifiers = dict(new_apps.get_model('payments', 'Payment').objects.values_list('id', 'identifier'))
+        self.assertEqual(len(set(identifiers.values())), 5)
+        # Le premier porteur d'un identifiant le garde, les autres en reçoivent un nouveau
+        self.assertEqual((identifiers[payments[1]], identifiers[payments[4]]), ('PAYDOUBLON', 'PAYUNIQUE'))
+        for payment_id in (payments[0], payments[2], payments[3]):
+            self.assertRegex(identifiers[payment_id], r'^PAY[0-9A-Z]{19}$')
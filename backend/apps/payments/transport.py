@@ -0,0 +1,186 @@
+# backend/apps/payments/transport.py
+import asyncio
+import logging
+import random
+import threading
+import time
+import weakref
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+from apps.core import metrics
+from .resilience import Bulkhead, get_breaker
+
+logger = logging.getLogger(__name__)
+
+# Réponses HTTP qui justifient une nouvelle tentative
+RETRY_STATUS_CODES = {502, 503, 504}
+
+
+class PayGateTransport:
+    """
+    Client HTTP vers PayGate : session partagée (keep-alive, pool de connexions),
+    délais de connexion et de lecture séparés, nouvelles tentatives avec
+    backoff aléatoire pour les appels idempotents. Chaque tentative passe par
+    le cloisonnement (bulkhead) puis le disjoncteur.
+    """
+
+    def __init__(self, connect_timeout=None, read_timeout=None, max_retries=None,
+                 retry_backoff=None, pool_size=None, breaker=None, bulkhead=None):
+        self.connect_timeout = connect_timeout or settings.PAYGATE_CONNECT_TIMEOUT
+        self.read_timeout = read_timeout or settings.PAYGATE_READ_TIMEOUT
+        self.max_retries = settings.PAYGATE_MAX_RETRIES if max_retries is None else max_retries
+        self.retry_backoff = settings.PAYGATE_RETRY_BACKOFF if retry_backoff is None else retry_backoff
+        pool_size = pool_size or settings.PAYGATE_POOL_SIZE
+        self.breaker = breaker or get_breaker()
+        self.bulkhead = bulkhead or Bulkhead('paygate')
+
+        self.session = requests.Session()
+        self.session.headers.update({'Content-Type': 'application/json'})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    @property
+    def timeout(self):
+        return (self.connect_timeout, self.read_timeout)
+
+    def backoff_delay(self, attempt):
+        """Full jitter : délai aléatoire dans [0, backoff * 2^attempt]"""
+        return random.uniform(0, self.retry_backoff * (2 ** attempt))
+
+    def post(self, url, data, operation, idempotent=False):
+        """
+        POST JSON vers PayGate.
+        Seuls les appels idempotents (statut, solde) sont rejoués.
+        """
+        attempts = 1 + (self.max_retries if idempotent else 0)
+
+        for attempt in range(attempts):
+            with self.bulkhead:
+                self.breaker.allow()
+                start = time.perf_counter()
+                try:
+                    response = self.session.post(url, json=data, timeout=self.timeout)
+                except (requests.ConnectionError, requests.Timeout):
+                    record_call(self.breaker, operation, False, time.perf_counter() - start)
+                    if attempt + 1 >= attempts:
+                        raise
+                else:
+                    record_call(self.breaker, operation, response.status_code < 500, time.perf_counter() - start)
+                    if response.status_code not in RETRY_STATUS_CODES or attempt + 1 >= attempts:
+                        return response
+
+            metrics.increment(f'paygate.{operation}.retry')
+            delay = self.backoff_delay(attempt)
+            logger.warning("Nouvelle tentative PayGate %s dans %.2fs", operation, delay)
+            time.sleep(delay)
+
+    def close(self):
+        self.session.close()
+
+
+def record_call(breaker, operation, success, duration):
+    metrics.observe(f'paygate.{operation}', duration)
+    logger.debug(
+        "Appel PayGate %s", operation,
+        extra={'operation': operation, 'success': success, 'duration_ms': round(duration * 1000, 2)}
+    )
+    if not success:
+        metrics.increment(f'paygate.{operation}.error')
+    breaker.record(success, duration)
+
+
+class AsyncPayGateTransport:
+    """
+    Équivalent asynchrone (httpx) de PayGateTransport, avec une limite
+    de requêtes simultanées. Partage le disjoncteur du processus.
+    À ouvrir dans la boucle qui l'utilise :
+
+        async with AsyncPayGateTransport(concurrency=50) as transport:
+            response = await transport.post(url, data, operation='status', idempotent=True)
+    """
+
+    def __init__(self, concurrency=None, connect_timeout=None, read_timeout=None,
+                 max_retries=None, retry_backoff=None, breaker=None):
+        self.breaker = breaker or get_breaker()
+        self.concurrency = concurrency or settings.PAYGATE_ASYNC_CONCURRENCY
+        self.connect_timeout = connect_timeout or settings.PAYGATE_CONNECT_TIMEOUT
+        self.read_timeout = read_timeout or settings.PAYGATE_READ_TIMEOUT
+        self.max_retries = settings.PAYGATE_MAX_RETRIES if max_retries is None else max_retries
+        self.retry_backoff = settings.PAYGATE_RETRY_BACKOFF if retry_backoff is None else retry_backoff
+        self.client = None
+        self.semaphore = None
+
+    def open(self):
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        self.client = httpx.AsyncClient(
+            headers={'Content-Type': 'application/json'},
+            timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+            limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+        )
+        return self
+
+    async def __aenter__(self):
+        return self.open()
+
+    async def __aexit__(self, *exc_info):
+        await self.client.aclose()
+
+    def backoff_delay(self, attempt):
+        return random.uniform(0, self.retry_backoff * (2 ** attempt))
+
+    async def post(self, url, data, operation, idempotent=False):
+        attempts = 1 + (self.max_retries if idempotent else 0)
+
+        for attempt in range(attempts):
+            async with self.semaphore:
+                self.breaker.allow()
+                start = time.perf_counter()
+                try:
+                    response = await self.client.post(url, json=data)
+                except httpx.TransportError:
+                    record_call(self.breaker, operation, False, time.perf_counter() - start)
+                    if attempt + 1 >= attempts:
+                        raise
+                else:
+                    record_call(self.breaker, operation, response.status_code < 500, time.perf_counter() - start)
+                    if response.status_code not in RETRY_STATUS_CODES or attempt + 1 >= attempts:
+                        return response
+
+            metrics.increment(f'paygate.{operation}.retry')
+            await asyncio.sleep(self.backoff_delay(attempt))
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_transport():
+    """Transport partagé par le processus (une session, un pool de connexions)"""
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = PayGateTransport()
+    return _transport
+
+
+_async_transports = weakref.WeakKeyDictionary()
+
+
+def get_async_transport():
+    """
+    Transport asynchrone partagé par les vues async de la boucle courante :
+    sous ASGI, une boucle par worker, donc un pool de connexions httpx par worker.
+    Jamais fermé : réservé aux boucles qui durent autant que le processus.
+    """
+    loop = asyncio.get_running_loop()
+    transport = _async_transports.get(loop)
+    if transport is None:
+        transport = AsyncPayGateTransport(concurrency=settings.PAYGATE_ASYNC_VIEW_CONCURRENCY).open()
+        _async_transports[loop] = transport
+    return transport
@@ -1,7 +1,7 @@
 # backend/apps/payments/urls.py
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import PaymentViewSet
+from .views import PaymentViewSet, payment_events, initiate_payment, check_payment_status, balance
 
 router = DefaultRouter()
 router.register(r'payments', PaymentViewSet, basename='payment')
@@ -11,7 +11,7 @@ urlpatterns = [
 
     # Route pour créer un paiement mobile (POST /api/payments/mobile-payment/initiate/)
     path('mobile-payment/initiate/',
-         PaymentViewSet.as_view({'post': 'create'}),
+         initiate_payment,
          name='mobile-payment-initiate'),
 
     # Webhook pour les callbacks PayGate (POST /api/payments/webhook/)
@@ -21,11 +21,16 @@ urlpatterns = [
 
     # Vérifier le statut d'un paiement (POST /api/payments/check-status/)
     path('check-status/',
-         PaymentViewSet.as_view({'post': 'check_status'}),
+         check_payment_status,
          name='payment-status'),
 
+    # Flux SSE du statut d'un paiement (GET /api/payments/{id}/events/)
+    path('<int:pk>/events/',
+         payment_events,
+         name='payment-events'),
+
     # Consulter le solde (GET /api/payments/balance/)
     path('balance/',
-         PaymentViewSet.as_view({'get': 'balance'}),
+         balance,
          name='payment-balance'),
 ]
\ No newline at end of file
@@ -1,28 +1,57 @@
 # backend/apps/payments/views.py
+import asyncio
+import json
 import logging
+import time
+from contextlib import asynccontextmanager
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.http import JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
-from apps.orders.models import Order
+from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
+from rest_framework.exceptions import AuthenticationFailed
+from apps.core import metrics
+from apps.users.authentication import StatelessJWTAuthentication
 from .models import Payment
 from .serializers import PaymentCreateSerializer, PaymentSerializer, PaymentStatusSerializer
-from .services import PayGateGlobalService
+from .services import PayGateGlobalService, AsyncPayGateGlobalService, FINAL_STATUSES
+from .transport import AsyncPayGateTransport, get_async_transport
+from .inbox import enqueue_webhook
+from . import handlers
+from .events import broker
 
 logger = logging.getLogger(__name__)
 
 
+def paygate_unavailable_response(result):
+    """503 avec Retry-After quand le disjoncteur ou le cloisonnement refuse l'appel"""
+    response = Response(
+        {'success': False, 'error': result['error']},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+    if result.get('retry_after'):
+        response['Retry-After'] = str(max(1, round(result['retry_after'])))
+    return response
+
+
 class PaymentViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
-    queryset = Payment.objects.all().select_related('order', 'order__user')
+    # Ordre de la commande (OneToOne) : servi par l'index (user, -created_at) des commandes
+    queryset = Payment.objects.all().select_related('order', 'order__user').order_by('-order__created_at')
 
     def get_queryset(self):
         return self.queryset.filter(order__user=self.request.user)
 
+    def get_permissions(self):
+        if self.action == 'webhook':
+            return [AllowAny()]
+        return super().get_permissions()
+
     def get_serializer_class(self):
         if self.action == 'create':
             return PaymentCreateSerializer
@@ -30,93 +59,39 @@ class PaymentViewSet(viewsets.ModelViewSet):
 
     def create(self, request):
         """
-        POST /api/payments/mobile-payment/initiate/
-        Créer un nouveau paiement mobile money
+        POST /api/payments/payments/
+        Créer un nouveau paiement mobile money (équivalent synchrone de initiate_payment)
         """
         serializer = PaymentCreateSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            order_id = serializer.validated_data['order_id']
-
-            # Récupérer et valider la commande
-            try:
-                order = Order.objects.get(id=order_id, user=request.user)
-            except Order.DoesNotExist:
-                return Response(
-                    {'error': 'Commande non trouvée'},
-                    status=status.HTTP_404_NOT_FOUND
-                )
-
-            # Vérifier si la commande peut être payée
-            if order.payment_status == 'paid':
-                return Response(
-                    {'error': 'Cette commande a déjà été payée'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            # Vérifier si un paiement existe déjà pour cette commande
-            existing_payment = Payment.objects.filter(order=order).first()
-            if existing_payment:
-                if existing_payment.status == 'completed':
-                    return Response(
-                        {'error': 'Un paiement réussi existe déjà pour cette commande'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-                elif existing_payment.status == 'initiated':
-                    return Response(
-                        {'error': 'Un paiement est déjà en cours pour cette commande'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
+        use_redirect = serializer.validated_data.get('use_redirect', False)
+        unavailable = None if use_redirect else handlers.paygate_unavailable()
+        if unavailable:
+            return paygate_unavailable_response(unavailable)
 
-            # Créer le paiement
-            payment = Payment.objects.create(
-                order=order,
-                phone_number=serializer.validated_data['phone_number'],
-                network=serializer.validated_data['network'],
-                amount=order.total,  # Montant de la commande
-                description=serializer.validated_data.get('description', ''),
-                currency='XOF'
-            )
+        try:
+            payment, refusal = handlers.prepare_payment(request.user, serializer.validated_data)
+            if refusal:
+                return Response(*refusal)
 
             paygate_service = PayGateGlobalService()
 
-            if serializer.validated_data.get('use_redirect', False):
+            if use_redirect:
                 # Méthode 2: Redirection vers page PayGate
                 return_url = serializer.validated_data.get('return_url', '')
                 payment_url = paygate_service.generate_redirect_url(payment, return_url)
+                return Response(handlers.redirect_body(payment, payment_url))
 
-                return Response({
-                    'success': True,
-                    'payment_id': payment.id,
-                    'identifier': payment.identifier,
-                    'payment_url': payment_url,
-                    'method': 'redirect',
-                    'message': 'Redirigez vers la page de paiement'
-                })
-            else:
-                # Méthode 1: API directe
-                result = paygate_service.initiate_direct_payment(payment)
-
-                if result['success']:
-                    return Response({
-                        'success': True,
-                        'payment_id': payment.id,
-                        'identifier': payment.identifier,
-                        'tx_reference': result['tx_reference'],
-                        'method': 'direct',
-                        'message': result['message']
-                    })
-                else:
-                    return Response({
-                        'success': False,
-                        'error': result['error'],
-                        'status_code': result.get('status_code')
-                    }, status=status.HTTP_400_BAD_REQUEST)
+            # Méthode 1: API directe
+            result = paygate_service.initiate_direct_payment(payment)
+            if result.get('unavailable'):
+                return paygate_unavailable_response(result)
+            return Response(*handlers.direct_result(payment, result))
 
         except Exception as e:
-            logger.error(f"Erreur création paiement: {str(e)}")
+            logger.exception("Erreur création paiement: %s", e)
             return Response(
                 {'error': 'Erreur lors de la création du paiement'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -126,40 +101,18 @@ class PaymentViewSet(viewsets.ModelViewSet):
     def status(self, request, pk=None):
         """
         GET /api/payments/{id}/status/
-        Récupérer le statut d'un paiement spécifique
+        Récupérer le statut d'un paiement spécifique.
+        Lecture locale : le statut est tenu à jour par le webhook et run_payment_poller.
         """
         payment = self.get_object()
 
-        paygate_service = PayGateGlobalService()
-        status_data = paygate_service.check_payment_status(
-            identifier=payment.identifier,
-            tx_reference=payment.tx_reference
-        )
-
-        if 'error' in status_data:
-            return Response(
-                {'error': status_data['error']},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        # Mettre à jour le statut local si nécessaire
-        paygate_status = status_data.get('status')
-        if paygate_status == 0 and payment.status != 'completed':  # Paiement réussi
-            payment.status = 'completed'
-            payment.payment_reference = status_data.get('payment_reference', '')
-            payment.payment_date = status_data.get('datetime')
-            payment.payment_method_detail = status_data.get('payment_method', '')
-            payment.save()
-
-            # Mettre à jour la commande
-            order = payment.order
-            order.payment_status = 'paid'
-            order.status = 'confirmed'
-            order.save()
-
         return Response({
             'local_status': payment.status,
-            'paygate_status': status_data
+            'identifier': payment.identifier,
+            'tx_reference': payment.tx_reference,
+            'payment_reference': payment.payment_reference,
+            'payment_date': payment.payment_date,
+            'updated_at': payment.updated_at,
         })
 
     @action(detail=False, methods=['post'])
@@ -168,26 +121,27 @@ class PaymentViewSet(viewsets.ModelViewSet):
         """
         POST /api/payments/webhook/
         Webhook pour les notifications PayGate Global
-        Cette endpoint ne requiert pas d'authentification
+        Cette endpoint ne requiert pas d'authentification.
+        Le payload est enregistré dans la boîte de réception et traité par process_webhooks.
         """
         try:
             webhook_data = request.data
-            logger.info(f"Webhook PayGate reçu: {webhook_data}")
-
-            paygate_service = PayGateGlobalService()
-            result = paygate_service.process_webhook(webhook_data)
+            if hasattr(webhook_data, 'dict'):
+                webhook_data = webhook_data.dict()
+            logger.info(
+                "Webhook PayGate reçu %s", webhook_data.get('tx_reference'),
+                extra={'identifier': webhook_data.get('identifier')}
+            )
 
-            if result['success']:
-                return Response({'status': 'success'})
-            else:
-                logger.error(f"Erreur traitement webhook: {result['error']}")
+            if not enqueue_webhook(webhook_data):
                 return Response(
-                    {'error': result['error']},
+                    {'error': 'Champ manquant: tx_reference'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
+            return Response({'status': 'success'})
 
         except Exception as e:
-            logger.error(f"Erreur traitement webhook: {str(e)}")
+            logger.exception("Erreur traitement webhook: %s", e)
             return Response(
                 {'error': 'Erreur lors du traitement du webhook'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -196,7 +150,7 @@ class PaymentViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['post'])
     def check_status(self, request):
         """
-        POST /api/payments/check-status/
+        POST /api/payments/payments/check_status/
         Vérifier le statut d'un paiement par identifiant
         """
         serializer = PaymentStatusSerializer(data=request.data)
@@ -206,46 +160,32 @@ class PaymentViewSet(viewsets.ModelViewSet):
         identifier = serializer.validated_data.get('identifier')
         tx_reference = serializer.validated_data.get('tx_reference')
 
-        # Vérifier que l'utilisateur a accès à ce paiement
-        if identifier:
-            try:
-                payment = Payment.objects.get(
-                    identifier=identifier,
-                    order__user=request.user
-                )
-            except Payment.DoesNotExist:
-                return Response(
-                    {'error': 'Paiement non trouvé'},
-                    status=status.HTTP_404_NOT_FOUND
-                )
-
-        paygate_service = PayGateGlobalService()
-        status_data = paygate_service.check_payment_status(identifier, tx_reference)
-
-        if 'error' in status_data:
-            return Response(
-                {'error': status_data['error']},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        if not handlers.can_check_status(request.user, identifier):
+            return Response({'error': 'Paiement non trouvé'}, status=status.HTTP_404_NOT_FOUND)
 
-        return Response(status_data)
+        status_data = PayGateGlobalService().check_payment_status(identifier, tx_reference)
+        if status_data.get('unavailable'):
+            return paygate_unavailable_response(status_data)
+        return Response(*handlers.paygate_result(status_data))
 
     @action(detail=False, methods=['get'])
     def balance(self, request):
         """
-        GET /api/payments/balance/
+        GET /api/payments/payments/balance/
         Consulter le solde des comptes (nécessite IP whitelistée)
         """
-        paygate_service = PayGateGlobalService()
-        balance_data = paygate_service.get_balance()
-
-        if 'error' in balance_data:
-            return Response(
-                {'error': balance_data['error']},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        balance_data = PayGateGlobalService().get_balance()
+        if balance_data.get('unavailable'):
+            return paygate_unavailable_response(balance_data)
+        return Response(*handlers.paygate_result(balance_data))
 
-        return Response(balance_data)
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def metrics(self, request):
+        """
+        GET /api/payments/metrics/
+        Métriques du processus : latences et erreurs des appels PayGate
+        """
+        return Response(metrics.snapshot())
 
     def list(self, request):
         """
@@ -263,4 +203,210 @@ class PaymentViewSet(viewsets.ModelViewSet):
         """
         payment = self.get_object()
         serializer = self.get_serializer(payment)
-        return Response(serializer.data)
\ No newline at end of file
+        return Response(serializer.data)
+
+
+async def authenticate_jwt(request):
+    """Authentification JWT pour les vues async hors DRF ; retourne l'utilisateur ou None"""
+    try:
+        result = await sync_to_async(StatelessJWTAuthentication().authenticate)(request)
+    except AuthenticationFailed:
+        return None
+    return result[0] if result else None
+
+
+def sse_event(payment):
+    data = json.dumps({
+        'id': payment.id,
+        'status': payment.status,
+        'payment_reference': payment.payment_reference,
+        'updated_at': payment.updated_at.isoformat(),
+    })
+    return f"event: status\ndata: {data}\n\n"
+
+
+async def payment_events(request, pk):
+    """
+    GET /api/payments/{id}/events/
+    Flux Server-Sent Events du statut d'un paiement. Un événement est envoyé
+    à la connexion puis à chaque changement ; le flux se ferme sur un statut final.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Méthode non autorisée'}, status=405)
+
+    user = await authenticate_jwt(request)
+    if user is None:
+        return JsonResponse({'error': 'Authentification requise'}, status=401)
+
+    fields = ['id', 'status', 'payment_reference', 'updated_at']
+    queryset = Payment.objects.filter(pk=pk, order__user=user).only(*fields)
+    payment = await queryset.afirst()
+    if payment is None:
+        return JsonResponse({'error': 'Paiement non trouvé'}, status=404)
+
+    async def stream():
+        current = payment
+        last_status = None
+        deadline = time.monotonic() + settings.PAYMENT_EVENTS_MAX_DURATION
+
+        async with broker.subscribe(current.id) as notifications:
+            while True:
+                if current.status != last_status:
+                    last_status = current.status
+                    yield sse_event(current)
+                if current.status in FINAL_STATUSES or time.monotonic() >= deadline:
+                    break
+
+                try:
+                    await asyncio.wait_for(
+                        notifications.get(),
+                        timeout=settings.PAYMENT_EVENTS_POLL_INTERVAL
+                    )
+                except asyncio.TimeoutError:
+                    # Commentaire SSE : garde la connexion ouverte à travers les proxys
+                    yield ": keep-alive\n\n"
+
+                # Relecture de la ligne : couvre aussi les changements faits par d'autres processus
+                current = await queryset.afirst() or current
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+# Vues async des appels PayGate : sous ASGI, l'attente réseau ne bloque
+# pas de thread du pool ; les vues DRF restent synchrones.
+
+def request_data(request):
+    """Corps JSON ou formulaire ; None si le JSON est invalide"""
+    if request.content_type == 'application/json':
+        try:
+            return json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+    return request.POST.dict()
+
+
+def unavailable_json(result):
+    """Équivalent JsonResponse de paygate_unavailable_response"""
+    response = JsonResponse({'success': False, 'error': result['error']}, status=503)
+    if result.get('retry_after'):
+        response['Retry-After'] = str(max(1, round(result['retry_after'])))
+    return response
+
+
+@asynccontextmanager
+async def async_service(request):
+    """
+    Sous ASGI, la boucle du worker dure : son transport partagé garde ses
+    connexions d'une requête à l'autre. Sous WSGI (runserver), chaque vue async
+    tourne dans une boucle neuve : transport ouvert puis fermé pour la requête.
+    """
+    if isinstance(request, ASGIRequest):
+        yield AsyncPayGateGlobalService(transport=get_async_transport())
+        return
+    async with AsyncPayGateTransport(concurrency=settings.PAYGATE_ASYNC_VIEW_CONCURRENCY) as transport:
+        yield AsyncPayGateGlobalService(transport=transport)
+
+
+@csrf_exempt
+async def initiate_payment(request):
+    """
+    POST /api/payments/mobile-payment/initiate/
+    Créer un nouveau paiement mobile money
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Méthode non autorisée'}, status=405)
+
+    user = await authenticate_jwt(request)
+    if user is None:
+        return JsonResponse({'error': 'Authentification requise'}, status=401)
+
+    data = request_data(request)
+    if data is None:
+        return JsonResponse({'error': 'JSON invalide'}, status=400)
+    serializer = PaymentCreateSerializer(data=data)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+
+    use_redirect = serializer.validated_data.get('use_redirect', False)
+    unavailable = None if use_redirect else handlers.paygate_unavailable()
+    if unavailable:
+        return unavailable_json(unavailable)
+
+    try:
+        payment, refusal = await sync_to_async(handlers.prepare_payment)(user, serializer.validated_data)
+        if refusal:
+            body, status_code = refusal
+            return JsonResponse(body, status=status_code)
+
+        async with async_service(request) as paygate_service:
+            if use_redirect:
+                return_url = serializer.validated_data.get('return_url', '')
+                payment_url = await sync_to_async(paygate_service.generate_redirect_url)(payment, return_url)
+                return JsonResponse(handlers.redirect_body(payment, payment_url))
+
+            result = await paygate_service.initiate_direct_payment(payment)
+        if result.get('unavailable'):
+            return unavailable_json(result)
+        body, status_code = handlers.direct_result(payment, result)
+        return JsonResponse(body, status=status_code)
+
+    except Exception as e:
+        logger.exception("Erreur création paiement: %s", e)
+        return JsonResponse({'error': 'Erreur lors de la création du paiement'}, status=500)
+
+
+@csrf_exempt
+async def check_payment_status(request):
+    """
+    POST /api/payments/check-status/
+    Vérifier le statut d'un paiement par identifiant
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Méthode non autorisée'}, status=405)
+
+    user = await authenticate_jwt(request)
+    if user is None:
+        return JsonResponse({'error': 'Authentification requise'}, status=401)
+
+    data = request_data(request)
+    if data is None:
+        return JsonResponse({'error': 'JSON invalide'}, status=400)
+    serializer = PaymentStatusSerializer(data=data)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+
+    identifier = serializer.validated_data.get('identifier')
+    tx_reference = serializer.validated_data.get('tx_reference')
+
+    if not await sync_to_async(handlers.can_check_status)(user, identifier):
+        return JsonResponse({'error': 'Paiement non trouvé'}, status=404)
+
+    async with async_service(request) as paygate_service:
+        status_data = await paygate_service.check_payment_status(identifier, tx_reference)
+    if status_data.get('unavailable'):
+        return unavailable_json(status_data)
+    body, status_code = handlers.paygate_result(status_data)
+    return JsonResponse(body, status=status_code)
+
+
+async def balance(request):
+    """
+    GET /api/payments/balance/
+    Consulter le solde des comptes (nécessite IP whitelistée)
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Méthode non autorisée'}, status=405)
+
+    user = await authenticate_jwt(request)
+    if user is None:
+        return JsonResponse({'error': 'Authentification requise'}, status=401)
+
+    async with async_service(request) as paygate_service:
+        balance_data = await paygate_service.get_balance()
+    if balance_data.get('unavailable'):
+        return unavailable_json(balance_data)
+    body, status_code = handlers.paygate_result(balance_data)
+    return JsonResponse(body, status=status_code)
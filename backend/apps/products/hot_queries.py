@@ -0,0 +1,21 @@
+# backend/apps/products/hot_queries.py
+from apps.core.query_plans import register
+from .models import Product
+
+
+@register('products.published')
+def published_products():
+    """ProductViewSet.list"""
+    return Product.objects.filter(is_published=True)
+
+
+@register('products.published_by_category')
+def published_products_by_category():
+    """ProductViewSet.list?category="""
+    return Product.objects.filter(is_published=True, category_id=1)
+
+
+@register('products.featured')
+def featured_products():
+    """ProductViewSet.featured"""
+    return Product.objects.filter(is_published=True, is_featured=True)
@@ -35,6 +35,15 @@ class Product(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        # Index partiels : le catalogue ne lit que les produits publiés
+        indexes = [
+            models.Index(fields=['-created_at'], name='product_published_idx',
+                         condition=models.Q(is_published=True)),
+            models.Index(fields=['category', '-created_at'], name='product_published_cat_idx',
+                         condition=models.Q(is_published=True)),
+            models.Index(fields=['-created_at'], name='product_featured_idx',
+                         condition=models.Q(is_published=True, is_featured=True)),
+        ]
 
     def __str__(self):
         return self.name
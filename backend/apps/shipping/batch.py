@@ -0,0 +1,155 @@
+# backend/apps/shipping/batch.py
+"""
+Devis groupés : livraison et taxes pour de nombreux triplets
+(destination, poids, sous-total) en opérations vectorisées NumPy.
+
+Les grilles tarifaires de l'index en mémoire sont converties une fois en
+tableaux d'entiers (centimes, grammes) ; chaque lot est regroupé par pays
+puis évalué en une opération matricielle lignes x modes de livraison.
+L'arithmétique entière donne exactement les montants de quote() et
+tax_for() (arrondi au centime, demi vers le haut).
+"""
+import threading
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+
+from .services import CENTS, ShippingIndex, shipping_index, tax_rate
+
+GRAMS = Decimal('0.001')
+RATE_SCALE = 10 ** 6  # taux en millionièmes
+NO_LIMIT = np.iinfo(np.int64).max
+
+
+class BatchOverflow(ValueError):
+    """Montants dont les produits intermédiaires dépasseraient les entiers 64 bits"""
+
+
+def to_units(value, unit, scale):
+    """Decimal -> entier de `unit` : to_units(Decimal('1.5'), GRAMS, 3) == 1500"""
+    return int(Decimal(value).quantize(unit, rounding=ROUND_HALF_UP).scaleb(scale))
+
+
+def divide_half_up(values, divisor):
+    """Division entière arrondie demi vers le haut (valeurs positives)"""
+    return (values + divisor // 2) // divisor
+
+
+class RateTable:
+    """Grilles tarifaires de l'index sous forme de tableaux"""
+
+    def __init__(self, countries):
+        methods = {}
+        for entries in countries.values():
+            for method in entries:
+                methods.setdefault(method.id, method)
+        self.methods = list(methods.values())
+        position = {method.id: i for i, method in enumerate(self.methods)}
+
+        self.ids = np.array([m.id for m in self.methods], dtype=np.int64)
+        self.base_cents = np.array([to_units(m.price, CENTS, 2) for m in self.methods], dtype=np.int64)
+        self.per_kg_cents = np.array([to_units(m.price_per_kg, CENTS, 2) for m in self.methods], dtype=np.int64)
+        self.max_grams = np.array(
+            [NO_LIMIT if m.max_weight is None else to_units(m.max_weight, GRAMS, 3) for m in self.methods],
+            dtype=np.int64
+        )
+        self.countries = {
+            country: np.array([position[m.id] for m in entries], dtype=np.intp)
+            for country, entries in countries.items()
+        }
+
+
+_table_lock = threading.Lock()
+_table = (None, None)  # (index source, RateTable)
+
+
+def rate_table():
+    """RateTable de l'index courant, recalculée quand l'index est reconstruit"""
+    global _table
+    countries = shipping_index.snapshot()
+    source, table = _table
+    if source is not countries:
+        with _table_lock:
+            source, table = _table
+            if source is not countries:
+                table = RateTable(countries)
+                _table = (countries, table)
+    return table
+
+
+def batch_quote(rows):
+    """
+    rows : séquence de (pays, poids en kg, sous-total).
+    Retourne, pour chaque ligne, la taxe et les devis par mode disponible
+    triés par prix, avec le total sous-total + taxe + livraison.
+    """
+    table = rate_table()
+    countries = [ShippingIndex.normalize(row[0]) for row in rows]
+    gram_units = [to_units(row[1] or 0, GRAMS, 3) for row in rows]
+    subtotal_units = [to_units(row[2] or 0, CENTS, 2) for row in rows]
+    rates = {country: tax_rate(country) for country in set(countries)}
+    rate_units = [int(rates[country] * RATE_SCALE) for country in countries]
+
+    # Plus grands produits calculés ci-dessous, vérifiés en entiers Python (sans débordement)
+    largest = max(
+        max(gram_units, default=0) * int(table.per_kg_cents.max(initial=0)) + int(table.base_cents.max(initial=0)),
+        max(subtotal_units, default=0) * max(rate_units, default=0),
+    )
+    if largest >= NO_LIMIT // 4:
+        raise BatchOverflow("Montants hors de la plage des entiers 64 bits")
+
+    grams = np.array(gram_units, dtype=np.int64)
+    subtotals = np.array(subtotal_units, dtype=np.int64)
+    scaled_rates = np.array(rate_units, dtype=np.int64)
+    taxes = divide_half_up(subtotals * scaled_rates, RATE_SCALE)
+
+    groups = defaultdict(list)
+    for i, country in enumerate(countries):
+        groups[country].append(i)
+
+    weight_list, subtotal_list, tax_list = grams.tolist(), subtotals.tolist(), taxes.tolist()
+    results = [None] * len(rows)
+    for country, indices in groups.items():
+        indices = np.array(indices, dtype=np.intp)
+        methods = table.countries.get(country, np.empty(0, dtype=np.intp))
+
+        # Matrices lignes x modes : prix, disponibilité selon le poids, ordre (prix, id)
+        group_grams = grams[indices][:, None]
+        prices = table.base_cents[methods] + divide_half_up(table.per_kg_cents[methods] * group_grams, 1000)
+        available = group_grams <= table.max_grams[methods]
+        order = np.lexsort((
+            np.broadcast_to(table.ids[methods], prices.shape),
+            np.where(available, prices, NO_LIMIT),
+        ))
+        totals = (subtotals[indices] + taxes[indices])[:, None] + prices
+
+        # Sortie : listes Python plutôt qu'un accès élément par élément aux tableaux
+        entries = [table.methods[position] for position in methods.tolist()]
+        for i, row_order, row_available, row_prices, row_totals in zip(
+            indices.tolist(), order.tolist(), available.tolist(), prices.tolist(), totals.tolist()
+        ):
+            quotes = []
+            for column in row_order:
+                if not row_available[column]:
+                    break
+                method = entries[column]
+                quotes.append({
+                    'method_id': method.id,
+                    'name': method.name,
+                    'method_type': method.method_type,
+                    'zone': method.zone_name,
+                    'price': Decimal(row_prices[column]).scaleb(-2),
+                    'min_days': method.min_days,
+                    'max_days': method.max_days,
+                    'total': Decimal(row_totals[column]).scaleb(-2),
+                })
+            results[i] = {
+                'country': country,
+                'weight': Decimal(weight_list[i]).scaleb(-3),
+                'subtotal': Decimal(subtotal_list[i]).scaleb(-2),
+                'tax_rate': rates[country],
+                'tax': Decimal(tax_list[i]).scaleb(-2),
+                'quotes': quotes,
+            }
+    return results
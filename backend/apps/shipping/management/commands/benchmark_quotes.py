@@ -0,0 +1,51 @@
+# backend/apps/shipping/management/commands/benchmark_quotes.py
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.shipping.batch import batch_quote
+from apps.shipping.services import quote, shipping_index, tax_for
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesurer le débit (devis/s) du calcul groupé livraison + taxe face à "
+        "la boucle quote() / tax_for(), sur des lignes aléatoires"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000, help="Lignes par lot")
+        parser.add_argument('--repeat', type=int, default=5, help="Lots mesurés (le meilleur est retenu)")
+        parser.add_argument('--max-weight', type=float, default=20.0, help="Poids maximal tiré (kg)")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        countries = sorted(shipping_index.snapshot())
+        if not countries:
+            raise CommandError("Aucun mode de livraison actif : rien à mesurer")
+
+        generator = random.Random(options['seed'])
+        rows = [
+            (
+                generator.choice(countries),
+                Decimal(generator.randint(0, int(options['max_weight'] * 1000))).scaleb(-3),
+                Decimal(generator.randint(100, 50_000_000)).scaleb(-2),
+            )
+            for _ in range(options['rows'])
+        ]
+
+        def loop():
+            return [(tax_for(country, subtotal), quote(country, weight)) for country, weight, subtotal in rows]
+
+        for label, run in (('quote() en boucle', loop), ('batch_quote', lambda: batch_quote(rows))):
+            run()  # échauffement : index et grilles tarifaires construits
+            best = min(self.measure(run) for _ in range(options['repeat']))
+            self.stdout.write(f"{label:<18} {len(rows) / best:>12,.0f} devis/s ({best * 1000:.1f} ms / {len(rows)} lignes)")
+
+    @staticmethod
+    def measure(run):
+        started = time.perf_counter()
+        run()
+        return time.perf_counter() - started
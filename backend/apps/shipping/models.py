@@ -21,6 +21,8 @@ class ShippingMethod(models.Model):
     zone = models.ForeignKey(ShippingZone, on_delete=models.CASCADE, related_name='methods')
     method_type = models.CharField(max_length=20, choices=METHOD_TYPES, default='standard')
     price = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
+    price_per_kg = models.DecimalField(max_digits=10, decimal_places=2, default=0, validators=[MinValueValidator(0)])
+    max_weight = models.DecimalField(max_digits=8, decimal_places=2, blank=True, null=True)  # kg, vide = sans limite
     min_days = models.IntegerField(default=3)
     max_days = models.IntegerField(default=7)
     is_active = models.BooleanField(default=True)
@@ -5,11 +5,26 @@ from .models import ShippingZone, ShippingMethod
 class ShippingMethodSerializer(serializers.ModelSerializer):
     class Meta:
         model = ShippingMethod
-        fields = ['id', 'name', 'method_type', 'price', 'min_days', 'max_days']
+        fields = ['id', 'name', 'method_type', 'price', 'price_per_kg', 'max_weight', 'min_days', 'max_days']
 
 class ShippingZoneSerializer(serializers.ModelSerializer):
     methods = ShippingMethodSerializer(many=True, read_only=True)
     
     class Meta:
         model = ShippingZone
-        fields = ['id', 'name', 'countries', 'methods']
\ No newline at end of file
+        fields = ['id', 'name', 'countries', 'methods']
+
+
+class ShippingQuoteRequestSerializer(serializers.Serializer):
+    country = serializers.CharField(max_length=100)
+    weight = serializers.DecimalField(max_digits=10, decimal_places=3, min_value=0, default=0)
+
+
+class ShippingQuoteSerializer(serializers.Serializer):
+    method_id = serializers.IntegerField()
+    name = serializers.CharField()
+    method_type = serializers.CharField()
+    zone = serializers.CharField()
+    price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    min_days = serializers.IntegerField()
+    max_days = serializers.IntegerField()
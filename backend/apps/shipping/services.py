@@ -0,0 +1,147 @@
+# backend/apps/shipping/services.py
+"""
+Devis de livraison à partir d'un index en mémoire pays -> modes de livraison.
+
+L'index est construit en une requête au premier devis, puis servi sans
+accès à la base. Toute sauvegarde ou suppression d'une zone ou d'un mode
+l'invalide : localement, et dans les autres processus via un numéro de
+version en cache, relu au plus toutes les SHIPPING_INDEX_CHECK_INTERVAL secondes.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import ShippingMethod
+
+VERSION_KEY = 'shipping:index:version'
+CENTS = Decimal('0.01')
+
+
+@dataclass(frozen=True)
+class IndexedMethod:
+    id: int
+    name: str
+    method_type: str
+    zone_id: int
+    zone_name: str
+    price: Decimal
+    price_per_kg: Decimal
+    max_weight: Decimal | None
+    min_days: int
+    max_days: int
+
+    def accepts(self, weight):
+        return self.max_weight is None or weight <= self.max_weight
+
+    def price_for(self, weight):
+        return (self.price + self.price_per_kg * weight).quantize(CENTS, rounding=ROUND_HALF_UP)
+
+
+class ShippingIndex:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._countries = None
+        self._version = None
+        self._checked_at = 0.0
+
+    @staticmethod
+    def normalize(country):
+        return (country or '').strip().upper()
+
+    def build(self):
+        """
+        Une requête : modes actifs des zones actives, regroupés par pays.
+        Lue sur la base principale : l'index est conservé jusqu'à la modification
+        suivante, une réplique en retard le figerait dans un état périmé.
+        """
+        countries = {}
+        methods = ShippingMethod.objects.using('default').filter(
+            is_active=True, zone__is_active=True
+        ).select_related('zone').order_by('price', 'id')
+        for method in methods:
+            entry = IndexedMethod(
+                id=method.id,
+                name=method.name,
+                method_type=method.method_type,
+                zone_id=method.zone_id,
+                zone_name=method.zone.name,
+                price=method.price,
+                price_per_kg=method.price_per_kg,
+                max_weight=method.max_weight,
+                min_days=method.min_days,
+                max_days=method.max_days,
+            )
+            for country in {self.normalize(country) for country in method.zone.countries}:
+                countries.setdefault(country, []).append(entry)
+        return {country: tuple(entries) for country, entries in countries.items()}
+
+    def _stale(self):
+        """Vérifier la version partagée au plus toutes les N secondes"""
+        now = time.monotonic()
+        if now - self._checked_at < settings.SHIPPING_INDEX_CHECK_INTERVAL:
+            return False
+        self._checked_at = now
+        return cache.get(VERSION_KEY, 0) != self._version
+
+    def snapshot(self):
+        """Index courant {pays: (IndexedMethod, ...)}, reconstruit si périmé"""
+        countries = self._countries
+        if countries is None or self._stale():
+            with self._lock:
+                if self._countries is None or self._version != cache.get(VERSION_KEY, 0):
+                    self._version = cache.get(VERSION_KEY, 0)
+                    self._countries = self.build()
+                    self._checked_at = time.monotonic()
+                countries = self._countries
+        return countries
+
+    def methods_for(self, country):
+        return self.snapshot().get(self.normalize(country), ())
+
+    def invalidate(self):
+        """Appelé par les signaux de ShippingZone / ShippingMethod"""
+        try:
+            cache.incr(VERSION_KEY)
+        except ValueError:
+            cache.set(VERSION_KEY, 1, None)
+        with self._lock:
+            self._countries = None
+
+
+shipping_index = ShippingIndex()
+
+
+def tax_rate(country):
+    return settings.TAX_RATES.get(ShippingIndex.normalize(country), settings.DEFAULT_TAX_RATE)
+
+
+def tax_for(country, subtotal):
+    """Taxe due sur le sous-total pour ce pays de livraison"""
+    return (Decimal(subtotal) * tax_rate(country)).quantize(CENTS, rounding=ROUND_HALF_UP)
+
+
+def quote(country, weight):
+    """
+    Devis par mode de livraison disponible pour ce pays et ce poids (kg),
+    triés par prix croissant.
+    """
+    weight = Decimal(weight or 0)
+    quotes = [
+        {
+            'method_id': method.id,
+            'name': method.name,
+            'method_type': method.method_type,
+            'zone': method.zone_name,
+            'price': method.price_for(weight),
+            'min_days': method.min_days,
+            'max_days': method.max_days,
+        }
+        for method in shipping_index.methods_for(country)
+        if method.accepts(weight)
+    ]
+    return sorted(quotes, key=lambda item: (item['price'], item['method_id']))
@@ -0,0 +1,14 @@
+# backend/apps/shipping/signals.py
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import ShippingMethod, ShippingZone
+from .services import shipping_index
+
+
+@receiver([post_save, post_delete], sender=ShippingZone)
+@receiver([post_save, post_delete], sender=ShippingMethod)
+def invalidate_shipping_index(sender, **kwargs):
+    """Reconstruire l'index une fois la modification validée"""
+    transaction.on_commit(shipping_index.invalidate)
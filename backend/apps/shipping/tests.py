@@ -1,3 +1,98 @@
-from django.test import TestCase
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from .models import ShippingMethod, ShippingZone
+from .batch import BatchOverflow, batch_quote
+from .services import quote, shipping_index, tax_for
+
+
+class ShippingQuoteTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        shipping_index.invalidate()
+        zone = ShippingZone.objects.create(name='Afrique de l\'Ouest', countries=['TG', 'bj'])
+        self.standard = ShippingMethod.objects.create(
+            name='Standard', zone=zone, price='1000', price_per_kg='500', min_days=3, max_days=7
+        )
+        self.express = ShippingMethod.objects.create(
+            name='Express', zone=zone, method_type='express', price='2500', max_weight='2', min_days=1, max_days=2
+        )
+        ShippingMethod.objects.create(name='Inactif', zone=zone, price='1', is_active=False)
+        self.client = APIClient()
+
+    def test_quotes_are_served_from_memory(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/shipping/quote/', {'country': 'bj', 'weight': '1.5'})
+        self.assertEqual(
+            [(item['name'], item['price']) for item in response.data['quotes']],
+            [('Standard', '1750.00'), ('Express', '2500.00')]
+        )
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/shipping/quote/', {'country': 'TG', 'weight': '3'})
+        self.assertEqual([item['name'] for item in response.data['quotes']], ['Standard'])
+
+        self.assertEqual(self.client.get('/api/shipping/quote/', {'country': 'FR'}).data['quotes'], [])
+        self.assertEqual(self.client.get('/api/shipping/quote/', {'weight': '1'}).status_code, 400)
+
+    def test_index_is_rebuilt_after_changes(self):
+        self.client.get('/api/shipping/quote/', {'country': 'TG'})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.express.price = '900'
+            self.express.save()
+
+        response = self.client.get('/api/shipping/quote/', {'country': 'TG'})
+        self.assertEqual(response.data['quotes'][0]['name'], 'Express')
+        self.assertEqual(response.data['quotes'][0]['price'], '900.00')
+
+    @override_settings(TAX_RATES={'TG': Decimal('0.18')}, DEFAULT_TAX_RATE=Decimal('0.05'))
+    def test_batch_matches_single_quotes(self):
+        rows = [
+            ('TG', Decimal('1.5'), Decimal('25000')),
+            ('bj', Decimal('0.001'), Decimal('0.25')),
+            ('TG', Decimal('2.001'), Decimal('99.99')),
+            ('FR', Decimal('1'), Decimal('100')),
+        ]
+        results = batch_quote(rows)
+
+        for (country, weight, subtotal), result in zip(rows, results):
+            tax = tax_for(country, subtotal)
+            self.assertEqual(result['tax'], tax)
+            self.assertEqual(
+                [{key: value for key, value in item.items() if key != 'total'} for item in result['quotes']],
+                quote(country, weight)
+            )
+            for item in result['quotes']:
+                self.assertEqual(item['total'], subtotal + tax + item['price'])
+        self.assertEqual(results[3]['quotes'], [])
+
+        response = self.client.post('/api/shipping/quote/batch/', {
+            'items': [{'country': 'TG', 'weight': '1.5', 'subtotal': '25000'}]
+        }, format='json')
+        self.assertEqual(response.data['results'][0]['tax'], '4500.00')
+        self.assertEqual(response.data['results'][0]['quotes'][0]['total'], '31250.00')
+
+        response = self.client.post('/api/shipping/quote/batch/', {'items': [{'weight': '1'}]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_batch_rejects_values_outside_quote_limits(self):
+        for weight in ('1e13', '1e17', '1e30', '0.0001', '-1', 'NaN'):
+            response = self.client.post('/api/shipping/quote/batch/', {
+                'items': [{'country': 'TG', 'weight': weight, 'subtotal': '100'}]
+            }, format='json')
+            self.assertEqual(response.status_code, 400, weight)
+            self.assertEqual(self.client.get('/api/shipping/quote/', {'country': 'TG', 'weight': weight}).status_code,
+                             400, weight)
+
+        response = self.client.post('/api/shipping/quote/batch/', {
+            'items': [{'country': 'TG', 'weight': '9999999.999', 'subtotal': '99999999.99'}]
+        }, format='json')
+        self.assertEqual(response.data['results'][0]['quotes'][0]['price'], '5000000999.50')
+
+        with self.assertRaises(BatchOverflow):
+            batch_quote([('TG', Decimal('1e15'), Decimal('0'))])
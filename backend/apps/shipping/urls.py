@@ -1,11 +1,17 @@
 # backend/apps/shipping/urls.py
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ShippingZoneViewSet
+from .views import ShippingZoneViewSet, quote_view, batch_quote_view
 
 router = DefaultRouter()
 router.register(r'zones', ShippingZoneViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
+
+    # Devis de livraison (GET /api/shipping/quote/?country=FR&weight=1.5)
+    path('quote/', quote_view, name='shipping-quote'),
+
+    # Devis groupés livraison + taxe (POST {"items": [{country, weight, subtotal}, ...]})
+    path('quote/batch/', batch_quote_view, name='shipping-quote-batch'),
 ]
\ No newline at end of file
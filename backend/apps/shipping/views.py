@@ -1,7 +1,16 @@
 # backend/apps/shipping/views.py
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
 from rest_framework import viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
 from .models import ShippingZone
-from .serializers import ShippingZoneSerializer
+from .serializers import ShippingZoneSerializer, ShippingQuoteRequestSerializer, ShippingQuoteSerializer
+from .batch import BatchOverflow, batch_quote
+from .services import quote
 
 
 class ShippingZoneViewSet(viewsets.ReadOnlyModelViewSet):
@@ -9,6 +18,81 @@ class ShippingZoneViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = ShippingZoneSerializer
 
 
-from django.shortcuts import render
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def quote_view(request):
+    """
+    GET /api/shipping/quote/?country=FR&weight=1.5
+    Devis par mode de livraison pour un pays et un poids (kg, cf. total_weight
+    du panier). Servi depuis l'index en mémoire, sans requête en base.
+    """
+    serializer = ShippingQuoteRequestSerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+    country = serializer.validated_data['country']
+    weight = serializer.validated_data['weight']
+
+    return Response({
+        'country': country.upper(),
+        'weight': weight,
+        'quotes': ShippingQuoteSerializer(quote(country, weight), many=True).data,
+    })
+
+
+def _bounded_decimal(value, max_digits, decimal_places):
+    """Decimal positif aux limites d'un DecimalField(max_digits, decimal_places), sinon InvalidOperation"""
+    number = Decimal(str(value or 0))
+    if not number.is_finite() or number < 0 or number >= 10 ** (max_digits - decimal_places):
+        raise InvalidOperation
+    if number.normalize().as_tuple().exponent < -decimal_places:
+        raise InvalidOperation
+    return number
+
+
+def _batch_rows(items):
+    """
+    Validation légère des lignes : un serializer par ligne coûterait plus que le calcul.
+    Mêmes limites que quote_view (poids) et que les commandes (sous-total).
+    """
+    if not isinstance(items, list) or not items:
+        raise ValidationError({'items': "Liste de {country, weight, subtotal} attendue."})
+    if len(items) > settings.SHIPPING_BATCH_MAX_ROWS:
+        raise ValidationError({'items': f"{settings.SHIPPING_BATCH_MAX_ROWS} lignes au plus."})
+
+    rows = []
+    for position, item in enumerate(items):
+        try:
+            country = str(item['country']).strip()
+            weight = _bounded_decimal(item.get('weight'), max_digits=10, decimal_places=3)
+            subtotal = _bounded_decimal(item.get('subtotal'), max_digits=10, decimal_places=2)
+        except (TypeError, KeyError, AttributeError, InvalidOperation):
+            raise ValidationError({'items': f"Ligne {position} invalide."})
+        if not country:
+            raise ValidationError({'items': f"Ligne {position} invalide."})
+        rows.append((country, weight, subtotal))
+    return rows
+
+
+@api_view(['POST'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def batch_quote_view(request):
+    """
+    POST /api/shipping/quote/batch/
+    {"items": [{"country": "TG", "weight": 1.5, "subtotal": 25000}, ...]}
+    Livraison et taxe pour chaque ligne, calculées en un lot vectorisé.
+    """
+    rows = _batch_rows(request.data.get('items') if isinstance(request.data, dict) else None)
+    try:
+        results = batch_quote(rows)
+    except BatchOverflow:
+        raise ValidationError({'items': "Poids ou sous-total trop élevé pour un calcul exact."})
 
-# Create your views here.
+    # Montants en chaînes, comme les DecimalField des serializers
+    for result in results:
+        for key in ('weight', 'subtotal', 'tax_rate', 'tax'):
+            result[key] = str(result[key])
+        for item in result['quotes']:
+            item['price'] = str(item['price'])
+            item['total'] = str(item['total'])
+    return Response({'results': results})
@@ -0,0 +1,87 @@
+# backend/apps/users/authentication.py
+"""
+Authentification JWT sans requête utilisateur par appel.
+
+JWTAuthentication de simplejwt charge CustomUser à chaque requête. Ici
+l'utilisateur est reconstruit à partir de la revendication user_id du jeton
+signé : une instance CustomUser dont seuls id et les indicateurs
+is_active / is_staff / is_superuser sont chargés (les autres champs sont
+différés). Ces indicateurs viennent d'un cache de AUTH_USER_FLAGS_TTL
+secondes, vidé à chaque sauvegarde ou suppression de l'utilisateur. Les
+jetons révoqués sont écartés sans requête (cf. revocation.py).
+
+Les vues qui ne font que filtrer par request.user n'exécutent donc aucune
+requête d'authentification ; celles qui ont besoin du profil complet
+relisent l'utilisateur (cf. profile_view).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from apps.core import db_routing
+from .models import CustomUser
+from .revocation import revoked_tokens
+
+FLAG_FIELDS = ('is_active', 'is_staff', 'is_superuser')
+MISSING = 'missing'
+LOADED_FIELDS = tuple(
+    field.attname for field in CustomUser._meta.concrete_fields if field.attname in ('id',) + FLAG_FIELDS
+)
+
+
+def flags_key(user_id):
+    return f'users:flags:{user_id}'
+
+
+def user_flags(user_id):
+    """(is_active, is_staff, is_superuser) de l'utilisateur, None s'il n'existe pas"""
+    key = flags_key(user_id)
+    flags = cache.get(key)
+    if flags is None:
+        flags = CustomUser.objects.filter(pk=user_id).values_list(*FLAG_FIELDS).first() or MISSING
+        cache.set(key, flags, settings.AUTH_USER_FLAGS_TTL)
+    return None if flags == MISSING else tuple(flags)
+
+
+def invalidate_user_flags(user_id):
+    cache.delete(flags_key(user_id))
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication dont get_user ne lit que le cache des indicateurs, et
+    qui rejette les jetons d'accès révoqués (ensemble en mémoire)
+    """
+
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        if revoked_tokens.contains(validated_token.get(api_settings.JTI_CLAIM)):
+            raise InvalidToken(_("Token is blacklisted"))
+        return validated_token
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # La vérification compare le hash du mot de passe : utilisateur complet requis
+            return super().get_user(validated_token)
+
+        try:
+            user_id = int(validated_token[api_settings.USER_ID_CLAIM])
+        except (KeyError, TypeError, ValueError) as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        flags = user_flags(user_id)
+        if flags is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if api_settings.CHECK_USER_IS_ACTIVE and not flags[0]:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        db_routing.identify(user_id)  # lectures sur 'default' si l'utilisateur vient d'écrire
+
+        # Instance « chargée » partielle : les champs absents sont différés, et
+        # save() n'écrirait que les champs chargés. from_db attend les valeurs
+        # dans l'ordre des champs du modèle.
+        values = dict(zip(FLAG_FIELDS, flags), id=user_id)
+        return CustomUser.from_db(DEFAULT_DB_ALIAS, LOADED_FIELDS, [values[name] for name in LOADED_FIELDS])
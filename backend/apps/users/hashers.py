@@ -0,0 +1,14 @@
+# backend/apps/users/hashers.py
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """
+    Argon2 aux coûts réglables (ARGON2_*). Même algorithme 'argon2' : tout
+    hash aux anciens paramètres reste vérifiable et est recalculé à la
+    connexion suivante (must_update).
+    """
+    time_cost = settings.ARGON2_TIME_COST
+    memory_cost = settings.ARGON2_MEMORY_COST
+    parallelism = settings.ARGON2_PARALLELISM
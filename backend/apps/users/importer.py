@@ -0,0 +1,135 @@
+# backend/apps/users/importer.py
+"""
+Import en masse de comptes clients (migration de l'ancienne boutique).
+
+Le fichier (CSV ou JSONL) est lu ligne à ligne et traité par lots : les
+mots de passe en clair sont hachés dans un pool de processus (le hachage
+occupe le CPU, le GIL interdirait le parallélisme en threads), les hash
+existants au format Django sont repris tels quels et seront recalculés
+avec le hasher courant à la première connexion. Chaque lot crée les
+utilisateurs puis leurs profils en deux bulk_create, dans une transaction.
+
+Les doublons (email ou username déjà en base ou déjà vus dans le fichier)
+sont détectés sur des ensembles en mémoire, sans requête par ligne.
+"""
+import csv
+import json
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+
+from .models import CustomUser, UserProfile
+
+USER_FIELDS = ('first_name', 'last_name', 'phone', 'address', 'city', 'postal_code', 'country')
+
+
+def read_rows(lines, fmt):
+    """Dictionnaires lus un à un depuis un fichier CSV (avec en-tête) ou JSONL"""
+    if fmt == 'csv':
+        yield from csv.DictReader(lines)
+        return
+    for line in lines:
+        if line.strip():
+            yield json.loads(line)
+
+
+def hash_password(password):
+    return make_password(password)
+
+
+class UserImporter:
+
+    def __init__(self, chunk_size=1000, workers=None):
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.emails = {email.lower() for email in CustomUser.objects.values_list('email', flat=True).iterator()}
+        self.usernames = set(CustomUser.objects.values_list('username', flat=True).iterator())
+
+    def derive_username(self, email):
+        """Partie locale de l'email, suffixée (ama2, ama3...) si déjà prise"""
+        base = username = email.split('@')[0]
+        suffix = 1
+        while username in self.usernames:
+            suffix += 1
+            username = f"{base}{suffix}"
+        return username
+
+    def clean(self, row):
+        """(utilisateur sans mot de passe, mot de passe en clair ou None) ; ValueError si rejetée"""
+        email = (row.get('email') or '').strip()
+        try:
+            validate_email(email)
+        except ValidationError:
+            raise ValueError(f"email invalide: {email!r}")
+        if email.lower() in self.emails:
+            raise ValueError(f"email déjà utilisé: {email}")
+        username = (row.get('username') or '').strip()
+        if not username:
+            username = self.derive_username(email)
+        elif username in self.usernames:
+            raise ValueError(f"username déjà utilisé: {username}")
+
+        user = CustomUser(
+            email=email,
+            username=username,
+            **{field: (row.get(field) or '').strip() for field in USER_FIELDS}
+        )
+        password = row.get('password') or None
+        password_hash = row.get('password_hash') or None
+        if password_hash:
+            try:
+                identify_hasher(password_hash)
+            except ValueError:
+                raise ValueError(f"hash de mot de passe non reconnu pour {email}")
+            user.password = password_hash
+        elif password is None:
+            user.password = make_password(None)  # compte sans mot de passe utilisable
+
+        self.emails.add(email.lower())
+        self.usernames.add(username)
+        return user, password
+
+    def save(self, users):
+        with transaction.atomic():
+            created = CustomUser.objects.bulk_create(users)
+            UserProfile.objects.bulk_create([UserProfile(user=user) for user in created])
+        return len(created)
+
+    def run(self, rows, on_reject=None):
+        """Importer rows ; retourne (créés, rejetés). on_reject(position, raison) par rejet."""
+        created = rejected = 0
+        rows = enumerate(rows, start=1)
+        pool = ProcessPoolExecutor(self.workers, initializer=django.setup) if self.workers != 0 else None
+        try:
+            while chunk := list(islice(rows, self.chunk_size)):
+                users, passwords = [], []
+                for position, row in chunk:
+                    try:
+                        user, password = self.clean(row)
+                    except (ValueError, AttributeError) as e:
+                        rejected += 1
+                        if on_reject:
+                            on_reject(position, str(e))
+                        continue
+                    users.append(user)
+                    if password is not None:
+                        passwords.append((user, password))
+
+                to_hash = [password for _, password in passwords]
+                hashes = pool.map(hash_password, to_hash, chunksize=max(1, len(to_hash) // 32)) if pool else map(
+                    hash_password, to_hash
+                )
+                for (user, _), encoded in zip(passwords, hashes):
+                    user.password = encoded
+
+                if users:
+                    created += self.save(users)
+        finally:
+            if pool:
+                pool.shutdown()
+        return created, rejected
@@ -0,0 +1,36 @@
+# backend/apps/users/management/commands/import_users.py
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.users.importer import UserImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Importer des comptes clients depuis un fichier CSV ou JSONL (colonnes : "
+        "email, username, password ou password_hash, first_name, last_name, phone, "
+        "address, city, postal_code, country)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Fichier .csv ou .jsonl")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Défaut : d'après l'extension")
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Comptes créés par transaction")
+        parser.add_argument('--workers', type=int, default=None,
+                            help="Processus de hachage (défaut : nombre de CPU, 0 : dans ce processus)")
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or ('csv' if options['path'].lower().endswith('.csv') else 'jsonl')
+        importer = UserImporter(chunk_size=options['chunk_size'], workers=options['workers'])
+
+        def on_reject(position, reason):
+            self.stderr.write(f"ligne {position}: {reason}")
+
+        try:
+            with open(options['path'], newline='', encoding='utf-8') as lines:
+                created, rejected = importer.run(read_rows(lines, fmt), on_reject=on_reject)
+        except (OSError, json.JSONDecodeError, UnicodeDecodeError) as e:
+            raise CommandError(f"Import interrompu: {e}")
+
+        self.stdout.write(f"{created} compte(s) créé(s), {rejected} ligne(s) rejetée(s)")
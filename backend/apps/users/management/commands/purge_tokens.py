@@ -0,0 +1,35 @@
+# backend/apps/users/management/commands/purge_tokens.py
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+
+class Command(BaseCommand):
+    help = (
+        "Supprimer par lots les jetons expirés des tables outstanding et "
+        "blacklisted (un jeton expiré est refusé sans consulter la liste noire)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Jetons supprimés par transaction")
+        parser.add_argument('--pause', type=float, default=0.0,
+                            help="Pause entre deux lots (secondes), pour ménager la base")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now()
+        expired = OutstandingToken.objects.filter(expires_at__lte=cutoff).order_by('pk')
+        outstanding = blacklisted = 0
+
+        while True:
+            # Lots par clé primaire : chaque DELETE reste court et borné
+            ids = list(expired.values_list('pk', flat=True)[:options['chunk_size']])
+            if not ids:
+                break
+            blacklisted += BlacklistedToken.objects.filter(token_id__in=ids).delete()[0]
+            outstanding += OutstandingToken.objects.filter(pk__in=ids).delete()[0]
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        self.stdout.write(f"{outstanding} jeton(s) expiré(s) supprimé(s), dont {blacklisted} en liste noire")
@@ -0,0 +1,115 @@
+# backend/apps/users/revocation.py
+"""
+Révocation des jetons JWT (déconnexion, rotation des jetons de rafraîchissement).
+
+Les révocations sont enregistrées dans les tables de
+rest_framework_simplejwt.token_blacklist. La vérification, elle, se fait
+sur un ensemble en mémoire des jti révoqués et non expirés : reconstruit en
+une requête toutes les TOKEN_REVOCATION_REBUILD_INTERVAL secondes, ou dès
+qu'un autre processus signale une révocation via un numéro de version en
+cache (relu au plus toutes les TOKEN_REVOCATION_CHECK_INTERVAL secondes).
+
+Ce signal suppose un cache partagé entre processus (check --deploy,
+serve_asgi). Les jetons de rafraîchissement, rares et à longue durée de
+vie, sont en plus vérifiés en base : un jeton déjà tourné dans un autre
+processus ne peut pas être rejoué.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .models import CustomUser
+
+VERSION_KEY = 'users:revoked_tokens:version'
+
+
+class RevokedTokens:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jtis = None
+        self._version = None
+        self._checked_at = 0.0
+        self._built_at = 0.0
+
+    def build(self):
+        """jti des jetons révoqués encore valides : les expirés sont rejetés de toute façon"""
+        return frozenset(
+            BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now())
+            .values_list('token__jti', flat=True)
+        )
+
+    def _stale(self):
+        now = time.monotonic()
+        if now - self._built_at >= settings.TOKEN_REVOCATION_REBUILD_INTERVAL:
+            return True
+        if now - self._checked_at < settings.TOKEN_REVOCATION_CHECK_INTERVAL:
+            return False
+        self._checked_at = now
+        return cache.get(VERSION_KEY, 0) != self._version
+
+    def snapshot(self):
+        jtis = self._jtis
+        if jtis is None or self._stale():
+            with self._lock:
+                self._version = cache.get(VERSION_KEY, 0)
+                self._jtis = jtis = self.build()
+                self._checked_at = self._built_at = time.monotonic()
+        return jtis
+
+    def contains(self, jti):
+        return jti in self.snapshot()
+
+    def add(self, jti):
+        """Révocation locale immédiate, signalée aux autres processus"""
+        try:
+            version = cache.incr(VERSION_KEY)
+        except ValueError:
+            version = 1
+            cache.set(VERSION_KEY, version, None)
+        with self._lock:
+            if self._jtis is not None:
+                self._jtis = self._jtis | {jti}
+                # Notre propre incrément ne doit pas provoquer de reconstruction
+                if version == (self._version or 0) + 1:
+                    self._version = version
+
+
+revoked_tokens = RevokedTokens()
+
+
+def revoke(token):
+    """Révoquer un jeton d'accès ou de rafraîchissement déjà validé"""
+    jti = token[api_settings.JTI_CLAIM]
+    user_id = CustomUser.objects.filter(pk=token.get(api_settings.USER_ID_CLAIM)).values_list('pk', flat=True).first()
+    outstanding, _ = OutstandingToken.objects.get_or_create(
+        jti=jti,
+        defaults={
+            'user_id': user_id,
+            'created_at': token.current_time,
+            'token': str(token),
+            'expires_at': datetime_from_epoch(token['exp']),
+        },
+    )
+    BlacklistedToken.objects.get_or_create(token=outstanding)
+    revoked_tokens.add(jti)
+
+
+class RevocableRefreshToken(RefreshToken):
+    """RefreshToken vérifié sur l'ensemble en mémoire, puis sur la liste noire en base"""
+
+    def check_blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        if revoked_tokens.contains(jti) or BlacklistedToken.objects.filter(token__jti=jti).exists():
+            raise TokenError("Token is blacklisted")
+
+    def blacklist(self):
+        revoke(self)
@@ -1,7 +1,13 @@
 # backend/apps/users/serializers.py
 from rest_framework import serializers
 from django.contrib.auth.password_validation import validate_password
+from django.db import transaction
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from .authentication import user_flags
 from .models import CustomUser, UserProfile
+from .revocation import RevocableRefreshToken
 
 class UserProfileSerializer(serializers.ModelSerializer):
     class Meta:
@@ -32,6 +38,37 @@ class RegisterSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         validated_data.pop('password2')
-        user = CustomUser.objects.create_user(**validated_data)
-        UserProfile.objects.create(user=user)
-        return user
\ No newline at end of file
+        # Utilisateur et profil ensemble, ou ni l'un ni l'autre
+        with transaction.atomic():
+            user = CustomUser.objects.create_user(**validated_data)
+            UserProfile.objects.create(user=user)
+        return user
+
+
+class RevocableTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Rafraîchissement sans lecture de l'utilisateur ni de la liste noire :
+    révocation vérifiée en mémoire, compte actif via le cache des indicateurs.
+    """
+    token_class = RevocableRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+        flags = user_flags(user_id) if user_id else None
+        if user_id and (flags is None or not flags[0]):
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+
+        data = {'access': str(refresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+            data['refresh'] = str(refresh)
+
+        return data
@@ -0,0 +1,13 @@
+# backend/apps/users/signals.py
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import invalidate_user_flags
+from .models import CustomUser
+
+
+@receiver([post_save, post_delete], sender=CustomUser)
+def invalidate_flags(sender, instance, **kwargs):
+    """Désactivation, changement de droits ou suppression : effet à la requête suivante"""
+    transaction.on_commit(lambda: invalidate_user_flags(instance.pk))
@@ -1,3 +1,195 @@
-from django.test import TestCase
+import json
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .authentication import StatelessJWTAuthentication
+from .backends import ProfileModelBackend
+from .models import CustomUser, UserProfile
+from .revocation import revoked_tokens
+from .throttling import LoginThrottle, RegisterThrottle
+
+
+class StatelessJWTAuthenticationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        revoked_tokens._jtis = None
+        self.user = CustomUser.objects.create_user(
+            email='client@example.com', username='client', password='x', city='Lomé'
+        )
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+        self.request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {self.token}')
+
+    def test_user_is_built_from_token_and_cached_flags(self):
+        authentication = StatelessJWTAuthentication()
+        # Ensemble des jetons révoqués, indicateurs de l'utilisateur
+        with self.assertNumQueries(2):
+            authentication.authenticate(self.request)
+        with self.assertNumQueries(0):
+            user, _ = authentication.authenticate(self.request)
+        self.assertEqual((user.pk, user.is_active, user.is_staff), (self.user.pk, True, False))
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.assertEqual(client.get('/api/auth/profile/').data['city'], 'Lomé')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            authentication.authenticate(self.request)
+
+
+class TokenRevocationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        revoked_tokens._jtis = None
+        self.user = CustomUser.objects.create_user(email='client@example.com', username='client', password='x')
+        self.client = APIClient()
+
+    def login(self):
+        response = self.client.post('/api/auth/login/', {'email': 'client@example.com', 'password': 'x'})
+        return response.data['access'], response.data['refresh']
+
+    def test_logout_revokes_tokens_checked_in_memory(self):
+        access, refresh = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.client.get('/api/orders/orders/archived/')
+
+        # Jeton valide : ni liste noire ni utilisateur relus
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {access}')
+        with self.assertNumQueries(0):
+            StatelessJWTAuthentication().authenticate(request)
+
+        response = self.client.post('/api/auth/token/refresh/', {'refresh': refresh})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.post('/api/auth/token/refresh/', {'refresh': refresh}).status_code, 401)
+
+        response = self.client.post('/api/auth/logout/', {'refresh_token': response.data['refresh']})
+        self.assertEqual(response.status_code, 205)
+        self.assertEqual(self.client.get('/api/orders/orders/archived/').status_code, 401)
+
+    def test_refresh_token_rotated_by_another_process_is_rejected(self):
+        _, refresh = self.login()
+        revoked_tokens.snapshot()  # ensemble en mémoire déjà construit, version en cache inchangée
+
+        outstanding = OutstandingToken.objects.get(jti=RefreshToken(refresh)['jti'])
+        BlacklistedToken.objects.create(token=outstanding)
+
+        self.assertEqual(self.client.post('/api/auth/token/refresh/', {'refresh': refresh}).status_code, 401)
+
+    def test_purge_deletes_expired_tokens_in_chunks(self):
+        expired = timezone.now() - timedelta(days=1)
+        for i in range(5):
+            OutstandingToken.objects.create(user=self.user, jti=f'old-{i}', token='t', expires_at=expired)
+        BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti='old-0'))
+        self.login()
+
+        out = StringIO()
+        call_command('purge_tokens', chunk_size=2, stdout=out)
+        self.assertIn('5 jeton(s)', out.getvalue())
+        self.assertEqual(OutstandingToken.objects.count(), 1)
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+
+class LoginPerformanceTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(email='client@example.com', username='client', password='x')
+        UserProfile.objects.create(user=self.user)
+        self.client = APIClient()
+
+    def test_legacy_hash_is_upgraded_and_profile_loaded_with_user(self):
+        CustomUser.objects.filter(pk=self.user.pk).update(password=make_password('x', hasher='pbkdf2_sha256'))
+
+        response = self.client.post('/api/auth/login/', {'email': 'client@example.com', 'password': 'x'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['user']['profile']['newsletter'])
+        self.assertTrue(CustomUser.objects.get(pk=self.user.pk).password.startswith('argon2'))
+
+    def test_throttled_login_is_rejected_before_hashing(self):
+        with patch.object(LoginThrottle, 'get_rate', return_value='2/min'), \
+                patch.object(ProfileModelBackend, 'authenticate', return_value=None) as authenticate:
+            statuses = [
+                self.client.post('/api/auth/login/', {'email': 'client@example.com', 'password': 'bad'}).status_code
+                for _ in range(4)
+            ]
+        self.assertEqual(statuses, [401, 401, 429, 429])
+        self.assertEqual(authenticate.call_count, 2)
+
+
+    def test_forwarded_for_header_does_not_reset_the_limit(self):
+        with patch.object(RegisterThrottle, 'get_rate', return_value='2/min'):
+            statuses = [
+                self.client.post('/api/auth/register/', {}, HTTP_X_FORWARDED_FOR=f'203.0.113.{i}').status_code
+                for i in range(4)
+            ]
+        self.assertEqual(statuses, [400, 400, 429, 429])
+
+    def test_concurrent_requests_cannot_overshoot_the_limit(self):
+        request = RequestFactory().post('/api/auth/register/')
+        results = []
+
+        def attempt():
+            results.append(RegisterThrottle().allow_request(request, None))
+
+        with patch.object(RegisterThrottle, 'get_rate', return_value='5/min'):
+            threads = [threading.Thread(target=attempt) for _ in range(20)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(results.count(True), 5)
+
+
+class ImportUsersTests(TestCase):
+
+    def test_import_streams_rows_hashes_in_pool_and_skips_duplicates(self):
+        CustomUser.objects.create_user(email='existing@example.com', username='existing', password='x')
+        legacy_hash = make_password('ancien', hasher='pbkdf2_sha256')
+        path = Path(tempfile.mkdtemp()) / 'clients.jsonl'
+        path.write_text('\n'.join(json.dumps(row) for row in [
+            {'email': 'ama@example.com', 'password': 'secret', 'city': 'Lomé'},
+            {'email': 'kofi@example.com', 'username': 'kofi', 'password_hash': legacy_hash},
+            {'email': 'EXISTING@example.com', 'password': 'x'},
+            {'email': 'ama@example.com', 'username': 'autre'},
+            {'email': 'pas-un-email'},
+            {'email': 'yao@example.com'},
+            {'email': 'existing@autre.example.com'},
+            {'email': 'ama@autre.example.com'},
+            {'email': 'ama2@example.com', 'username': 'ama2'},
+        ]))
+        self.addCleanup(shutil.rmtree, path.parent)
+
+        out, err = StringIO(), StringIO()
+        call_command('import_users', str(path), chunk_size=2, workers=1, stdout=out, stderr=err)
+
+        self.assertIn('5 compte(s) créé(s), 4 ligne(s) rejetée(s)', out.getvalue())
+        self.assertIn('ligne 9: username déjà utilisé: ama2', err.getvalue())
+        self.assertIn('ligne 3: email déjà utilisé', err.getvalue())
+        self.assertTrue(CustomUser.objects.get(email='ama@example.com').check_password('secret'))
+        self.assertTrue(CustomUser.objects.get(email='kofi@example.com').check_password('ancien'))
+        self.assertFalse(CustomUser.objects.get(email='yao@example.com').has_usable_password())
+        # Username dérivé de l'email : suffixé s'il est déjà pris, en base ou dans le fichier
+        self.assertEqual(
+            list(CustomUser.objects.filter(email__contains='@autre.').order_by('id').values_list('username', flat=True)),
+            ['existing2', 'ama2']
+        )
+        self.assertEqual(UserProfile.objects.filter(user__email__in=['ama@example.com', 'yao@example.com']).count(), 2)
@@ -0,0 +1,90 @@
+# backend/apps/users/throttling.py
+"""
+Limitation de débit des points d'entrée d'authentification.
+
+Fenêtre glissante approchée par deux compteurs en cache (fenêtre courante
+et précédente, pondérée par le temps restant) : mémoire et coût constants
+quel que soit le débit, contrairement à l'historique de SimpleRateThrottle.
+Les throttles DRF passent avant la vue : une requête refusée ne coûte aucun
+hachage de mot de passe.
+
+Débits : REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] (login, register, token_refresh).
+Adresse du client : REMOTE_ADDR, ou X-Forwarded-For selon REST_FRAMEWORK['NUM_PROXIES'].
+"""
+import time
+
+from django.core.cache import cache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    scope = None
+
+    def get_rate(self):
+        # Relu à chaque appel : suit override_settings et les changements de configuration
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    @staticmethod
+    def parse_rate(rate):
+        count, period = rate.split('/')
+        return int(count), DURATIONS[period[0]]
+
+    def get_idents(self, request, view):
+        """
+        Clés limitées indépendamment (toutes doivent rester sous le débit).
+        get_ident ne lit X-Forwarded-For que derrière NUM_PROXIES proxys de confiance.
+        """
+        return [f'ip:{self.get_ident(request)}']
+
+    def allow_request(self, request, view):
+        rate = self.get_rate()
+        if rate is None:
+            return True
+        limit, duration = self.parse_rate(rate)
+
+        position = time.time() / duration
+        window = int(position)
+        weight = 1 - (position - window)  # part de la fenêtre précédente encore couverte
+
+        # Incrément d'abord, comparaison ensuite : incr est atomique, deux requêtes
+        # simultanées ne peuvent pas passer toutes deux sur la dernière place
+        allowed = True
+        for ident in self.get_idents(request, view):
+            current = f'throttle:{self.scope}:{ident}:{window}'
+            previous = f'throttle:{self.scope}:{ident}:{window - 1}'
+            cache.add(current, 0, duration * 2)
+            try:
+                count = cache.incr(current)
+            except ValueError:  # expirée entre add et incr
+                cache.set(current, 1, duration * 2)
+                count = 1
+            if cache.get(previous, 0) * weight + count > limit:
+                self._wait = duration * weight
+                allowed = False
+        return allowed
+
+    def wait(self):
+        return getattr(self, '_wait', None)
+
+
+class LoginThrottle(SlidingWindowThrottle):
+    """Par adresse IP et par compte visé (attaques distribuées sur un même compte)"""
+    scope = 'login'
+
+    def get_idents(self, request, view):
+        idents = super().get_idents(request, view)
+        account = request.data.get('username') or request.data.get('email')
+        if account:
+            idents.append(f'account:{str(account).strip().lower()}')
+        return idents
+
+
+class RegisterThrottle(SlidingWindowThrottle):
+    scope = 'register'
+
+
+class TokenRefreshThrottle(SlidingWindowThrottle):
+    scope = 'token_refresh'
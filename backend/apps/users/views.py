@@ -4,15 +4,18 @@ from drf_yasg.utils import swagger_auto_schema
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from django.contrib.auth import authenticate
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.views import TokenRefreshView
 from .models import CustomUser
-from .serializers import UserSerializer, RegisterSerializer
+from .revocation import RevocableRefreshToken, revoke
+from .serializers import UserSerializer, RegisterSerializer, RevocableTokenRefreshSerializer
+from .throttling import LoginThrottle, RegisterThrottle, TokenRefreshThrottle
 
 class RegisterView(generics.CreateAPIView):
     queryset = CustomUser.objects.all()
     permission_classes = [AllowAny]
+    throttle_classes = [RegisterThrottle]
     serializer_class = RegisterSerializer
 
 @swagger_auto_schema(
@@ -50,6 +53,7 @@ class RegisterView(generics.CreateAPIView):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([LoginThrottle])
 def login_view(request):
     # Accepter soit 'email' soit 'username'
     email = request.data.get('email')
@@ -68,7 +72,7 @@ def login_view(request):
     user = authenticate(request, username=login_username, password=password)
 
     if user:
-        refresh = RefreshToken.for_user(user)
+        refresh = RevocableRefreshToken.for_user(user)
         return Response({
             'access': str(refresh.access_token),
             'refresh': str(refresh),
@@ -83,7 +87,8 @@ def login_view(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def profile_view(request):
-    serializer = UserSerializer(request.user)
+    # request.user ne porte que id et les indicateurs : relire l'utilisateur complet
+    serializer = UserSerializer(CustomUser.objects.get(pk=request.user.pk))
     return Response(serializer.data)
 
 @api_view(['POST'])
@@ -91,8 +96,17 @@ def profile_view(request):
 def logout_view(request):
     try:
         refresh_token = request.data.get('refresh_token')
-        token = RefreshToken(refresh_token)
+        token = RevocableRefreshToken(refresh_token)
         token.blacklist()
+        # Le jeton d'accès présenté est révoqué aussi, sans attendre son expiration
+        if request.auth is not None:
+            revoke(request.auth)
         return Response(status=status.HTTP_205_RESET_CONTENT)
     except Exception as e:
-        return Response(status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        return Response(status=status.HTTP_400_BAD_REQUEST)
+
+
+class RefreshView(TokenRefreshView):
+    """Rafraîchissement avec vérification de révocation en mémoire"""
+    serializer_class = RevocableTokenRefreshSerializer
+    throttle_classes = [TokenRefreshThrottle]
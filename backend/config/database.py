@@ -0,0 +1,72 @@
+# backend/config/database.py
+"""
+Profils de base de données pilotés par l'environnement (DB_ENGINE).
+
+sqlite     : fichier local. WAL, synchronous=NORMAL, busy_timeout et mmap sont
+             appliqués à chaque connexion (apps/core/signals.py, SQLITE_PRAGMAS) ;
+             les transactions démarrent en IMMEDIATE pour que les écrivains
+             attendent le verrou au lieu d'échouer en cours de transaction.
+postgresql : connexions persistantes (DB_CONN_MAX_AGE) avec vérification de
+             santé, ou pool psycopg 3 (DB_POOL=True). Les curseurs côté serveur
+             servent .iterator() ; à désactiver derrière PgBouncer en mode
+             transaction (DB_DISABLE_SERVER_SIDE_CURSORS).
+"""
+from decouple import config
+
+
+def sqlite_database(base_dir, prefix='DB'):
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': config(f'{prefix}_NAME', default=str(base_dir / 'db.sqlite3')),
+        'OPTIONS': {
+            # Attente du verrou côté module sqlite3 (secondes), en plus de busy_timeout
+            'timeout': config('SQLITE_BUSY_TIMEOUT', default=5000, cast=int) / 1000,
+            'transaction_mode': 'IMMEDIATE',
+        },
+    }
+
+
+def postgresql_database(prefix='DB'):
+    database = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': config(f'{prefix}_NAME', default='boutique_premium'),
+        'USER': config(f'{prefix}_USER', default='postgres'),
+        'PASSWORD': config(f'{prefix}_PASSWORD', default=''),
+        'HOST': config(f'{prefix}_HOST', default='localhost'),
+        'PORT': config(f'{prefix}_PORT', default='5432'),
+        'DISABLE_SERVER_SIDE_CURSORS': config('DB_DISABLE_SERVER_SIDE_CURSORS', default=False, cast=bool),
+        'OPTIONS': {},
+    }
+    if config('DB_POOL', default=False, cast=bool):
+        # Pool psycopg 3 : incompatible avec CONN_MAX_AGE
+        database['CONN_MAX_AGE'] = 0
+        database['OPTIONS']['pool'] = {
+            'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+            'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+            'timeout': config('DB_POOL_TIMEOUT', default=10, cast=float),
+        }
+    else:
+        database['CONN_MAX_AGE'] = config('DB_CONN_MAX_AGE', default=60, cast=int)
+        database['CONN_HEALTH_CHECKS'] = True
+    return database
+
+
+def database(base_dir, prefix='DB'):
+    """Réglages d'une base d'après {prefix}_ENGINE : 'sqlite' (défaut) ou 'postgresql'"""
+    engine = config(f'{prefix}_ENGINE', default='sqlite')
+    if engine == 'postgresql':
+        return postgresql_database(prefix)
+    if engine == 'sqlite':
+        return sqlite_database(base_dir, prefix)
+    raise ValueError(f"{prefix}_ENGINE inconnu: {engine!r} (sqlite ou postgresql)")
+
+
+def sqlite_pragmas():
+    """PRAGMA appliqués à chaque nouvelle connexion SQLite"""
+    return {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': config('SQLITE_BUSY_TIMEOUT', default=5000, cast=int),
+        'mmap_size': config('SQLITE_MMAP_SIZE', default=256 * 1024 * 1024, cast=int),
+        'temp_store': 'MEMORY',
+    }
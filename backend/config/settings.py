@@ -14,7 +14,10 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 import os
 from pathlib import Path
 from datetime import timedelta
-from decouple import config
+from decimal import Decimal
+from decouple import config, Csv
+
+from .database import database, sqlite_pragmas
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -35,12 +38,14 @@ INSTALLED_APPS = [
     # Third party
     'rest_framework',
     'rest_framework_simplejwt',
+    'rest_framework_simplejwt.token_blacklist',
     'corsheaders',
     'django_filters',
     'drf_yasg',
 
     
     # Local apps
+    'apps.core',
     'apps.users',
     'apps.products',
     'apps.orders',
@@ -56,6 +61,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.core.db_routing.ReplicaPinningMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -78,17 +84,38 @@ TEMPLATES = [
     },
 ]
 
+# Base de données : profil sqlite (défaut) ou postgresql selon DB_ENGINE (config/database.py)
 DATABASES = {
+    'default': database(BASE_DIR),
+}
+SQLITE_PRAGMAS = sqlite_pragmas()
+
+# Répliques en lecture : DB_REPLICAS=replica -> REPLICA_ENGINE, REPLICA_NAME, ...
+# (apps/core/db_routing.py). Les tests les font pointer sur 'default'.
+REPLICA_DATABASES = config('DB_REPLICAS', default='', cast=Csv())
+for _alias in REPLICA_DATABASES:
+    DATABASES[_alias] = {**database(BASE_DIR, prefix=_alias.upper()), 'TEST': {'MIRROR': 'default'}}
+DATABASE_ROUTERS = ['apps.core.db_routing.ReplicaRouter']
+# Applications ('products') ou modèles ('orders.archivedorder') lus sur les répliques
+REPLICA_ROUTED = config(
+    'REPLICA_ROUTED', default='products,shipping,orders.archivedorder,payments.paymentledgerentry', cast=Csv()
+)
+# Lectures sur 'default' pendant cette durée après une écriture de l'utilisateur (secondes)
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=10, cast=int)
+
+# Cache partagé (Redis, Memcached...) obligatoire avec plusieurs processus : les
+# révocations de jetons et les invalidations passent par des numéros de version en cache
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='boutique-premium'),
     }
 }
 
 # REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.users.authentication.StatelessJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
@@ -96,6 +123,15 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
+    # Points d'entrée d'authentification (apps/users/throttling.py), refusés avant tout hachage
+    'DEFAULT_THROTTLE_RATES': {
+        'login': config('LOGIN_THROTTLE_RATE', default='10/min'),
+        'register': config('REGISTER_THROTTLE_RATE', default='5/min'),
+        'token_refresh': config('TOKEN_REFRESH_THROTTLE_RATE', default='30/min'),
+    },
+    # Proxys inverses de confiance devant l'application : 0 = X-Forwarded-For ignoré
+    # (en-tête fourni par le client), N = N-ième adresse en partant de la fin
+    'NUM_PROXIES': config('NUM_PROXIES', default=0, cast=int),
 }
 
 SIMPLE_JWT = {
@@ -106,11 +142,33 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+# Indicateurs is_active / is_staff en cache pour l'authentification JWT (secondes)
+AUTH_USER_FLAGS_TTL = config('AUTH_USER_FLAGS_TTL', default=60, cast=int)
+
+# Jetons révoqués en mémoire : relecture de la version partagée / reconstruction complète (secondes)
+TOKEN_REVOCATION_CHECK_INTERVAL = config('TOKEN_REVOCATION_CHECK_INTERVAL', default=5, cast=float)
+TOKEN_REVOCATION_REBUILD_INTERVAL = config('TOKEN_REVOCATION_REBUILD_INTERVAL', default=300, cast=float)
+
 # Configuration d'authentification
 AUTHENTICATION_BACKENDS = [
-    'django.contrib.auth.backends.ModelBackend',
+    'apps.users.backends.ProfileModelBackend',
 ]
 
+# Hachage des mots de passe : le premier hasher chiffre, les autres vérifient
+# les anciens hash, recalculés avec le premier à la connexion suivante
+PASSWORD_HASHER = config('PASSWORD_HASHER', default='argon2')
+_PASSWORD_HASHERS = {
+    'argon2': 'apps.users.hashers.Argon2PasswordHasher',
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'scrypt': 'django.contrib.auth.hashers.ScryptPasswordHasher',
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHER]] + [
+    hasher for name, hasher in _PASSWORD_HASHERS.items() if name != PASSWORD_HASHER
+] + ['django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher']
+ARGON2_TIME_COST = config('ARGON2_TIME_COST', default=2, cast=int)
+ARGON2_MEMORY_COST = config('ARGON2_MEMORY_COST', default=102400, cast=int)  # KiB
+ARGON2_PARALLELISM = config('ARGON2_PARALLELISM', default=8, cast=int)
+
 # Fichiers médias
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
@@ -142,4 +200,119 @@ SWAGGER_SETTINGS = {
 PAYGATE_API_KEY = config('PAYGATE_API_KEY', default='34058afc-b05f-4ead-9295-62049cce89d0')
 PAYGATE_API_URL = config('PAYGATE_API_URL', default='https://paygateglobal.com/api/v1/pay')
 PAYGATE_PAGE_URL = config('PAYGATE_PAGE_URL', default='https://paygateglobal.com/v1/page')
-PAYGATE_STATUS_URL = config('PAYGATE_STATUS_URL', default='https://paygateglobal.com/api/v1/status')
\ No newline at end of file
+PAYGATE_STATUS_URL = config('PAYGATE_STATUS_URL', default='https://paygateglobal.com/api/v1/status')
+PAYGATE_STATUS_V2_URL = config('PAYGATE_STATUS_V2_URL', default='https://paygateglobal.com/api/v2/status')
+PAYGATE_BALANCE_URL = config('PAYGATE_BALANCE_URL', default='https://paygateglobal.com/api/v1/check-balance')
+
+# Client HTTP PayGate (secondes)
+PAYGATE_CONNECT_TIMEOUT = config('PAYGATE_CONNECT_TIMEOUT', default=3.05, cast=float)
+PAYGATE_READ_TIMEOUT = config('PAYGATE_READ_TIMEOUT', default=15, cast=float)
+PAYGATE_MAX_RETRIES = config('PAYGATE_MAX_RETRIES', default=2, cast=int)
+PAYGATE_RETRY_BACKOFF = config('PAYGATE_RETRY_BACKOFF', default=0.25, cast=float)
+PAYGATE_POOL_SIZE = config('PAYGATE_POOL_SIZE', default=20, cast=int)
+PAYGATE_ASYNC_CONCURRENCY = config('PAYGATE_ASYNC_CONCURRENCY', default=50, cast=int)
+# Appels PayGate simultanés des vues async, par worker ASGI
+PAYGATE_ASYNC_VIEW_CONCURRENCY = config('PAYGATE_ASYNC_VIEW_CONCURRENCY', default=200, cast=int)
+PAYGATE_STATUS_CACHE_TTL = config('PAYGATE_STATUS_CACHE_TTL', default=5, cast=float)
+
+# Disjoncteur et cloisonnement des appels PayGate
+PAYGATE_BREAKER_WINDOW = config('PAYGATE_BREAKER_WINDOW', default=20, cast=int)
+PAYGATE_BREAKER_MIN_CALLS = config('PAYGATE_BREAKER_MIN_CALLS', default=10, cast=int)
+PAYGATE_BREAKER_FAILURE_RATE = config('PAYGATE_BREAKER_FAILURE_RATE', default=0.5, cast=float)
+PAYGATE_BREAKER_SLOW_CALL_RATE = config('PAYGATE_BREAKER_SLOW_CALL_RATE', default=0.8, cast=float)
+PAYGATE_BREAKER_SLOW_CALL_DURATION = config('PAYGATE_BREAKER_SLOW_CALL_DURATION', default=5, cast=float)
+PAYGATE_BREAKER_RESET_TIMEOUT = config('PAYGATE_BREAKER_RESET_TIMEOUT', default=30, cast=float)
+PAYGATE_BULKHEAD_SIZE = config('PAYGATE_BULKHEAD_SIZE', default=10, cast=int)
+PAYGATE_BULKHEAD_TIMEOUT = config('PAYGATE_BULKHEAD_TIMEOUT', default=0.5, cast=float)
+
+# Vérifications de statut en masse (admin, webhooks) : threads et connexions au plus, pour tout le processus
+PAYGATE_STATUS_CHECK_WORKERS = config('PAYGATE_STATUS_CHECK_WORKERS', default=100, cast=int)
+
+# Interrogation des paiements initiés (secondes)
+PAYGATE_POLL_BASE_INTERVAL = config('PAYGATE_POLL_BASE_INTERVAL', default=5, cast=float)
+PAYGATE_POLL_MAX_INTERVAL = config('PAYGATE_POLL_MAX_INTERVAL', default=300, cast=float)
+PAYGATE_POLL_BACKOFF_STEP = config('PAYGATE_POLL_BACKOFF_STEP', default=120, cast=float)
+PAYGATE_POLL_EXPIRY = config('PAYGATE_POLL_EXPIRY', default=86400, cast=float)
+PAYGATE_POLL_BATCH_SIZE = config('PAYGATE_POLL_BATCH_SIZE', default=200, cast=int)
+
+# Webhooks en erreur temporaire : délai avant nouvelle tentative, doublé à chaque essai (secondes)
+WEBHOOK_RETRY_BACKOFF = config('WEBHOOK_RETRY_BACKOFF', default=10, cast=float)
+WEBHOOK_RETRY_MAX_DELAY = config('WEBHOOK_RETRY_MAX_DELAY', default=600, cast=float)
+
+# Flux SSE /api/payments/{id}/events/ (secondes)
+PAYMENT_EVENTS_POLL_INTERVAL = config('PAYMENT_EVENTS_POLL_INTERVAL', default=2, cast=float)
+PAYMENT_EVENTS_MAX_DURATION = config('PAYMENT_EVENTS_MAX_DURATION', default=300, cast=float)
+
+# Index des modes de livraison : délai max (secondes) avant de voir une modification faite par un autre processus
+SHIPPING_INDEX_CHECK_INTERVAL = config('SHIPPING_INDEX_CHECK_INTERVAL', default=30, cast=float)
+
+# Taxes sur le sous-total par pays de livraison : "TG=0.18,BJ=0.18" ; DEFAULT_TAX_RATE pour les autres
+TAX_RATES = {
+    country.strip().upper(): Decimal(rate)
+    for country, rate in (item.split('=') for item in config('TAX_RATES', default='', cast=Csv()))
+}
+DEFAULT_TAX_RATE = config('DEFAULT_TAX_RATE', default='0', cast=Decimal)
+
+# Devis groupés (POST /api/shipping/quote/batch/) : lignes max par requête
+SHIPPING_BATCH_MAX_ROWS = config('SHIPPING_BATCH_MAX_ROWS', default=5000, cast=int)
+
+# Aperçu de commande : totaux du panier en cache par version (secondes, borne la
+# fraîcheur des prix produits)
+CHECKOUT_PREVIEW_CACHE_TTL = config('CHECKOUT_PREVIEW_CACHE_TTL', default=60, cast=int)
+
+# Serveur ASGI (manage.py serve_asgi, uvicorn) : processus, plafond de connexions
+# simultanées par processus (0 = aucun ; au-delà : 503), file listen(), keep-alive (secondes)
+ASGI_HOST = config('ASGI_HOST', default='127.0.0.1')
+ASGI_PORT = config('ASGI_PORT', default=8000, cast=int)
+ASGI_WORKERS = config('ASGI_WORKERS', default=os.cpu_count() or 1, cast=int)
+ASGI_LIMIT_CONCURRENCY = config('ASGI_LIMIT_CONCURRENCY', default=0, cast=int)
+ASGI_BACKLOG = config('ASGI_BACKLOG', default=2048, cast=int)
+ASGI_KEEPALIVE = config('ASGI_KEEPALIVE', default=5, cast=int)
+
+# Journalisation : JSON sur stderr, écrite hors du thread de la requête (apps/core/log.py)
+LOG_LEVEL = config('LOG_LEVEL', default='INFO')
+# Échantillonnage sous WARNING, par logger : "apps.payments.views=0.1,apps.payments.transport=0.01"
+LOG_SAMPLING = {
+    name.strip(): float(rate)
+    for name, rate in (item.split('=') for item in config('LOG_SAMPLING', default='', cast=Csv()))
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'sampling': {
+            '()': 'apps.core.log.SamplingFilter',
+            'rates': LOG_SAMPLING,
+        },
+    },
+    'formatters': {
+        'json': {
+            '()': 'apps.core.log.JsonFormatter',
+        },
+    },
+    'handlers': {
+        'queue': {
+            '()': 'apps.core.log.QueueLogHandler',
+            'maxsize': config('LOG_QUEUE_SIZE', default=10000, cast=int),
+            'formatter': 'json',
+            'filters': ['sampling'],
+        },
+    },
+    'root': {
+        'handlers': ['queue'],
+        'level': LOG_LEVEL,
+    },
+    'loggers': {
+        # Remplace la console de Django (sinon chaque message serait écrit deux fois en DEBUG)
+        'django': {
+            'handlers': ['queue'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        # Une ligne INFO par requête HTTP sortante : la latence est déjà dans apps.payments.transport
+        'httpx': {
+            'level': 'WARNING',
+        },
+    },
+}